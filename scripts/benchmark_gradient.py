@@ -0,0 +1,487 @@
+import os, sys, time, json, socket, platform, argparse, subprocess, itertools, threading
+import numpy as np
+from collections import OrderedDict
+import shdom
+
+
+class StageTimer(object):
+    """
+    Accumulate the wall time of method calls by wrapping the methods of object instances.
+
+    Notes
+    -----
+    Calls from multiple threads (e.g. core_grad with n_jobs>1) are accumulated, therefore the time of a
+    parallel stage can be larger than the wall time of the whole gradient step.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = OrderedDict()
+
+    def reset(self):
+        """
+        Reset the accumulated times (the wrapped methods remain wrapped).
+        """
+        with self._lock:
+            for stage in self._stages.values():
+                stage['calls'] = 0
+                stage['time'] = 0.0
+
+    def wrap(self, stage, instance, method_name):
+        """
+        Replace a method of an instance by a timing wrapper.
+
+        Parameters
+        ----------
+        stage: str
+            The stage name under which the time is accumulated.
+        instance: object
+            The object instance.
+        method_name: str
+            The name of the method (or function attribute) to wrap.
+        """
+        method = getattr(instance, method_name)
+        if stage not in self._stages:
+            self._stages[stage] = OrderedDict([('calls', 0), ('time', 0.0)])
+
+        def wrapper(*args, **kwargs):
+            start_time = time.time()
+            output = method(*args, **kwargs)
+            elapsed = time.time() - start_time
+            with self._lock:
+                self._stages[stage]['calls'] += 1
+                self._stages[stage]['time'] += elapsed
+            return output
+        setattr(instance, method_name, wrapper)
+
+    @property
+    def stages(self):
+        with self._lock:
+            return OrderedDict([(name, OrderedDict(stage)) for name, stage in self._stages.items()])
+
+
+class GradientBenchmark(object):
+    """
+    Benchmark: Gradient step
+    ------------------------
+    A reproducible benchmark of a single LocalOptimizer.objective_fun evaluation (the optimization hot path).
+    Synthetic multi-view measurements of a generated cloud are rendered with a RadianceSensor or a StokesSensor
+    at one or more wavelengths. The liquid water content of a perturbed initial state is then estimated and a gradient
+    step is timed with a breakdown into the stages:
+        set_state: MediumEstimator.set_state
+        update_medium: RteSolverArray.update_medium
+        solve: RteSolverArray.solve
+        get_derivatives: MediumEstimator.get_derivatives (per wavelength)
+        compute_direct_derivative: MediumEstimator.compute_direct_derivative (per step, in LocalOptimizer.set_state)
+        core_grad: MediumEstimator.core_grad (per wavelength and job)
+        project_gradient: ScattererEstimator.project_gradient
+    for l2 and normcorr losses across n_jobs values.
+
+    The results are written as JSON. A previous result file can be passed with the --compare flag to flag
+    step time regressions (e.g. between two commits).
+
+    For example usage see the README.md
+
+    For information about the command line flags see:
+      python scripts/benchmark_gradient.py --help
+    """
+    stage_names = ['set_state', 'update_medium', 'solve', 'get_derivatives',
+                   'compute_direct_derivative', 'core_grad', 'project_gradient']
+
+    def parse_arguments(self):
+        """
+        Handle all the argument parsing needed for this script.
+        """
+        parser = argparse.ArgumentParser()
+        parser.add_argument('output_path',
+                            help='Path to the output JSON file with the benchmark results.')
+        parser.add_argument('--compare',
+                            default=None,
+                            help='(default value: %(default)s) Path to a previous JSON result file. \
+                            Results with a step time increase larger than the threshold are flagged as regressions.')
+        parser.add_argument('--threshold',
+                            default=0.1,
+                            type=float,
+                            help='(default value: %(default)s) Relative step time increase flagged as a regression.')
+        parser.add_argument('--wavelength',
+                            default=[0.672, 0.558, 0.446],
+                            nargs='+',
+                            type=np.float32,
+                            help='(default value: %(default)s) Wavelengths [micron]. '\
+                                 'The first num_wavelengths wavelengths are used by each configuration.')
+        parser.add_argument('--num_wavelengths',
+                            default=[1, 3],
+                            nargs='+',
+                            type=int,
+                            help='(default value: %(default)s) Number of wavelengths (spectral channels).')
+        parser.add_argument('--mie_base_path',
+                            default='mie_tables/polydisperse/Water_<wavelength>nm.scat',
+                            help='(default value: %(default)s) Mie table base file name. '\
+                                 '<wavelength> will be replaced by the corresponding wavelengths. '\
+                                 'The StokesSensor uses the polarized tables (with a "pol" suffix).')
+        parser.add_argument('--sensors',
+                            default=['RadianceSensor', 'StokesSensor'],
+                            nargs='+',
+                            help='(default value: %(default)s) The sensor types.')
+        parser.add_argument('--loss_types',
+                            default=['l2', 'normcorr'],
+                            nargs='+',
+                            help='(default value: %(default)s) The loss types.')
+        parser.add_argument('--generator',
+                            default='StochasticCloud',
+                            help='(default value: %(default)s) The scene generator (Homogeneous or StochasticCloud).')
+        parser.add_argument('--grid_size',
+                            default=16,
+                            type=int,
+                            help='(default value: %(default)s) Number of grid cells in each axis.')
+        parser.add_argument('--n_jobs',
+                            default=[1, 4],
+                            nargs='+',
+                            type=int,
+                            help='(default value: %(default)s) Number of jobs for the gradient computation.')
+        parser.add_argument('--repeats',
+                            default=3,
+                            type=int,
+                            help='(default value: %(default)s) Number of repeated gradient steps. The fastest step is reported.')
+        parser.add_argument('--seed',
+                            default=0,
+                            type=int,
+                            help='(default value: %(default)s) Random seed for the stochastic scene.')
+        parser.add_argument('--perturbation',
+                            default=0.8,
+                            type=float,
+                            help='(default value: %(default)s) The initial state is the ground-truth lwc scaled by this factor.')
+        parser.add_argument('--pixel_resolution',
+                            default=0.02,
+                            type=float,
+                            help='(default value: %(default)s) Orthographic pixel resolution [km].')
+        parser.add_argument('--azimuth',
+                            default=[90, 90, 0, -90, -90],
+                            nargs='+',
+                            type=float,
+                            help='(default value: %(default)s) Azimuth angles of the views [deg].')
+        parser.add_argument('--zenith',
+                            default=[60.0, 26.1, 0.0, 26.1, 60.0],
+                            nargs='+',
+                            type=float,
+                            help='(default value: %(default)s) Zenith angles of the views [deg].')
+        parser.add_argument('--num_mu',
+                            default=8,
+                            type=int,
+                            help='(default value: %(default)s) The number of discrete ordinates in the zenith direction.')
+        parser.add_argument('--num_phi',
+                            default=16,
+                            type=int,
+                            help='(default value: %(default)s) The number of discrete ordinates in the azimuthal direction.')
+        parser.add_argument('--maxiter',
+                            default=100,
+                            type=int,
+                            help='(default value: %(default)s) Maximum number of solution iterations.')
+        self.args = parser.parse_args()
+
+    def get_ground_truth(self, sensor_type, num_wavelengths):
+        """
+        Generate the ground-truth cloud with Mie tables at the benchmark wavelengths.
+
+        Parameters
+        ----------
+        sensor_type: 'RadianceSensor' or 'StokesSensor'
+            The sensor type (StokesSensor uses the polarized Mie tables).
+        num_wavelengths: int
+            The number of wavelengths.
+
+        Returns
+        -------
+        cloud: shdom.MicrophysicalScatterer
+            The ground-truth cloud.
+        """
+        CloudGenerator = getattr(shdom.Generate, self.args.generator)
+        parser = CloudGenerator.update_parser(argparse.ArgumentParser())
+        grid_size = str(self.args.grid_size)
+        generator_args = ['--nx', grid_size, '--ny', grid_size, '--nz', grid_size]
+        if self.args.generator == 'Homogeneous':
+            generator_args += ['--lwc', '0.5']
+        np.random.seed(self.args.seed)
+        generator = CloudGenerator(parser.parse_args(generator_args))
+        for wavelength in self.args.wavelength[:num_wavelengths]:
+            table_path = self.args.mie_base_path.replace('<wavelength>', '{}'.format(shdom.int_round(wavelength)))
+            if sensor_type == 'StokesSensor':
+                table_path += 'pol'
+            generator.add_mie(table_path)
+        return generator.get_scatterer()
+
+    def get_solver(self, sensor_type, wavelengths):
+        """
+        Define an RteSolverArray (one solver per wavelength).
+
+        Parameters
+        ----------
+        sensor_type: 'RadianceSensor' or 'StokesSensor'
+            The sensor type (StokesSensor solves for three Stokes components).
+        wavelengths: list of floats
+            The wavelengths [micron].
+
+        Returns
+        -------
+        rte_solvers: shdom.RteSolverArray
+            A solver array without a medium.
+        """
+        num_stokes = 3 if sensor_type == 'StokesSensor' else 1
+        numerical_params = shdom.NumericalParameters(num_mu_bins=self.args.num_mu, num_phi_bins=self.args.num_phi)
+        rte_solvers = shdom.RteSolverArray()
+        for wavelength in wavelengths:
+            scene_params = shdom.SceneParameters(
+                wavelength=wavelength,
+                source=shdom.SolarSource(azimuth=0.0, zenith=165.0)
+            )
+            rte_solvers.add_solver(shdom.RteSolver(scene_params, numerical_params, num_stokes=num_stokes))
+        return rte_solvers
+
+    def get_measurements(self, sensor_type, cloud):
+        """
+        Render synthetic multi-view measurements of the ground-truth cloud.
+
+        Parameters
+        ----------
+        sensor_type: 'RadianceSensor' or 'StokesSensor'
+            The sensor type.
+        cloud: shdom.MicrophysicalScatterer
+            The ground-truth cloud.
+
+        Returns
+        -------
+        measurements: shdom.Measurements
+            The rendered measurements.
+        """
+        medium = shdom.Medium()
+        medium.set_grid(cloud.grid)
+        medium.add_scatterer(cloud, 'cloud')
+        rte_solvers = self.get_solver(sensor_type, list(cloud.mie.keys()))
+        rte_solvers.set_medium(medium)
+        rte_solvers.solve(maxiter=self.args.maxiter, verbose=False)
+
+        projection = shdom.MultiViewProjection()
+        for azimuth, zenith in zip(self.args.azimuth, self.args.zenith):
+            projection.add_projection(shdom.OrthographicProjection(
+                cloud.bounding_box, self.args.pixel_resolution, self.args.pixel_resolution, azimuth, zenith))
+        camera = shdom.Camera(getattr(shdom, sensor_type)(), projection)
+        images = camera.render(rte_solvers)
+        return shdom.Measurements(camera, images=images, wavelength=rte_solvers.wavelength)
+
+    def get_medium_estimator(self, sensor_type, loss_type, cloud):
+        """
+        Define a MediumEstimator which estimates the cloud liquid water content.
+
+        Parameters
+        ----------
+        sensor_type: 'RadianceSensor' or 'StokesSensor'
+            The sensor type.
+        loss_type: 'l2' or 'normcorr'
+            The loss type.
+        cloud: shdom.MicrophysicalScatterer
+            The ground-truth cloud.
+
+        Returns
+        -------
+        medium_estimator: shdom.MediumEstimator
+            The medium estimator.
+        state: np.array(dtype=np.float64)
+            The perturbed initial state.
+        """
+        mask = cloud.get_mask(threshold=0.01)
+        lwc = shdom.GridDataEstimator(cloud.lwc, min_bound=1e-5, max_bound=2.0)
+        lwc.apply_mask(mask)
+        cloud_estimator = shdom.MicrophysicalScattererEstimator(cloud.mie, lwc, cloud.reff, cloud.veff)
+        cloud_estimator.set_mask(mask)
+        stokes_weights = np.ones(3, dtype=np.float32) if sensor_type == 'StokesSensor' else None
+        medium_estimator = shdom.MediumEstimator(loss_type=loss_type, stokes_weights=stokes_weights)
+        medium_estimator.set_grid(cloud_estimator.grid)
+        medium_estimator.add_scatterer(cloud_estimator, 'cloud')
+        state = medium_estimator.get_state() * self.args.perturbation
+        return medium_estimator, state
+
+    def get_optimizer(self, sensor_type, loss_type, n_jobs, cloud, measurements, timer):
+        """
+        Define and initialize a LocalOptimizer with the timed stages wrapped.
+
+        Parameters
+        ----------
+        sensor_type: 'RadianceSensor' or 'StokesSensor'
+            The sensor type.
+        loss_type: 'l2' or 'normcorr'
+            The loss type.
+        n_jobs: int
+            The number of jobs for the gradient computation.
+        cloud: shdom.MicrophysicalScatterer
+            The ground-truth cloud.
+        measurements: shdom.Measurements
+            The rendered measurements.
+        timer: StageTimer
+            The stage timer.
+
+        Returns
+        -------
+        optimizer: shdom.LocalOptimizer
+            The initialized optimizer.
+        state: np.array(dtype=np.float64)
+            The perturbed initial state.
+        """
+        medium_estimator, state = self.get_medium_estimator(sensor_type, loss_type, cloud)
+        rte_solvers = self.get_solver(sensor_type, list(cloud.mie.keys()))
+        optimizer = shdom.LocalOptimizer('L-BFGS-B', n_jobs=n_jobs)
+        optimizer.set_measurements(measurements)
+        optimizer.set_rte_solver(rte_solvers)
+        optimizer.set_medium_estimator(medium_estimator)
+
+        timer.wrap('set_state', medium_estimator, 'set_state')
+        timer.wrap('update_medium', optimizer.rte_solver, 'update_medium')
+        timer.wrap('solve', optimizer.rte_solver, 'solve')
+        timer.wrap('get_derivatives', medium_estimator, 'get_derivatives')
+        timer.wrap('compute_direct_derivative', medium_estimator, 'compute_direct_derivative')
+        timer.wrap('core_grad', medium_estimator, '_core_grad')
+        for estimator in medium_estimator.estimators.values():
+            timer.wrap('project_gradient', estimator, 'project_gradient')
+
+        optimizer.init_optimizer()
+        return optimizer, state
+
+    def metadata(self):
+        """
+        Metadata which identifies the benchmark run.
+
+        Returns
+        -------
+        metadata: dict
+            The commit, host, platform, package versions and arguments of the run.
+        """
+        try:
+            commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                             cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+        except (subprocess.CalledProcessError, OSError):
+            commit = None
+        metadata = {
+            'commit': commit,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': socket.gethostname(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'args': {key: np.array(value).tolist() if isinstance(value, (list, np.floating)) else value
+                     for key, value in vars(self.args).items()}
+        }
+        return metadata
+
+    def run(self):
+        """
+        Run the benchmark.
+
+        Returns
+        -------
+        results: list
+            A list of result records (dict) for every sensor, number of wavelengths, loss type and n_jobs.
+        """
+        results = []
+        for sensor_type, num_wavelengths in itertools.product(self.args.sensors, self.args.num_wavelengths):
+            cloud = self.get_ground_truth(sensor_type, num_wavelengths)
+            measurements = self.get_measurements(sensor_type, cloud)
+            npix = int(np.sum(measurements.camera.projection.npix))
+            for loss_type, n_jobs in itertools.product(self.args.loss_types, self.args.n_jobs):
+                timer = StageTimer()
+                optimizer, state = self.get_optimizer(sensor_type, loss_type, n_jobs, cloud, measurements, timer)
+
+                steps = []
+                for i in range(self.args.repeats):
+                    timer.reset()
+                    start_time = time.time()
+                    optimizer.objective_fun(state)
+                    step_time = time.time() - start_time
+                    steps.append((step_time, timer.stages))
+                step_time, stages = min(steps, key=lambda step: step[0])
+
+                record = {
+                    'sensor': sensor_type,
+                    'num_wavelengths': num_wavelengths,
+                    'loss_type': loss_type,
+                    'n_jobs': n_jobs,
+                    'npix': npix,
+                    'num_parameters': int(state.size),
+                    'npts': int(max([solver._npts for solver in optimizer.rte_solver])),
+                    'step_time': step_time,
+                    'stages': stages
+                }
+                results.append(record)
+                print('{sensor:<16}wavelengths={num_wavelengths:<3}{loss_type:<10}n_jobs={n_jobs:<4}'
+                      '{step_time:>10.3f} [sec]'.format(**record))
+                for name in self.stage_names:
+                    print('    {:<28}{:>6d} calls {:>10.3f} [sec]'.format(
+                        name, stages[name]['calls'], stages[name]['time']))
+        return results
+
+    def compare(self, results, baseline):
+        """
+        Compare results to a baseline and flag step time regressions.
+
+        Parameters
+        ----------
+        results: list
+            The current result records.
+        baseline: dict
+            A previous benchmark output (with metadata and results).
+
+        Returns
+        -------
+        regressions: list
+            A list of (record, baseline record, relative change) of the regressions.
+        """
+        key = lambda record: (record['sensor'], record['num_wavelengths'], record['loss_type'], record['n_jobs'])
+        baseline_results = {key(record): record for record in baseline['results']}
+        regressions = []
+        print('Comparison to commit {}:'.format(baseline['metadata'].get('commit')))
+        for record in results:
+            if key(record) not in baseline_results:
+                continue
+            baseline_record = baseline_results[key(record)]
+            change = record['step_time'] / baseline_record['step_time'] - 1.0
+            regression = change > self.args.threshold
+            if regression:
+                regressions.append((record, baseline_record, change))
+            stage_changes = ['{}:{:+.0%}'.format(name, record['stages'][name]['time'] /
+                                                 baseline_record['stages'][name]['time'] - 1.0)
+                             for name in self.stage_names if baseline_record['stages'][name]['time'] > 0.0]
+            print('{:<16}wavelengths={:<3}{:<10}n_jobs={:<4}{:>+8.1%} {:<12}{}'.format(
+                record['sensor'], record['num_wavelengths'], record['loss_type'], record['n_jobs'], change,
+                'REGRESSION' if regression else '', ' '.join(stage_changes)))
+        return regressions
+
+    def main(self):
+        """
+        Main benchmark script.
+        """
+        self.parse_arguments()
+        output = {'metadata': self.metadata(), 'results': self.run()}
+
+        if self.args.compare is not None:
+            with open(self.args.compare, 'r') as f:
+                baseline = json.load(f)
+            regressions = self.compare(output['results'], baseline)
+            output['comparison'] = {
+                'baseline_commit': baseline['metadata'].get('commit'),
+                'threshold': self.args.threshold,
+                'regressions': [{'sensor': record['sensor'], 'num_wavelengths': record['num_wavelengths'],
+                                 'loss_type': record['loss_type'], 'n_jobs': record['n_jobs'], 'change': change}
+                                for record, _, change in regressions]
+            }
+
+        output_dir = os.path.dirname(self.args.output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(self.args.output_path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+        if self.args.compare is not None and output['comparison']['regressions']:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark = GradientBenchmark()
+    benchmark.main()
@@ -0,0 +1,337 @@
+import os, sys, time, json, socket, platform, argparse, subprocess, itertools
+import numpy as np
+import shdom
+
+
+class RenderBenchmark(object):
+    """
+    Benchmark: Render throughput
+    ----------------------------
+    A reproducible benchmark of the rendering throughput (pixels/sec) of Camera.render.
+    Scenes are generated with the Homogeneous, StochasticCloud and LesFile generators at several grid sizes and solved once.
+    Each solved scene is rendered with Orthographic, Perspective, Hemispheric and MultiView projections across n_jobs values.
+
+    The results are written as JSON. A previous result file can be passed with the --compare flag to flag
+    throughput regressions (e.g. between two commits).
+
+    For example usage see the README.md
+
+    For information about the command line flags see:
+      python scripts/benchmark_render.py --help
+    """
+    def __init__(self):
+        self.sensor = shdom.RadianceSensor()
+
+    def parse_arguments(self):
+        """
+        Handle all the argument parsing needed for this script.
+        """
+        parser = argparse.ArgumentParser()
+        parser.add_argument('output_path',
+                            help='Path to the output JSON file with the benchmark results.')
+        parser.add_argument('--compare',
+                            default=None,
+                            help='(default value: %(default)s) Path to a previous JSON result file. \
+                            Results with a throughput drop larger than the threshold are flagged as regressions.')
+        parser.add_argument('--threshold',
+                            default=0.1,
+                            type=float,
+                            help='(default value: %(default)s) Relative throughput drop flagged as a regression.')
+        parser.add_argument('--wavelength',
+                            default=0.672,
+                            type=np.float32,
+                            help='(default value: %(default)s) Wavelength [micron].')
+        parser.add_argument('--mie_base_path',
+                            default='mie_tables/polydisperse/Water_<wavelength>nm.scat',
+                            help='(default value: %(default)s) Mie table base file name. '\
+                                 '<wavelength> will be replaced by the corresponding wavelengths.')
+        parser.add_argument('--generators',
+                            default=['Homogeneous', 'StochasticCloud', 'LesFile'],
+                            nargs='+',
+                            help='(default value: %(default)s) The scene generators.')
+        parser.add_argument('--grid_sizes',
+                            default=[16, 32],
+                            nargs='+',
+                            type=int,
+                            help='(default value: %(default)s) Number of grid cells in each axis (Homogeneous and StochasticCloud).')
+        parser.add_argument('--les_path',
+                            default='synthetic_cloud_fields/jpl_les/rico32x37x26.txt',
+                            help='(default value: %(default)s) Path to the LES file of the LesFile generator.')
+        parser.add_argument('--projections',
+                            default=['Orthographic', 'Perspective', 'Hemispheric', 'MultiView'],
+                            nargs='+',
+                            help='(default value: %(default)s) The projection types.')
+        parser.add_argument('--n_jobs',
+                            default=[1, 2, 4],
+                            nargs='+',
+                            type=int,
+                            help='(default value: %(default)s) Number of jobs for parallel rendering.')
+        parser.add_argument('--repeats',
+                            default=3,
+                            type=int,
+                            help='(default value: %(default)s) Number of repeated renders. The fastest render is reported.')
+        parser.add_argument('--seed',
+                            default=0,
+                            type=int,
+                            help='(default value: %(default)s) Random seed for the stochastic scenes.')
+        parser.add_argument('--pixel_resolution',
+                            default=0.02,
+                            type=float,
+                            help='(default value: %(default)s) Orthographic pixel resolution [km].')
+        parser.add_argument('--perspective_pixels',
+                            default=64,
+                            type=int,
+                            help='(default value: %(default)s) Number of Perspective pixels in each axis.')
+        parser.add_argument('--num_mu',
+                            default=8,
+                            type=int,
+                            help='(default value: %(default)s) The number of discrete ordinates in the zenith direction.')
+        parser.add_argument('--num_phi',
+                            default=16,
+                            type=int,
+                            help='(default value: %(default)s) The number of discrete ordinates in the azimuthal direction.')
+        parser.add_argument('--maxiter',
+                            default=100,
+                            type=int,
+                            help='(default value: %(default)s) Maximum number of solution iterations.')
+        self.args = parser.parse_args()
+
+    def get_generator(self, name, grid_size):
+        """
+        Initialize a cloud generator with its default arguments.
+
+        Parameters
+        ----------
+        name: str
+            The generator name (see shdom/generate.py).
+        grid_size: int
+            The number of grid cells in each axis (ignored by LesFile).
+
+        Returns
+        -------
+        generator: shdom.Generate.CloudGenerator
+            The cloud generator with a loaded Mie table.
+        """
+        CloudGenerator = getattr(shdom.Generate, name)
+        parser = CloudGenerator.update_parser(argparse.ArgumentParser())
+        if name == 'LesFile':
+            generator_args = ['--path', self.args.les_path]
+        else:
+            generator_args = ['--nx', str(grid_size), '--ny', str(grid_size), '--nz', str(grid_size)]
+        np.random.seed(self.args.seed)
+        generator = CloudGenerator(parser.parse_args(generator_args))
+        generator.add_mie(self.args.mie_base_path.replace(
+            '<wavelength>', '{}'.format(shdom.int_round(self.args.wavelength))))
+        return generator
+
+    def scenes(self):
+        """
+        A generator of the benchmark scenes.
+
+        Yields
+        ------
+        name: str
+            The scene name.
+        medium: shdom.Medium
+            The atmospheric medium.
+        """
+        for generator_name in self.args.generators:
+            grid_sizes = [None] if generator_name == 'LesFile' else self.args.grid_sizes
+            for grid_size in grid_sizes:
+                generator = self.get_generator(generator_name, grid_size)
+                cloud = generator.get_scatterer()
+                medium = shdom.Medium()
+                medium.set_grid(cloud.grid)
+                medium.add_scatterer(cloud, 'cloud')
+                name = generator_name if grid_size is None else '{}{}'.format(generator_name, grid_size)
+                yield name, medium
+
+    def get_solver(self, medium):
+        """
+        Define and solve an RteSolver.
+
+        Parameters
+        ----------
+        medium: shdom.Medium
+            The atmospheric Medium for which the RTE is solved
+
+        Returns
+        -------
+        rte_solver: shdom.RteSolver
+            The solved solver.
+        solve_time: float
+            The solution time [sec].
+        """
+        scene_params = shdom.SceneParameters(
+            wavelength=self.args.wavelength,
+            source=shdom.SolarSource(azimuth=0.0, zenith=165.0)
+        )
+        numerical_params = shdom.NumericalParameters(num_mu_bins=self.args.num_mu, num_phi_bins=self.args.num_phi)
+        rte_solver = shdom.RteSolver(scene_params, numerical_params)
+        rte_solver.set_medium(medium)
+        start_time = time.time()
+        rte_solver.solve(maxiter=self.args.maxiter, verbose=False)
+        return rte_solver, time.time() - start_time
+
+    def get_projection(self, name, bounding_box):
+        """
+        Define a projection which views the medium.
+
+        Parameters
+        ----------
+        name: 'Orthographic', 'Perspective', 'Hemispheric' or 'MultiView'
+            The projection type.
+        bounding_box: shdom.BoundingBox
+            The medium bounding box.
+
+        Returns
+        -------
+        projection: shdom.Projection
+            The projection.
+        """
+        center = [0.5 * (bounding_box.xmin + bounding_box.xmax), 0.5 * (bounding_box.ymin + bounding_box.ymax)]
+        if name == 'Orthographic':
+            projection = shdom.OrthographicProjection(
+                bounding_box, self.args.pixel_resolution, self.args.pixel_resolution, azimuth=0.0, zenith=0.0)
+        elif name == 'Perspective':
+            projection = shdom.PerspectiveProjection(
+                fov=60.0, nx=self.args.perspective_pixels, ny=self.args.perspective_pixels,
+                x=center[0], y=center[1], z=bounding_box.zmax + 2.0)
+            projection.look_at_transform(point=[center[0], center[1], bounding_box.zmin], up=[0.0, 1.0, 0.0])
+        elif name == 'Hemispheric':
+            projection = shdom.HemisphericProjection(x=center[0], y=center[1], z=bounding_box.zmax, resolution=2.0)
+        elif name == 'MultiView':
+            projection = shdom.MultiViewProjection()
+            for azimuth, zenith in zip([90, 90, 0, -90, -90], [60.0, 26.1, 0.0, 26.1, 60.0]):
+                projection.add_projection(shdom.OrthographicProjection(
+                    bounding_box, self.args.pixel_resolution, self.args.pixel_resolution, azimuth, zenith))
+        else:
+            raise NotImplementedError('Projection [{}] not implemented'.format(name))
+        return projection
+
+    def metadata(self):
+        """
+        Metadata which identifies the benchmark run.
+
+        Returns
+        -------
+        metadata: dict
+            The commit, host, platform, package versions and arguments of the run.
+        """
+        try:
+            commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                             cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+        except (subprocess.CalledProcessError, OSError):
+            commit = None
+        metadata = {
+            'commit': commit,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': socket.gethostname(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'args': {key: value if not isinstance(value, np.floating) else float(value)
+                     for key, value in vars(self.args).items()}
+        }
+        return metadata
+
+    def run(self):
+        """
+        Run the benchmark.
+
+        Returns
+        -------
+        results: list
+            A list of result records (dict) for every scene, projection and n_jobs.
+        """
+        results = []
+        for scene, medium in self.scenes():
+            rte_solver, solve_time = self.get_solver(medium)
+            print('{}: solved in {:.1f} [sec] ({} grid points)'.format(scene, solve_time, rte_solver._npts))
+            bounding_box = medium.get_scatterer('cloud').bounding_box
+            for projection_name, n_jobs in itertools.product(self.args.projections, self.args.n_jobs):
+                camera = shdom.Camera(self.sensor, self.get_projection(projection_name, bounding_box))
+                npix = int(np.sum(camera.projection.npix))
+                render_times = []
+                for i in range(self.args.repeats):
+                    start_time = time.time()
+                    camera.render(rte_solver, n_jobs=n_jobs)
+                    render_times.append(time.time() - start_time)
+                record = {
+                    'scene': scene,
+                    'projection': projection_name,
+                    'n_jobs': n_jobs,
+                    'npix': npix,
+                    'npts': int(rte_solver._npts),
+                    'solve_time': solve_time,
+                    'render_time': min(render_times),
+                    'pixels_per_sec': npix / min(render_times)
+                }
+                results.append(record)
+                print('{scene:<24}{projection:<16}n_jobs={n_jobs:<4}{npix:>10} pixels {pixels_per_sec:>14.1f} pixels/sec'.format(**record))
+        return results
+
+    def compare(self, results, baseline):
+        """
+        Compare results to a baseline and flag throughput regressions.
+
+        Parameters
+        ----------
+        results: list
+            The current result records.
+        baseline: dict
+            A previous benchmark output (with metadata and results).
+
+        Returns
+        -------
+        regressions: list
+            A list of (record, baseline record, relative change) of the regressions.
+        """
+        key = lambda record: (record['scene'], record['projection'], record['n_jobs'])
+        baseline_results = {key(record): record for record in baseline['results']}
+        regressions = []
+        print('Comparison to commit {}:'.format(baseline['metadata'].get('commit')))
+        for record in results:
+            if key(record) not in baseline_results:
+                continue
+            baseline_record = baseline_results[key(record)]
+            change = record['pixels_per_sec'] / baseline_record['pixels_per_sec'] - 1.0
+            regression = change < -self.args.threshold
+            if regression:
+                regressions.append((record, baseline_record, change))
+            print('{:<24}{:<16}n_jobs={:<4}{:>+8.1%} {}'.format(
+                record['scene'], record['projection'], record['n_jobs'], change, 'REGRESSION' if regression else ''))
+        return regressions
+
+    def main(self):
+        """
+        Main benchmark script.
+        """
+        self.parse_arguments()
+        output = {'metadata': self.metadata(), 'results': self.run()}
+
+        if self.args.compare is not None:
+            with open(self.args.compare, 'r') as f:
+                baseline = json.load(f)
+            regressions = self.compare(output['results'], baseline)
+            output['comparison'] = {
+                'baseline_commit': baseline['metadata'].get('commit'),
+                'threshold': self.args.threshold,
+                'regressions': [{'scene': record['scene'], 'projection': record['projection'],
+                                 'n_jobs': record['n_jobs'], 'change': change} for record, _, change in regressions]
+            }
+
+        output_dir = os.path.dirname(self.args.output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        with open(self.args.output_path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+        if self.args.compare is not None and output['comparison']['regressions']:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark = RenderBenchmark()
+    benchmark.main()
@@ -100,6 +100,10 @@ class OptimizationScript(object):
                             default=[1.0, 0.0, 0.0, 0.0],
                             type=float,
                             help='(default value: %(default)s) Loss function weights for stokes vector components [I, Q, U, V]')
+        parser.add_argument('--inexact_solve',
+                            action='store_true',
+                            help='Relax the SHDOM solution and splitting accuracies in early iterations and tighten them '
+                                 'as the projected gradient shrinks. See shdom.SolutionAccuracySchedule for more info.')
         parser.add_argument('--loss_type',
                             choices=['l2', 'normcorr'],
                             default='l2',
@@ -294,6 +298,8 @@ class OptimizationScript(object):
             writer.save_checkpoints(ckpt_period=20 * 60)
             writer.monitor_loss()
             writer.monitor_shdom_iterations()
+            if self.args.inexact_solve:
+                writer.monitor_solution_accuracy()
             writer.monitor_images(measurements=measurements, ckpt_period=5 * 60)
 
             # Compare estimator to ground-truth
@@ -370,6 +376,8 @@ class OptimizationScript(object):
         optimizer.set_rte_solver(rte_solver)
         optimizer.set_medium_estimator(medium_estimator)
         optimizer.set_writer(writer)
+        if self.args.inexact_solve:
+            optimizer.set_accuracy_schedule(shdom.SolutionAccuracySchedule())
 
         # Reload previous state
         if self.args.reload_path is not None:
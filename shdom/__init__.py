@@ -643,6 +643,7 @@ from shdom.phase import *
 from shdom.medium import *
 from shdom.sensor import *
 from shdom.rte_solver import *
+from shdom.profiling import *
 from shdom.optimize import *
 from shdom.dynamic_scene import *
 from shdom.AirMSPI import *
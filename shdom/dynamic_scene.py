@@ -635,7 +635,25 @@ class DynamicRteSolver(object):
         assert np.allclose(wavelength, self.wavelength)
         assert dynamic_medium.num_mediums == self.num_solver_arrays
         for solver_array, medium in zip(self.solver_array_list, dynamic_medium.medium_list):
-            solver_array.set_medium(medium)
+            solver_array.update_medium(medium)
+
+    def set_accuracy_relaxation(self, solution_factor=1.0, split_factor=1.0):
+        """
+        Relax the solution and adaptive cell splitting accuracies of all the solver arrays (all time samples).
+
+        Parameters
+        ----------
+        solution_factor: float, default=1.0
+            A multiplicative factor for the solution accuracy of each solver.
+        split_factor: float, default=1.0
+            A multiplicative factor for the cell splitting accuracy of each solver.
+
+        Notes
+        -----
+        See RteSolver.set_accuracy_relaxation for more details.
+        """
+        for solver_array in self.solver_array_list:
+            solver_array.set_accuracy_relaxation(solution_factor, split_factor)
 
     def get_param_dict(self):
         """
@@ -701,7 +719,7 @@ class DynamicRteSolver(object):
                 delayed(solver_array.init_solution, check_pickle=False)()
                 for solver_array in self.solver_array_list)
 
-    def solve(self, maxiter, init_solution=False, verbose=False):
+    def solve(self, maxiter, init_solution=False, verbose=False, backend='threading', n_jobs=None):
         """
         Parallel solving of all solvers.
 
@@ -718,14 +736,26 @@ class DynamicRteSolver(object):
             If True or no prior solution (I,J fields) exists then an initialization is preformed (part 1.).
         verbose: boolean
             True will output solution iteration information into stdout.
-        """
-        # for solver in self.solver_array_list:
-        #     if init_solution or solver.num_iterations == 0:
-        #         solver.init_solution()
-
-        Parallel(n_jobs=self.num_solver_arrays, backend="threading")(
-                delayed(solver_array.solve, check_pickle=False)(
-                    maxiter, init_solution=init_solution, verbose=verbose) for solver_array in self.solver_array_list)
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel execution backend. With process backends all the solvers (of all the solver arrays)
+            are distributed amongst a single pool of workers (see shdom.parallel_solution_iterations).
+        n_jobs: int, optional
+            The number of parallel workers for the process backends. Default is one worker per solver.
+        """
+        if backend == 'threading':
+            Parallel(n_jobs=self.num_solver_arrays, backend="threading")(
+                    delayed(solver_array.solve, check_pickle=False)(
+                        maxiter, init_solution=init_solution, verbose=verbose) for solver_array in self.solver_array_list)
+        else:
+            rte_solvers = []
+            for solver_array in self.solver_array_list:
+                for solver in solver_array:
+                    if init_solution or solver.num_iterations == 0:
+                        solver.init_solution()
+                    rte_solvers.append(solver)
+            shdom.parallel_solution_iterations(rte_solvers, maxiter, verbose, backend, n_jobs)
+            for solver_array in self.solver_array_list:
+                solver_array._maxiters = max([solver._iters for solver in solver_array])
         #
         # for solver, arguments in zip(self.solver_list, output_arguments):
         #     solver.update_solution_arguments(arguments)
@@ -800,7 +830,7 @@ class DynamicRteSolver(object):
     #             self._num_solvers += 1
 
 
-class DynamicProjection(shdom.Projection):
+class DynamicProjection(shdom.ConcatenatedProjection):
     """
     A MultiViewProjection object encapsulate several projection geometries for multi-view imaging of a domain.
 
@@ -808,6 +838,10 @@ class DynamicProjection(shdom.Projection):
     ----------
     projection_list: list, optional
         A list of Sensor objects
+
+    Notes
+    -----
+    The flattened pixel arrays are materialized lazily from the viewed medium projections (see shdom.ConcatenatedProjection).
     """
     def __init__(self, projection_list=None):
         super().__init__()
@@ -833,18 +867,11 @@ class DynamicProjection(shdom.Projection):
         if name is None:
             name = 'Viewed_Medium_Projections{}'.format(self.num_viewed_medium)
 
-        attributes = ['x', 'y', 'z', 'mu', 'phi']
-
         if self._num_viewed_medium == 0:
-            for attr in attributes:
-                self.__setattr__('_' + attr, projection.__getattribute__(attr))
             self._npix = [projection.npix]
             self._resolution = [projection.resolution]
             self._names = [name]
         else:
-            for attr in attributes:
-                self.__setattr__('_' + attr, np.concatenate((self.__getattribute__(attr),
-                                                             projection.__getattribute__(attr))))
             self._npix.append(projection.npix)
             self._names.append(name)
             self._resolution.append(projection.resolution)
@@ -853,12 +880,19 @@ class DynamicProjection(shdom.Projection):
         self._multiview_projection_list.append(projection)
         self._num_viewed_medium += 1
 
+        # Invalidate the flattened arrays
+        self._x = None
+
     def get_flatten_projections(self):
         projection_list = []
         for multiview_projection in self.multiview_projection_list:
             projection_list += multiview_projection.projection_list
         return projection_list
 
+    @property
+    def views(self):
+        return self._multiview_projection_list
+
     @property
     def multiview_projection_list(self):
         return self._multiview_projection_list
@@ -1757,6 +1791,8 @@ class DynamicMediumEstimator(object):
         self._num_mediums = 0
         self._medium_list = []
         self._time_list = []
+        # The direct derivative paths are shared between time steps with identical geometry
+        direct_derivative_cache = shdom.DirectDerivativeCache()
         # temporary_scatterer_list = dynamic_scatterer_estimator.temporary_scatterer_list
         for temporary_scatterer, time in zip(dynamic_scatterer_estimator.temporary_scatterer_estimator_list, dynamic_scatterer_estimator.time_list):
             scatterer = temporary_scatterer.get_scatterer()
@@ -1771,6 +1807,7 @@ class DynamicMediumEstimator(object):
             medium = shdom.MediumEstimator(grid=medium_grid, loss_type=loss_type, exact_single_scatter=exact_single_scatter, stokes_weights=stokes_weights)
             medium.add_scatterer(scatterer, name='cloud')
             medium.add_scatterer(air, name='air')
+            medium.set_direct_derivative_cache(direct_derivative_cache)
             self._medium_list.append(medium)
             self._num_mediums += 1
             self._time_list.append(time)
@@ -1959,11 +1996,26 @@ class DynamicLocalOptimizer(object):
         self._cv_rte_solver = None
         self._cv_measurement = None
         self._cv_loss = None
+        self._accuracy_schedule = None
         if method not in ['L-BFGS-B', 'TNC']:
             raise NotImplementedError('Optimization method [{}] not implemented'.format(method))
         self._method = method
         self._options = options
 
+    def set_accuracy_schedule(self, accuracy_schedule):
+        """
+        Set an inexact-solve schedule for the RTE solution accuracy.
+
+        Parameters
+        ----------
+        accuracy_schedule: shdom.SolutionAccuracySchedule
+            The schedule which relaxes the solution and splitting accuracies according to the optimization progress.
+            None restores the solver numerical parameters.
+        """
+        self._accuracy_schedule = accuracy_schedule
+        if accuracy_schedule is None and self.rte_solver is not None:
+            self.rte_solver.set_accuracy_relaxation()
+
     def set_measurements(self, measurements):
         """
         Set the measurements (data-fit constraints)
@@ -2038,6 +2090,8 @@ class DynamicLocalOptimizer(object):
             n_jobs=self.n_jobs,
             regularization_const=self._regularization_const
         )
+        if self.accuracy_schedule is not None:
+            self.accuracy_schedule.update(state, gradient, self.get_bounds())
         self._loss = loss
         self._images = images
         return sum(loss), gradient
@@ -2128,6 +2182,7 @@ class DynamicLocalOptimizer(object):
           2. Updating the RteSolver medium
           3. Computing the direct solar flux
           4. Computing the current RTE solution with the previous solution as an initialization
+          5. Updating the direct solar beam derivative paths (only new adaptive grid points are traced)
 
         Returns
         -------
@@ -2138,7 +2193,10 @@ class DynamicLocalOptimizer(object):
         self.rte_solver.replace_dynamic_medium(self.medium)
         if self._init_solution is False:
             self.rte_solver.make_direct()
+        if self.accuracy_schedule is not None:
+            self.rte_solver.set_accuracy_relaxation(self.accuracy_schedule.solution_factor, self.accuracy_schedule.split_factor)
         self.rte_solver.solve(maxiter=100, init_solution=self._init_solution, verbose=False)
+        self.medium.compute_direct_derivative(self.rte_solver)
 
     def save_state(self, path):
         """
@@ -2278,6 +2336,10 @@ class DynamicLocalOptimizer(object):
     def cv_loss(self):
         return self._cv_loss
 
+    @property
+    def accuracy_schedule(self):
+        return self._accuracy_schedule
+
 class DynamicSummaryWriter(object):
     """
     A wrapper for tensorboardX summarywriter with some basic summary writing implementation.
@@ -2403,6 +2465,22 @@ class DynamicSummaryWriter(object):
         }
         self.add_callback_fn(self.shdom_iterations_cbfn, kwargs)
 
+    def monitor_solution_accuracy(self, ckpt_period=-1):
+        """
+        Monitor the RTE solution and splitting accuracies chosen by the optimizer accuracy schedule (see shdom.SolutionAccuracySchedule).
+
+        Parameters
+        ----------
+        ckpt_period: float
+           time [seconds] between updates. setting ckpt_period=-1 will log at every iteration.
+        """
+        kwargs = {
+            'ckpt_period': ckpt_period,
+            'ckpt_time': time.time(),
+            'title': ['solution accuracy', 'split accuracy', 'projected gradient norm']
+        }
+        self.add_callback_fn(self.solution_accuracy_cbfn, kwargs)
+
     def monitor_scatterer_error(self, estimator_name, ground_truth, ckpt_period=-1):
         """
         Monitor relative and overall mass error (epsilon, delta) as defined at:
@@ -2630,6 +2708,22 @@ class DynamicSummaryWriter(object):
         """
         self.tf_writer.add_scalar(kwargs['title'], self.optimizer.rte_solver.num_iterations, self.optimizer.iteration)
 
+    def solution_accuracy_cbfn(self, kwargs):
+        """
+        Callback function that is called (every optimizer iteration) for solution accuracy monitoring.
+
+        Parameters
+        ----------
+        kwargs: dict,
+            keyword arguments
+        """
+        solver = self.optimizer.rte_solver.solver_array_list[0].solver_list[0]
+        self.tf_writer.add_scalar(kwargs['title'][0], solver.solution_accuracy, self.optimizer.iteration)
+        self.tf_writer.add_scalar(kwargs['title'][1], solver.split_accuracy, self.optimizer.iteration)
+        schedule = self.optimizer.accuracy_schedule
+        if schedule is not None and schedule.pg_norm is not None:
+            self.tf_writer.add_scalar(kwargs['title'][2], schedule.pg_norm, self.optimizer.iteration)
+
     def scatterer_error_cbfn(self, kwargs):
         """
         Callback function for monitoring parameter error measures.
@@ -2,8 +2,8 @@
 Optimization and related objects to monitor and log the optimization process.
 """
 import numpy as np
-import time, os, copy, shutil
-from scipy.optimize import minimize
+import time, os, copy, shutil, threading
+from scipy.optimize import minimize, OptimizeResult
 from scipy.optimize import basinhopping
 import shdom
 from shdom import GridData, core, float_round
@@ -11,6 +11,7 @@ import dill as pickle
 import itertools
 from joblib import Parallel, delayed
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import tensorboardX as tb
 import matplotlib.pyplot as plt
 import warnings
@@ -100,6 +101,7 @@ class GridDataEstimator(shdom.GridData):
         self._min_bound = min_bound
         self._max_bound = max_bound
         self._mask = None
+        self._dirty_mask = None
         self._num_parameters = self.init_num_parameters()
         self._precondition_scale_factor = precondition_scale_factor
               
@@ -116,11 +118,16 @@ class GridDataEstimator(shdom.GridData):
         -----
         The state is scaled back by the preconditioning scale factor
         If the estimator has a mask, data point outside of the mask are left uneffected.
+        The data points which changed are recorded in the dirty_mask.
         """
         state = state / self.precondition_scale_factor
         if self.mask is None:
-            self._data = np.reshape(state, self.shape)
+            data = np.reshape(state, self.shape)
+            self._dirty_mask = data != self._data if data.shape == self._data.shape else None
+            self._data = data
         else:
+            self._dirty_mask = np.zeros(self.shape, dtype=bool)
+            self._dirty_mask[self.mask.data] = self._data[self.mask.data] != state.astype(self._data.dtype)
             self._data[self.mask.data] = state
 
     def get_state(self):
@@ -173,6 +180,7 @@ class GridDataEstimator(shdom.GridData):
         """
         self._mask = mask.resample(self.grid, method='nearest')
         self._num_parameters = self.init_num_parameters()
+        self._dirty_mask = None
         super().apply_mask(self.mask)
 
     def get_bounds(self):
@@ -214,6 +222,13 @@ class GridDataEstimator(shdom.GridData):
     @property
     def mask(self):
         return self._mask
+
+    @property
+    def dirty_mask(self):
+        """
+        A boolean array of the data points which changed by the last set_state (None if unknown i.e. all points may have changed).
+        """
+        return self._dirty_mask
     
     @property
     def precondition_scale_factor(self):
@@ -244,6 +259,7 @@ class ScattererEstimator(object):
         self._derivatives = self.init_derivatives()
         self._num_parameters = self.init_num_parameters()
         self._num_estimators = len(self.estimators)
+        self._state_version = 0
 
     def init_estimators(self):
         """
@@ -303,7 +319,30 @@ class ScattererEstimator(object):
         for estimator in self.estimators.values():
             estimator.set_mask(mask)
         self._num_parameters = self.init_num_parameters()
+        self._state_version = self.state_version + 1
        
+    def get_dirty_mask(self, grid):
+        """
+        Retrieve the data points which changed by the last set_state.
+
+        Parameters
+        ----------
+        grid: shdom.Grid
+            The grid of the dirty mask.
+
+        Returns
+        -------
+        dirty_mask: np.array(dtype=bool) or None
+            A boolean array on the grid, None if any of the internal estimators is not defined on the grid or has no record of its changes.
+        """
+        dirty_mask = np.zeros(shape=(grid.nx, grid.ny, grid.nz), dtype=bool)
+        for estimator in self.estimators.values():
+            estimator_mask = getattr(estimator, 'dirty_mask', None)
+            if estimator_mask is None or not estimator.grid == grid:
+                return None
+            dirty_mask |= estimator_mask
+        return dirty_mask
+
     def set_state(self, state):
         """
         Set the estimator state by setting all the internal estimators states.
@@ -314,8 +353,34 @@ class ScattererEstimator(object):
             The combined state of all the internal estimators
         """
         states = np.split(state, np.cumsum(self.num_parameters[:-1]))
+        changed = False
         for estimator, state in zip(self.estimators.values(), states):
-            estimator.set_state(state)        
+            estimator.set_state(state)
+            dirty_mask = getattr(estimator, 'dirty_mask', None)
+            changed |= dirty_mask is None or bool(np.any(dirty_mask))
+        if changed:
+            self._state_version = self.state_version + 1
+
+    def derivative_depends_on_state(self, derivative_type):
+        """
+        Does a derivative depend on the estimator state.
+        Derivatives which do not depend on the state are cached across iterations by the MediumEstimator.
+
+        Parameters
+        ----------
+        derivative_type: str
+            The derivative type (a key of the derivatives dictionary).
+
+        Returns
+        -------
+        depends: bool
+            True if the derivative changes with the state.
+
+        Notes
+        -----
+        This is a conservative default (True) that is overwritten by inheritance.
+        """
+        return True
 
     def get_state(self):
         """
@@ -382,6 +447,13 @@ class ScattererEstimator(object):
     def mask(self):
         return self._mask
 
+    @property
+    def state_version(self):
+        """
+        A counter which is incremented whenever the estimator state changes.
+        """
+        return getattr(self, '_state_version', 0)
+
     
 class OpticalScattererEstimator(shdom.OpticalScatterer, ScattererEstimator):
     """
@@ -532,6 +604,22 @@ class OpticalScattererEstimator(shdom.OpticalScatterer, ScattererEstimator):
         else:
             raise AttributeError('derivative type {} not supported'.format(derivative_type))
         return derivative
+
+    def derivative_depends_on_state(self, derivative_type):
+        """
+        Does a derivative depend on the estimator state.
+
+        Parameters
+        ----------
+        derivative_type: str
+            'extinction', 'albedo' or 'phase'
+
+        Returns
+        -------
+        depends: bool
+            False, the optical derivatives with respect to the optical parameters are indicator functions.
+        """
+        return False
         
         
 class MicrophysicalScattererEstimator(shdom.MicrophysicalScatterer, ScattererEstimator):
@@ -732,6 +820,683 @@ class MicrophysicalScattererEstimator(shdom.MicrophysicalScatterer, ScattererEst
             raise AttributeError('derivative type {} not supported'.format(derivative_type))
         return derivative
 
+    def derivative_depends_on_state(self, derivative_type):
+        """
+        Does a derivative depend on the estimator state.
+
+        Parameters
+        ----------
+        derivative_type: str
+            'lwc', 'reff' or 'veff'
+
+        Returns
+        -------
+        depends: bool
+            True if the derivative changes with the state.
+
+        Notes
+        -----
+        The lwc derivative depends only on reff and veff, therefore it is constant if these are not estimated.
+        """
+        if derivative_type == 'lwc':
+            return 'reff' in self.estimators or 'veff' in self.estimators
+        return True
+
+
+class DirectDerivativeCache(object):
+    """
+    A cache of the direct solar beam derivative paths (see MediumEstimator.compute_direct_derivative).
+    The paths are purely geometric: they depend only on the property grid, boundary conditions, solar direction
+    and the positions of the (adaptive) grid points. Entries are keyed on the geometry, and the grid points of a request
+    are matched against the cached grid points: the paths of the leading matching points are reused and only
+    the remaining points (e.g. newly split adaptive grid points) are traced.
+
+    Parameters
+    ----------
+    max_bytes: int, default=1GB
+        The maximum total size of the cached paths. The least recently used entries are evicted beyond this size
+        (the most recent entry is always kept).
+
+    Notes
+    -----
+    A single cache can be shared by several MediumEstimators (e.g. the solvers of a DynamicRteSolver) with identical geometry.
+    The cache is thread-safe. Its contents are not pickled.
+    """
+    def __init__(self, max_bytes=1024**3):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __getstate__(self):
+        return {'_max_bytes': self._max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['_max_bytes'])
+
+    def clear(self):
+        """
+        Remove all the cached paths and reset the statistics.
+        """
+        self._entries = []
+        self._traced_points = 0
+        self._reused_points = 0
+
+    @staticmethod
+    def geometry_key(rte_solver, uniformzlev):
+        """
+        The geometry on which the direct beam paths depend.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            The RteSolver object
+        uniformzlev: float
+            The uniform z level.
+
+        Returns
+        -------
+        key: tuple
+            A hashable key of the property grid, boundary conditions and solar direction.
+        """
+        pa = rte_solver._pa
+        return (int(rte_solver._bcflag), int(rte_solver._ipdirect), int(rte_solver._di), int(rte_solver._dj),
+                int(rte_solver._dk), int(pa.npx), int(pa.npy), int(pa.npz), float(pa.delx), float(pa.dely),
+                float(pa.xstart), float(pa.ystart), np.asarray(pa.zlevels, dtype=np.float32).tobytes(),
+                float(rte_solver._epss), float(rte_solver._epsz), float(rte_solver._xdomain), float(rte_solver._ydomain),
+                float(rte_solver._cx), float(rte_solver._cy), float(rte_solver._cz), float(rte_solver._cxinv),
+                float(rte_solver._cyinv), float(rte_solver._czinv), float(uniformzlev),
+                float(rte_solver._delxd), float(rte_solver._delyd))
+
+    @staticmethod
+    def trace(rte_solver, uniformzlev, gridpos):
+        """
+        Trace the direct beam paths to grid points.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            The RteSolver object
+        uniformzlev: float
+            The uniform z level.
+        gridpos: np.array(shape=(3, npts), dtype=np.float32)
+            The grid point positions.
+
+        Returns
+        -------
+        path: np.array(dtype=np.float32)
+            The path lengths traversed in each property grid cell (one column per point).
+        ptr: np.array(dtype=np.int32)
+            The corresponding property grid point indices.
+        """
+        return core.make_direct_derivative(
+            npts=gridpos.shape[1],
+            bcflag=rte_solver._bcflag,
+            gridpos=np.asfortranarray(gridpos),
+            npx=rte_solver._pa.npx,
+            npy=rte_solver._pa.npy,
+            npz=rte_solver._pa.npz,
+            delx=rte_solver._pa.delx,
+            dely=rte_solver._pa.dely,
+            xstart=rte_solver._pa.xstart,
+            ystart=rte_solver._pa.ystart,
+            zlevels=rte_solver._pa.zlevels,
+            ipdirect=rte_solver._ipdirect,
+            di=rte_solver._di,
+            dj=rte_solver._dj,
+            dk=rte_solver._dk,
+            epss=rte_solver._epss,
+            epsz=rte_solver._epsz,
+            xdomain=rte_solver._xdomain,
+            ydomain=rte_solver._ydomain,
+            cx=rte_solver._cx,
+            cy=rte_solver._cy,
+            cz=rte_solver._cz,
+            cxinv=rte_solver._cxinv,
+            cyinv=rte_solver._cyinv,
+            czinv=rte_solver._czinv,
+            uniformzlev=uniformzlev,
+            delxd=rte_solver._delxd,
+            delyd=rte_solver._delyd
+        )
+
+    def get(self, rte_solver, uniformzlev):
+        """
+        Retrieve the direct beam paths to all the grid points of a solver.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            The RteSolver object
+        uniformzlev: float
+            The uniform z level.
+
+        Returns
+        -------
+        path: np.array(shape=(8*(npx+npy+npz), npts), dtype=np.float32)
+            The path lengths traversed in each property grid cell (one column per point).
+        ptr: np.array(shape=(8*(npx+npy+npz), npts), dtype=np.int32)
+            The corresponding property grid point indices.
+        """
+        key = self.geometry_key(rte_solver, uniformzlev)
+        gridpos = np.array(rte_solver._gridpos[:, :rte_solver._npts], dtype=np.float32)
+        npts = gridpos.shape[1]
+
+        # Find the cached entry with the longest matching sequence of leading grid points
+        with self._lock:
+            match, num_reused = None, 0
+            for entry in self._entries:
+                if entry['key'] != key:
+                    continue
+                num_points = min(npts, entry['gridpos'].shape[1])
+                equal = np.all(entry['gridpos'][:, :num_points] == gridpos[:, :num_points], axis=0)
+                num_matching = num_points if equal.all() else int(np.argmin(equal))
+                if match is None or num_matching > num_reused:
+                    match, num_reused = entry, num_matching
+
+        if num_reused == npts:
+            path, ptr = match['path'][:, :npts], match['ptr'][:, :npts]
+        else:
+            new_path, new_ptr = self.trace(rte_solver, uniformzlev, gridpos[:, num_reused:])
+            if num_reused == 0:
+                path, ptr = new_path, new_ptr
+            else:
+                path = np.empty((new_path.shape[0], npts), dtype=new_path.dtype, order='F')
+                ptr = np.empty((new_ptr.shape[0], npts), dtype=new_ptr.dtype, order='F')
+                path[:, :num_reused], path[:, num_reused:] = match['path'][:, :num_reused], new_path
+                ptr[:, :num_reused], ptr[:, num_reused:] = match['ptr'][:, :num_reused], new_ptr
+
+        with self._lock:
+            self._reused_points += num_reused
+            self._traced_points += npts - num_reused
+            # A matched entry is superseded if all its points are reused, otherwise it is kept as most recently used
+            superseded = match is not None and num_reused == match['gridpos'].shape[1]
+            if match is not None and match in self._entries:
+                self._entries.remove(match)
+                if not superseded:
+                    self._entries.append(match)
+            if superseded or num_reused < npts:
+                self._entries.append({'key': key, 'gridpos': gridpos, 'path': path, 'ptr': ptr,
+                                      'nbytes': gridpos.nbytes + path.nbytes + ptr.nbytes})
+            while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+                self._entries.pop(0)
+        return path, ptr
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def nbytes(self):
+        return sum([entry['nbytes'] for entry in self._entries])
+
+    @property
+    def num_entries(self):
+        return len(self._entries)
+
+    @property
+    def traced_points(self):
+        return self._traced_points
+
+    @property
+    def reused_points(self):
+        return self._reused_points
+
+
+class GradientAccumulator(object):
+    """
+    An accumulator of the grid gradients returned by MediumEstimator.core_grad.
+    Every worker (thread or executor slot) adds into its own buffers which are reduced once at the end,
+    therefore the gradient of every pixel chunk is released as soon as it is accumulated.
+    The memory is O(workers x grid) rather than O(chunks x grid).
+
+    Parameters
+    ----------
+    shapes: list of tuples
+        The shapes of the gradient outputs of MediumEstimator.core_grad (see MediumEstimator.gradient_shapes).
+    dtype: np.float64 or np.float32
+        The precision of the sum buffers. float32 halves the buffers memory: every chunk (float64) is added in float64
+        arithmetic and rounded once into the float32 sum.
+    compensated: bool, default=False
+        Kahan compensated summation for float32 sums. The rounding error of every chunk addition is computed in float64
+        and carried into the next addition by a float32 compensation buffer. This doubles the float32 memory
+        (the same as float64 buffers) and is only useful for accuracy experiments.
+
+    Notes
+    -----
+    A buffer is used by a single worker at a time, therefore add() is threadsafe when every thread uses its own key.
+    """
+    def __init__(self, shapes, dtype=np.float64, compensated=False):
+        self._dtype = np.dtype(dtype)
+        if self._dtype not in [np.dtype(np.float64), np.dtype(np.float32)]:
+            raise NotImplementedError('Accumulation dtype [{}] not implemented'.format(self._dtype))
+        self._compensated = compensated and self._dtype == np.float32
+        self._shapes = [tuple(shape) for shape in shapes]
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_buffers(self, key):
+        """
+        Retrieve (or allocate) the buffers of a worker.
+
+        Parameters
+        ----------
+        key: hashable
+            The worker key.
+
+        Returns
+        -------
+        buffers: list
+            A list of (sum, compensation) arrays for every gradient output. The compensation is None unless compensated.
+        """
+        with self._lock:
+            if key not in self._buffers:
+                self._buffers[key] = [
+                    (np.zeros(shape, dtype=self.dtype),
+                     np.zeros(shape, dtype=self.dtype) if self.compensated else None) for shape in self.shapes
+                ]
+            return self._buffers[key]
+
+    def add(self, gradients, key=None):
+        """
+        Add gradients into the worker buffers.
+
+        Parameters
+        ----------
+        gradients: list of np.arrays
+            The gradient outputs of MediumEstimator.core_grad.
+        key: hashable, optional
+            The worker key. Default is the calling thread identifier.
+        """
+        key = threading.get_ident() if key is None else key
+        for (total, compensation), gradient in zip(self.get_buffers(key), gradients):
+            if compensation is None:
+                total += gradient
+            else:
+                # Kahan summation in float64 arithmetic: the compensation holds the (negative) rounding error
+                # of the previous float32 sum
+                corrected = np.subtract(gradient, compensation, dtype=np.float64)
+                new_total = (total + corrected).astype(self.dtype)
+                compensation[...] = (new_total - total.astype(np.float64)) - corrected
+                total[...] = new_total
+
+    def reduce(self):
+        """
+        Reduce the buffers of all the workers.
+
+        Returns
+        -------
+        gradients: list of np.arrays(dtype=np.float64)
+            The accumulated gradient outputs.
+        """
+        gradients = [np.zeros(shape, dtype=np.float64) for shape in self.shapes]
+        with self._lock:
+            for buffers in self._buffers.values():
+                for gradient, (total, compensation) in zip(gradients, buffers):
+                    gradient += total
+                    if compensation is not None:
+                        gradient -= compensation
+        return gradients
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def compensated(self):
+        return self._compensated
+
+    @property
+    def shapes(self):
+        return self._shapes
+
+    @property
+    def num_gradients(self):
+        return len(self._shapes)
+
+    @property
+    def num_buffers(self):
+        return len(self._buffers)
+
+    @property
+    def nbytes(self):
+        return sum([total.nbytes + (0 if compensation is None else compensation.nbytes)
+                    for buffers in self._buffers.values() for total, compensation in buffers])
+
+
+class SharedGradientState(shdom.SharedSolverState):
+    """
+    A SharedGradientState places the MediumEstimator arrays used by the core gradient routines (the direct beam
+    derivative paths) in shared memory, together with a gradient accumulator and an image buffer which worker processes
+    write into (see GradientExecutor). The object itself is light-weight and can be pickled and sent to worker processes,
+    where attach() is used to rebuild a minimal MediumEstimator and attach to the shared buffers.
+
+    Parameters
+    ----------
+    medium_estimator: shdom.MediumEstimator
+        The medium estimator (with computed direct derivative paths, see MediumEstimator.compute_direct_derivative).
+    accumulator_shape: tuple
+        The shape of the gradient accumulator: (number of slots, number of gradient outputs, gradient size).
+    images_shape: tuple
+        The shape of the image buffer (the shape of the measurement pixels).
+    storage: 'shared_memory', 'memmap' or None
+        The shared storage type (see shdom.SharedSolverState).
+    accumulator_dtype: np.float64 or np.float32
+        The precision of the gradient accumulator (see MediumEstimator.set_gradient_accumulation).
+
+    Notes
+    -----
+    The process which created the state owns the shared memory and should call unlink() (or use a with statement) when done.
+    """
+    def __init__(self, medium_estimator, accumulator_shape, images_shape, storage=None, accumulator_dtype=np.float64):
+        self.init_storage(storage)
+        self._attributes = {
+            key: getattr(medium_estimator, key) for key in
+            ['_stokes_weights', '_exact_single_scatter', '_unknown_scatterers_indices', '_num_derivatives', '_loss_type']
+        }
+        self._arrays = {
+            key: self.share_array(key, getattr(medium_estimator, key)) for key in
+            ['_direct_derivative_path', '_direct_derivative_ptr']
+        }
+        self._pa_arrays = {}
+        self._accumulator = self.share_array('accumulator', np.zeros(accumulator_shape, dtype=accumulator_dtype))
+        self._images = self.share_array('images', np.full(images_shape, np.nan, dtype=np.float32))
+
+    def get_solver(self):
+        raise NotImplementedError('A SharedGradientState has no solver, see attach method')
+
+    def attach(self):
+        """
+        Rebuild a minimal MediumEstimator (sufficient for MediumEstimator.core_grad) and attach to the shared buffers.
+
+        Returns
+        -------
+        medium_estimator: shdom.MediumEstimator
+            A medium estimator whose direct derivative paths are views of the shared storage.
+        accumulator: np.array(dtype=np.float64)
+            A writeable view of the shared gradient accumulator.
+        images: np.array(dtype=np.float32)
+            A writeable view of the shared image buffer.
+        """
+        medium_estimator = MediumEstimator.__new__(MediumEstimator)
+        medium_estimator.__dict__.update(self._attributes)
+        for key, descriptor in self._arrays.items():
+            medium_estimator.__dict__[key] = self.attach_array(descriptor)
+        medium_estimator._core_grad = medium_estimator.grad_l2 if self._attributes['_loss_type'] == 'l2' \
+            else medium_estimator.grad_normcorr
+        return medium_estimator, self.attach_array(self._accumulator, writeable=True), \
+               self.attach_array(self._images, writeable=True)
+
+
+def gradient_work_unit(gradient_state, rte_solver, projection, pixels, channel, indices, slot):
+    """
+    Compute the gradient of a work unit and reduce it in place into an accumulator slot (see GradientExecutor).
+
+    Parameters
+    ----------
+    gradient_state: shdom.SharedGradientState or tuple
+        The shared gradient state (in a worker process) or a (medium_estimator, accumulator, images) tuple,
+        where accumulator is a shdom.GradientAccumulator.
+    rte_solver: shdom.RteSolver or shdom.SharedSolverState
+        The solver (or its shared state in a worker process) at the work unit wavelength.
+    projection: shdom.Projection
+        The projection geometry of the work unit pixels.
+    pixels: np.array(dtype=np.float32)
+        The acquired pixels of the work unit.
+    channel: int
+        The channel index of the work unit.
+    indices: slice
+        The pixel indices of the work unit.
+    slot: int
+        The accumulator slot. A slot is used by a single work unit at a time.
+
+    Returns
+    -------
+    output: tuple
+        The (small) non-gradient outputs of MediumEstimator.core_grad (e.g. loss, norms).
+    """
+    shared = isinstance(gradient_state, SharedGradientState)
+    medium_estimator, accumulator, images = gradient_state.attach() if shared else gradient_state
+    solver = rte_solver.get_solver() if isinstance(rte_solver, shdom.SharedSolverState) else rte_solver
+
+    output = medium_estimator.core_grad(solver, projection, pixels)
+    if isinstance(accumulator, GradientAccumulator):
+        num_gradients = accumulator.num_gradients
+        accumulator.add(output[:num_gradients], key=slot)
+    else:
+        num_gradients = accumulator.shape[1]
+        for i in range(num_gradients):
+            accumulator[slot, i] += output[i].ravel()
+    images[..., indices, channel] = output[-1]
+
+    if shared:
+        del medium_estimator, accumulator, images, solver
+        gradient_state.close()
+        rte_solver.close()
+    return output[num_gradients:-1]
+
+
+class GradientExecutor(object):
+    """
+    A parallel executor of the gradient computation (see MediumEstimator.set_gradient_executor).
+    The pixels are divided into (wavelength x view tile) work units which are dispatched dynamically amongst the workers.
+    The gradient of every work unit is reduced in place into one of n_jobs accumulator slots and the rendered pixels are
+    written directly into an image buffer. The memory of the gradient reduction is therefore O(n_jobs x grid)
+    rather than O(work units x grid).
+
+    Parameters
+    ----------
+    n_jobs: int
+        The number of workers.
+    backend: 'threading', 'loky' or 'multiprocessing'
+        'threading' runs the work units in the current process (threadsafe Fortran).
+        'loky' or 'multiprocessing' run the work units in a pool of worker processes. The solvers,
+        direct derivative paths, accumulator and image buffer are placed in shared memory (see shdom.SharedSolverState).
+    tile_size: int, optional
+        The maximum number of pixels of a work unit. None uses a single work unit per view and wavelength.
+    storage: 'shared_memory', 'memmap' or None
+        The shared storage type of the process backends (see shdom.SharedSolverState).
+
+    Notes
+    -----
+    With the process backends the shared solver states are created once per solution and reused by consecutive
+    compute calls until the solver changes (see shared_solver_states). Only the derivative tables,
+    which change with every gradient computation, are refreshed. Call close() to release the shared storage.
+    """
+    _derivative_keys = ['_dext', '_dalb', '_diphase', '_dleg', '_dphasetab', '_dnumphase']
+
+    def __init__(self, n_jobs, backend='threading', tile_size=None, storage=None):
+        if backend not in ['threading', 'loky', 'multiprocessing']:
+            raise NotImplementedError('Parallel backend [{}] not implemented'.format(backend))
+        self._n_jobs = n_jobs
+        self._backend = backend
+        self._tile_size = tile_size
+        self._storage = storage
+        self._shared_states = OrderedDict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shared_states'] = OrderedDict()
+        return state
+
+    def shared_solver_states(self, rte_solvers):
+        """
+        Retrieve the shared states of the solvers, creating them only for new or modified solutions.
+
+        Parameters
+        ----------
+        rte_solvers: shdom.RteSolverArray
+            A solver array with all the associated parameters and the solution to the RTE
+
+        Returns
+        -------
+        shared_states: list of shdom.SharedSolverState
+            The shared state of every solver with refreshed derivative tables.
+
+        Notes
+        -----
+        A shared state is reused while the solver solution_version, num_iterations, npts and phase table are unchanged.
+        The shared states of solvers which are not in rte_solvers are released.
+        """
+        shared_states = OrderedDict()
+        for rte_solver in rte_solvers:
+            key = (rte_solver.solution_version, rte_solver.num_iterations, rte_solver._npts,
+                   getattr(rte_solver, '_phasetab_key', None))
+            entry = self._shared_states.pop(id(rte_solver), None)
+            if entry is not None and entry[0] is rte_solver and entry[1] == key:
+                shared_state = entry[2]
+                shared_state.update_arrays(rte_solver, self._derivative_keys)
+            else:
+                if entry is not None:
+                    entry[2].unlink()
+                shared_state = shdom.SharedSolverState(rte_solver, self.storage)
+            shared_states[id(rte_solver)] = (rte_solver, key, shared_state)
+        self.close()
+        self._shared_states = shared_states
+        return [entry[2] for entry in shared_states.values()]
+
+    def close(self):
+        """
+        Release the shared storage of the solvers (process backends).
+        """
+        for rte_solver, key, shared_state in self._shared_states.values():
+            shared_state.unlink()
+        self._shared_states = OrderedDict()
+
+    def work_units(self, projection, num_channels):
+        """
+        Divide the pixels into work units.
+
+        Parameters
+        ----------
+        projection: shdom.Projection
+            The projection geometry of all the pixels (a shdom.MultiViewProjection for multiple views).
+        num_channels: int
+            The number of channels (wavelengths).
+
+        Returns
+        -------
+        work_units: list
+            A list of (channel, indices) where indices is a slice of the pixels.
+        """
+        if isinstance(projection, shdom.MultiViewProjection):
+            offsets = projection.offsets
+        else:
+            offsets = [0, projection.npix]
+        work_units = []
+        for channel, (start, stop) in itertools.product(range(num_channels), zip(offsets[:-1], offsets[1:])):
+            tile_size = stop - start if self.tile_size is None else self.tile_size
+            for tile_start in range(start, stop, tile_size):
+                work_units.append((channel, slice(tile_start, min(tile_start + tile_size, stop))))
+        return work_units
+
+    def compute(self, medium_estimator, rte_solvers, projection, sensor, pixels):
+        """
+        Compute the loss, gradient and images.
+
+        Parameters
+        ----------
+        medium_estimator: shdom.MediumEstimator
+            The medium estimator (with derivatives precomputed on the solvers, see MediumEstimator.compute_gradient).
+        rte_solvers: shdom.RteSolverArray
+            A solver array with all the associated parameters and the solution to the RTE
+        projection: shdom.Projection
+            The projection geometry of all the pixels
+        sensor: shdom.Sensor
+            The sensor which acquired the measurements
+        pixels: np.array(dtype=np.float32)
+            The acquired pixels (the channel dimension is last)
+
+        Returns
+        -------
+        loss: np.float64
+            The total loss accumulated over all pixels
+        gradient: np.array(dtype=np.float64)
+            The gradient on the grid
+        images: list of np.array(shape=(projection.resolution), dtype=np.float32)
+            A list of the rendered (synthetic) images.
+        """
+        num_channels = pixels.shape[-1]
+        gradient_shapes = medium_estimator.gradient_shapes(rte_solvers[0])
+        accumulator_shape = (self.n_jobs, len(gradient_shapes), int(np.prod(gradient_shapes[0])))
+
+        shared_states = None
+        if self.backend == 'threading':
+            accumulator = GradientAccumulator(gradient_shapes, medium_estimator.gradient_accumulation or np.float64,
+                                              medium_estimator.gradient_compensation)
+            images = np.full(pixels.shape, np.nan, dtype=np.float32)
+            gradient_state = (medium_estimator, accumulator, images)
+            workers = list(rte_solvers)
+            executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+        else:
+            if medium_estimator.gradient_compensation:
+                warnings.warn('Compensated gradient accumulation is not supported by the [{}] backend, '
+                              'the shared slots are summed without compensation'.format(self.backend))
+            gradient_state = SharedGradientState(medium_estimator, accumulator_shape, pixels.shape, self.storage,
+                                                 medium_estimator.gradient_accumulation or np.float64)
+            _, accumulator, images = gradient_state.attach()
+            shared_states = self.shared_solver_states(rte_solvers)
+            workers = shared_states
+            executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+
+        work_units = iter(self.work_units(projection, num_channels))
+        free_slots = list(range(self.n_jobs))
+        outputs = []
+        futures = dict()
+
+        def submit(channel, indices):
+            slot = free_slots.pop()
+            future = executor.submit(
+                gradient_work_unit, gradient_state, workers[channel], projection[indices],
+                pixels[..., indices, channel], channel, indices, slot)
+            futures[future] = slot
+
+        try:
+            for channel, indices in itertools.islice(work_units, self.n_jobs):
+                submit(channel, indices)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    free_slots.append(futures.pop(future))
+                    outputs.append(future.result())
+                    for channel, indices in itertools.islice(work_units, 1):
+                        submit(channel, indices)
+
+            # Reduce the accumulator slots and the small outputs into a single core_grad output
+            if shared_states is None:
+                gradients = accumulator.reduce()
+            else:
+                gradients = [gradient.reshape(shape) for gradient, shape in zip(accumulator.sum(axis=0, dtype=np.float64), gradient_shapes)]
+            small_outputs = [np.sum(values, axis=0) for values in zip(*outputs)]
+            channel_images = np.concatenate([images[..., channel] for channel in range(num_channels)], axis=-1)
+            output = [tuple(gradients + small_outputs + [channel_images])]
+            loss, gradient, rendered_images = medium_estimator.output_transform(
+                output, projection, sensor, num_channels)
+
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if shared_states is not None:
+                del _, accumulator, images
+                gradient_state.unlink()
+        return loss, gradient, rendered_images
+
+    @property
+    def n_jobs(self):
+        return self._n_jobs
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def tile_size(self):
+        return self._tile_size
+
+    @property
+    def storage(self):
+        return self._storage
+
 
 class MediumEstimator(shdom.Medium):
     """
@@ -760,8 +1525,11 @@ class MediumEstimator(shdom.Medium):
         self._num_derivatives = 0
         self._num_estimators = 0
         self._exact_single_scatter = exact_single_scatter
+        self._loss_type = loss_type
         self._core_grad, self._output_transform = self.init_loss_function(loss_type)
         self._stokes_weights = stokes_weights if stokes_weights is not None else np.array([1.0], dtype=np.float32)
+        self._derivatives_cache = OrderedDict()
+        self._direct_derivative_cache = DirectDerivativeCache()
 
     def init_loss_function(self, loss_type):
         """
@@ -836,6 +1604,13 @@ class MediumEstimator(shdom.Medium):
                 self.unknown_scatterers_indices, 
                 np.full(total_num_estimators, self.num_scatterers, dtype=np.int32)))
             self._num_derivatives += total_num_estimators
+            self.clear_derivatives_cache()
+
+    def clear_derivatives_cache(self):
+        """
+        Clear the derivative tables cached by get_derivatives.
+        """
+        self._derivatives_cache = OrderedDict()
 
     def set_state(self, state):
         """
@@ -851,6 +1626,24 @@ class MediumEstimator(shdom.Medium):
             estimator.set_state(state)
             self.scatterers[name] = estimator
 
+    def get_dirty_mask(self):
+        """
+        Retrieve the medium grid points which changed by the last set_state.
+        Only the unknown scatterers change, therefore this is the union of the scatterer estimators dirty masks.
+
+        Returns
+        -------
+        dirty_mask: np.array(shape=(grid.nx, grid.ny, grid.nz), dtype=bool) or None
+            A boolean array on the medium grid, None if the changes are unknown (i.e. all points may have changed).
+        """
+        dirty_mask = np.zeros(shape=(self.grid.nx, self.grid.ny, self.grid.nz), dtype=bool)
+        for estimator in self.estimators.values():
+            estimator_mask = estimator.get_dirty_mask(self.grid)
+            if estimator_mask is None:
+                return None
+            dirty_mask |= estimator_mask
+        return dirty_mask
+
     def get_state(self):
         """
         Retrieve the estimator state by joining all the internal estimators states.
@@ -902,26 +1695,55 @@ class MediumEstimator(shdom.Medium):
              The derivative of the phase function at pre-determined angles with respect to the parameters
         dnumphase: np.array(dtype=np.float32)
              The number of phase function derivatives
-        """
+
+        Notes
+        -----
+        The derivatives are cached per wavelength. A derivative is recomputed only if it depends on the state of its
+        ScattererEstimator (see ScattererEstimator.derivative_depends_on_state) and this state changed since it was cached.
+        The phase function derivative table (dphasetab) is recomputed only if the Legendre derivatives changed.
+        """
+        solver_params = (rte_solver._nbpts, rte_solver._nleg, rte_solver._nstphase, rte_solver._nstleg,
+                         rte_solver._nscatangle, rte_solver._nstokes, rte_solver._ml, rte_solver._nlm,
+                         rte_solver._deltam, self.grid.shape)
+        cache = self._derivatives_cache.get(rte_solver.wavelength)
+        if cache is None or cache['solver_params'] != solver_params:
+            cache = {'solver_params': solver_params, 'columns': OrderedDict(), 'derivatives': None}
+            self._derivatives_cache[rte_solver.wavelength] = cache
+
+        columns = cache['columns']
+        updated = cache['derivatives'] is None
+        for name, estimator in self.estimators.items():
+            for dtype in estimator.derivatives.keys():
+                column = columns.get((name, dtype))
+                if column is None or \
+                        (estimator.derivative_depends_on_state(dtype) and column['version'] != estimator.state_version):
+                    derivative = estimator.get_derivative(dtype, rte_solver.wavelength)
+                    resampled_derivative = derivative.resample(self.grid)
+                    columns[(name, dtype)] = {
+                        'version': estimator.state_version,
+                        'extinction': resampled_derivative.extinction.data.ravel(),
+                        'albedo': resampled_derivative.albedo.data.ravel(),
+                        'iphase': resampled_derivative.phase.iphasep.ravel(),
+                        'legendre_table': copy.deepcopy(resampled_derivative.phase.legendre_table)
+                    }
+                    updated = True
+
+        if not updated:
+            return cache['derivatives']
+
         dext = np.zeros(shape=[rte_solver._nbpts, self.num_derivatives], dtype=np.float32)
         dalb = np.zeros(shape=[rte_solver._nbpts, self.num_derivatives], dtype=np.float32)
         diphase = np.zeros(shape=[rte_solver._nbpts, self.num_derivatives], dtype=np.int32)
-    
-        i=0
-        for estimator in self.estimators.values():
-            for dtype in estimator.derivatives.keys():
-                derivative = estimator.get_derivative(dtype, rte_solver.wavelength)       
-                resampled_derivative = derivative.resample(self.grid)
-                dext[:, i] = resampled_derivative.extinction.data.ravel()
-                dalb[:, i] = resampled_derivative.albedo.data.ravel()
-                diphase[:, i] = resampled_derivative.phase.iphasep.ravel() + diphase.max()
-
-                if i == 0:
-                    leg_table = copy.deepcopy(resampled_derivative.phase.legendre_table)
-                else:
-                    leg_table.append(copy.deepcopy(resampled_derivative.phase.legendre_table))                
-                i += 1
-                
+
+        for i, column in enumerate(columns.values()):
+            dext[:, i] = column['extinction']
+            dalb[:, i] = column['albedo']
+            diphase[:, i] = column['iphase'] + diphase.max()
+            if i == 0:
+                leg_table = copy.deepcopy(column['legendre_table'])
+            else:
+                leg_table.append(copy.deepcopy(column['legendre_table']))
+
         leg_table.pad(rte_solver._nleg)
         dleg = leg_table.data
         dnumphase = leg_table.numphase
@@ -937,21 +1759,25 @@ class MediumEstimator(shdom.Medium):
             dleg[0,0,:] = 0.0
             dleg /= scaling_factor[np.newaxis,:,np.newaxis]
 
-        dphasetab = core.precompute_phase_check_grad(
-            negcheck=False,
-            nstphase=rte_solver._nstphase,
-            nstleg=rte_solver._nstleg,
-            nscatangle=rte_solver._nscatangle,
-            nstokes=rte_solver._nstokes,
-            dnumphase=dnumphase,
-            ml=rte_solver._ml,
-            nlm=rte_solver._nlm,
-            nleg=rte_solver._nleg,
-            dleg=dleg,
-            deltam=rte_solver._deltam
-        )
+        if cache['derivatives'] is not None and np.array_equal(dleg, cache['derivatives'][3]):
+            dphasetab = cache['derivatives'][4]
+        else:
+            dphasetab = core.precompute_phase_check_grad(
+                negcheck=False,
+                nstphase=rte_solver._nstphase,
+                nstleg=rte_solver._nstleg,
+                nscatangle=rte_solver._nscatangle,
+                nstokes=rte_solver._nstokes,
+                dnumphase=dnumphase,
+                ml=rte_solver._ml,
+                nlm=rte_solver._nlm,
+                nleg=rte_solver._nleg,
+                dleg=dleg,
+                deltam=rte_solver._deltam
+            )
 
-        return dext, dalb, diphase, dleg, dphasetab, dnumphase
+        cache['derivatives'] = (dext, dalb, diphase, dleg, dphasetab, dnumphase)
+        return cache['derivatives']
 
     def compute_direct_derivative(self, rte_solver):
         """
@@ -962,6 +1788,11 @@ class MediumEstimator(shdom.Medium):
         ----------
         rte_solver: shdom.RteSolver
             The RteSolver object (at a given wavelength)
+
+        Notes
+        -----
+        The paths are retrieved from the direct derivative cache (see DirectDerivativeCache):
+        only grid points which are not cached (e.g. newly split adaptive grid points) are traced.
         """
 
         # There is no optical information stored here, only paths and indices
@@ -971,39 +1802,52 @@ class MediumEstimator(shdom.Medium):
             rte_solver = rte_solver[0]
         else:
             uniformzlev = rte_solver._uniformzlev
-            
+
+        if self.direct_derivative_cache is None:
+            self._direct_derivative_cache = DirectDerivativeCache()
         self._direct_derivative_path, self._direct_derivative_ptr = \
-            core.make_direct_derivative(
-                npts=rte_solver._npts,
-                bcflag=rte_solver._bcflag,
-                gridpos=rte_solver._gridpos,
-                npx=rte_solver._pa.npx,
-                npy=rte_solver._pa.npy,
-                npz=rte_solver._pa.npz,
-                delx=rte_solver._pa.delx,
-                dely=rte_solver._pa.dely,
-                xstart=rte_solver._pa.xstart,
-                ystart=rte_solver._pa.ystart,
-                zlevels=rte_solver._pa.zlevels,
-                ipdirect=rte_solver._ipdirect,
-                di=rte_solver._di,
-                dj=rte_solver._dj,
-                dk=rte_solver._dk,
-                epss=rte_solver._epss,
-                epsz=rte_solver._epsz,
-                xdomain=rte_solver._xdomain,
-                ydomain=rte_solver._ydomain,
-                cx=rte_solver._cx,
-                cy=rte_solver._cy,
-                cz=rte_solver._cz,
-                cxinv=rte_solver._cxinv,
-                cyinv=rte_solver._cyinv,
-                czinv=rte_solver._czinv,
-                uniformzlev=uniformzlev,
-                delxd=rte_solver._delxd,
-                delyd=rte_solver._delyd
-            )       
-        
+            self.direct_derivative_cache.get(rte_solver, uniformzlev)
+
+    def set_gradient_accumulation(self, dtype, compensated=False):
+        """
+        Set the accumulation mode of the gradient computation.
+        When set, the gradient of every pixel chunk is added into per-thread buffers (see GradientAccumulator)
+        rather than kept until all the chunks are computed.
+
+        Parameters
+        ----------
+        dtype: np.float64, np.float32 or None
+            The accumulation precision. np.float32 halves the accumulation memory.
+            None (default) keeps the gradient of every chunk and sums them at the end.
+        compensated: bool, default=False
+            Kahan compensated float32 summation (see GradientAccumulator), for accuracy experiments only.
+        """
+        self._gradient_accumulation = None if dtype is None else np.dtype(dtype)
+        self._gradient_compensation = compensated
+
+    def set_gradient_executor(self, executor):
+        """
+        Set a parallel executor of the (full-batch) gradient computation.
+        When set, the executor replaces the n_jobs split of compute_gradient.
+
+        Parameters
+        ----------
+        executor: shdom.GradientExecutor
+            The gradient executor. None reverts to the n_jobs split of compute_gradient.
+        """
+        self._gradient_executor = executor
+
+    def set_direct_derivative_cache(self, cache):
+        """
+        Set the direct derivative path cache. A cache can be shared between MediumEstimators with identical geometry.
+
+        Parameters
+        ----------
+        cache: shdom.DirectDerivativeCache
+            The direct derivative path cache.
+        """
+        self._direct_derivative_cache = cache
+
     def grad_normcorr(self, rte_solver, projection, pixels):
         """
         The core normalized correlation gradient method.
@@ -1258,7 +2102,7 @@ class MediumEstimator(shdom.Medium):
         )
         return gradient, loss, images
 
-    def compute_gradient(self, rte_solvers, measurements, n_jobs):
+    def compute_gradient(self, rte_solvers, measurements, n_jobs, sampler=None):
         """
         Compute the gradient with respect to the current state.
         If n_jobs>1 than parallel gradient computation is used with pixels are distributed amongst all workers
@@ -1271,6 +2115,9 @@ class MediumEstimator(shdom.Medium):
             A measurements object storing the acquired images and sensor geometry
         n_jobs: int,
             The number of jobs to divide the gradient computation into.
+        sampler: shdom.MiniBatchSampler, optional
+            A sampler of mini-batches of views and pixel tiles for a stochastic estimate of the loss and gradient.
+            None (default) evaluates all the pixels.
 
         Returns
         -------
@@ -1280,6 +2127,7 @@ class MediumEstimator(shdom.Medium):
             The total loss accumulated over all pixels
         images: list of np.array(shape=(measurements.projection.resolution), dtype=np.float32)
             A list of the rendered (synthetic) images, used for display purposes.
+            For a mini-batch, the pixels which were not sampled are NaN.
         """
         # Pre-computation of phase-function and derivatives for all solvers.
         for rte_solver in rte_solvers.solver_list:
@@ -1290,11 +2138,29 @@ class MediumEstimator(shdom.Medium):
         projection = measurements.camera.projection
         sensor = measurements.camera.sensor
         pixels = measurements.pixels
+
+        if sampler is not None:
+            loss, gradient, images = self.compute_minibatch_gradient(
+                rte_solvers, projection, sensor, pixels, sampler.sample(projection), n_jobs)
+            return self.project_state_gradient(gradient), loss, images
+
+        if self.gradient_executor is not None:
+            loss, gradient, images = self.gradient_executor.compute(self, rte_solvers, projection, sensor, pixels)
+            return self.project_state_gradient(gradient), loss, images
         
+        if self.gradient_accumulation is not None:
+            accumulator = GradientAccumulator(self.gradient_shapes(rte_solvers[0]), self.gradient_accumulation,
+                                              self.gradient_compensation)
+            core_grad = lambda rte_solver, projection, pixels: self.accumulate_core_grad(
+                accumulator, rte_solver, projection, pixels)
+        else:
+            accumulator = None
+            core_grad = self.core_grad
+
         # Sequential or parallel processing using multithreading (threadsafe Fortran)
         if n_jobs > 1:           
             output = Parallel(n_jobs=n_jobs, backend="threading", verbose=0)(
-                delayed(self.core_grad, check_pickle=False)(
+                delayed(core_grad, check_pickle=False)(
                     rte_solver=rte_solvers[channel],
                     projection=projection,
                     pixels=spectral_pixels[..., channel]
@@ -1303,20 +2169,154 @@ class MediumEstimator(shdom.Medium):
             )
         else:
             output = [
-                self.core_grad(rte_solvers[channel], projection, pixels[..., channel])
+                core_grad(rte_solvers[channel], projection, pixels[..., channel])
                 for channel in range(self.num_wavelengths)
             ]
-        
+
+        if accumulator is not None:
+            small_outputs = [np.sum(values, axis=0) for values in zip(*[out[:-1] for out in output])]
+            images = np.concatenate([out[-1] for out in output], axis=-1)
+            output = [tuple(accumulator.reduce() + small_outputs + [images])]
+
         # Sum over all the losses of the different channels
         loss, gradient, images = self.output_transform(output, projection, sensor, self.num_wavelengths)
+        return self.project_state_gradient(gradient), loss, images
+
+    def accumulate_core_grad(self, accumulator, rte_solver, projection, pixels):
+        """
+        Compute the gradient of a pixel chunk and add it into the calling thread buffers of an accumulator.
+        The full-grid gradient of the chunk is released as soon as it is accumulated.
+
+        Parameters
+        ----------
+        accumulator: shdom.GradientAccumulator
+            The gradient accumulator.
+        rte_solver: shdom.RteSolver
+            The solver at the chunk wavelength.
+        projection: shdom.Projection
+            The projection geometry of the chunk pixels.
+        pixels: np.array(dtype=np.float32)
+            The acquired pixels of the chunk.
+
+        Returns
+        -------
+        output: tuple
+            The non-gradient outputs of core_grad (e.g. loss, norms and images).
+        """
+        output = self.core_grad(rte_solver, projection, pixels)
+        accumulator.add(output[:accumulator.num_gradients])
+        return output[accumulator.num_gradients:]
+
+    def gradient_shapes(self, rte_solver):
+        """
+        The shapes of the grid gradient outputs of core_grad.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with the grid of the gradient computation.
+
+        Returns
+        -------
+        shapes: list of tuples
+            The shape of every gradient output of core_grad.
+        """
+        if self._loss_type == 'l2':
+            return [(rte_solver._nbpts, self.num_derivatives)]
+        else:
+            return [(rte_solver._nstokes, rte_solver._nbpts, self.num_derivatives)] * 2
+
+    def compute_minibatch_gradient(self, rte_solvers, projection, sensor, pixels, batch, n_jobs):
+        """
+        Compute a stochastic estimate of the loss and gradient from a mini-batch of pixels.
+        The loss and gradient sums of every sampled view are scaled by the view weight (see MiniBatchSampler).
+
+        Parameters
+        ----------
+        rte_solvers: shdom.RteSolverArray
+            A solver array with all the associated parameters and the solution to the RTE
+        projection: shdom.Projection
+            The projection geometry of all the pixels
+        sensor: shdom.Sensor
+            The sensor which acquired the measurements
+        pixels: np.array(dtype=np.float32)
+            The acquired pixels (the channel dimension is last)
+        batch: list
+            A list of (indices, weight) for every sampled view (see MiniBatchSampler.sample)
+        n_jobs: int,
+            The number of jobs to divide the gradient computation into.
+
+        Returns
+        -------
+        loss: np.float64
+            The estimated total loss
+        gradient: np.array(dtype=np.float64)
+            The estimated gradient on the grid
+        images: list of np.array(shape=(projection.resolution), dtype=np.float32)
+            A list of the rendered (synthetic) images. The pixels which were not sampled are NaN.
+        """
+        def weighted_core_grad(weight, rte_solver, projection, pixels):
+            output = self.core_grad(rte_solver, projection, pixels)
+            return tuple([weight * value for value in output[:-1]]) + (output[-1],)
+
+        num_parts = int(np.ceil(n_jobs / len(batch)))
+        jobs = [
+            (channel, weight, part_projection, part_pixels)
+            for channel, (indices, weight) in itertools.product(range(self.num_wavelengths), batch)
+            for part_projection, part_pixels in zip(
+                projection[indices].split(num_parts),
+                np.array_split(pixels[..., indices, channel], num_parts, axis=-1))
+        ]
+
+        # Sequential or parallel processing using multithreading (threadsafe Fortran)
+        if n_jobs > 1:
+            output = Parallel(n_jobs=n_jobs, backend="threading", verbose=0)(
+                delayed(weighted_core_grad, check_pickle=False)(
+                    weight=weight,
+                    rte_solver=rte_solvers[channel],
+                    projection=part_projection,
+                    pixels=part_pixels
+                ) for channel, weight, part_projection, part_pixels in jobs
+            )
+        else:
+            output = [
+                weighted_core_grad(weight, rte_solvers[channel], part_projection, part_pixels)
+                for channel, weight, part_projection, part_pixels in jobs
+            ]
+
+        indices = np.concatenate([indices for indices, weight in batch])
+        loss, gradient, sampled_images = self.output_transform(
+            output, shdom.Projection(resolution=[indices.size]), sensor, self.num_wavelengths)
+
+        # Scatter the sampled pixels into full images
+        images = np.full(pixels.shape, np.nan, dtype=np.float32)
+        images[..., indices, :] = np.reshape(sampled_images, images[..., indices, :].shape)
+        images = sensor.make_images(
+            np.concatenate([images[..., channel] for channel in range(self.num_wavelengths)], axis=-1),
+            projection,
+            self.num_wavelengths)
+        return loss, gradient, images
+
+    def project_state_gradient(self, gradient):
+        """
+        Project the gradient on the grid onto the combined state of all the internal estimators.
+
+        Parameters
+        ----------
+        gradient: np.array(dtype=np.float64)
+            The gradient with respect to the derivatives at every grid point
 
+        Returns
+        -------
+        state_gradient: np.array(shape=(self.num_parameters), dtype=np.float64)
+            The gradient of the loss function with respect to the state parameters
+        """
         gradient = gradient.reshape(self.grid.shape + tuple([self.num_derivatives]))
         gradient = np.split(gradient, self.num_estimators, axis=-1)
         state_gradient = np.empty(shape=(0), dtype=np.float64)
         for estimator, gradient in zip(self.estimators.values(), gradient):
             state_gradient = np.concatenate((state_gradient, estimator.project_gradient(gradient, self.grid)))
-
-        return state_gradient, loss, images
+        return state_gradient
 
     @property
     def estimators(self):
@@ -1342,6 +2342,22 @@ class MediumEstimator(shdom.Medium):
     def core_grad(self):
         return self._core_grad
 
+    @property
+    def direct_derivative_cache(self):
+        return getattr(self, '_direct_derivative_cache', None)
+
+    @property
+    def gradient_accumulation(self):
+        return getattr(self, '_gradient_accumulation', None)
+
+    @property
+    def gradient_compensation(self):
+        return getattr(self, '_gradient_compensation', False)
+
+    @property
+    def gradient_executor(self):
+        return getattr(self, '_gradient_executor', None)
+
     @property
     def output_transform(self):
         return self._output_transform
@@ -1455,6 +2471,41 @@ class SummaryWriter(object):
         }
         self.add_callback_fn(self.shdom_iterations_cbfn, kwargs)
 
+    def monitor_solution_accuracy(self, ckpt_period=-1):
+        """
+        Monitor the RTE solution and splitting accuracies chosen by the optimizer accuracy schedule (see shdom.SolutionAccuracySchedule).
+
+        Parameters
+        ----------
+        ckpt_period: float
+           time [seconds] between updates. setting ckpt_period=-1 will log at every iteration.
+        """
+        kwargs = {
+            'ckpt_period': ckpt_period,
+            'ckpt_time': time.time(),
+            'title': ['solution accuracy', 'split accuracy', 'projected gradient norm']
+        }
+        self.add_callback_fn(self.solution_accuracy_cbfn, kwargs)
+
+    def monitor_core_profile(self, profiler, ckpt_period=-1):
+        """
+        Monitor the time spent in the SHDOM core (Fortran) functions.
+
+        Parameters
+        ----------
+        profiler: shdom.CoreProfiler
+            An (enabled) profiler which records the core function calls.
+        ckpt_period: float
+           time [seconds] between updates. setting ckpt_period=-1 will log at every iteration.
+        """
+        kwargs = {
+            'ckpt_period': ckpt_period,
+            'ckpt_time': time.time(),
+            'profiler': profiler,
+            'title': ['core wall time', 'core calls', 'core input MB']
+        }
+        self.add_callback_fn(self.core_profile_cbfn, kwargs)
+
     def monitor_scatterer_error(self, estimator_name, ground_truth, ckpt_period=-1):
         """
         Monitor relative and overall mass error (epsilon, delta) as defined at:
@@ -1652,6 +2703,37 @@ class SummaryWriter(object):
         """
         self.tf_writer.add_scalar(kwargs['title'], self.optimizer.rte_solver.num_iterations, self.optimizer.iteration)
         
+    def solution_accuracy_cbfn(self, kwargs):
+        """
+        Callback function that is called (every optimizer iteration) for solution accuracy monitoring.
+
+        Parameters
+        ----------
+        kwargs: dict,
+            keyword arguments
+        """
+        solver = self.optimizer.rte_solver.solver_list[0]
+        self.tf_writer.add_scalar(kwargs['title'][0], solver.solution_accuracy, self.optimizer.iteration)
+        self.tf_writer.add_scalar(kwargs['title'][1], solver.split_accuracy, self.optimizer.iteration)
+        schedule = self.optimizer.accuracy_schedule
+        if schedule is not None and schedule.pg_norm is not None:
+            self.tf_writer.add_scalar(kwargs['title'][2], schedule.pg_norm, self.optimizer.iteration)
+
+    def core_profile_cbfn(self, kwargs):
+        """
+        Callback function that is called for core profiling monitoring.
+        The statistics are accumulated since the profiler was last reset.
+
+        Parameters
+        ----------
+        kwargs: dict,
+            keyword arguments
+        """
+        stats = kwargs['profiler'].stats
+        self.tf_writer.add_scalars(kwargs['title'][0], {name: stat['wall_time'] for name, stat in stats.items()}, self.optimizer.iteration)
+        self.tf_writer.add_scalars(kwargs['title'][1], {name: stat['calls'] for name, stat in stats.items()}, self.optimizer.iteration)
+        self.tf_writer.add_scalars(kwargs['title'][2], {name: stat['input_bytes'] / 1024**2 for name, stat in stats.items()}, self.optimizer.iteration)
+
     def scatterer_error_cbfn(self, kwargs):
         """
         Callback function for monitoring parameter error measures.
@@ -1954,6 +3036,228 @@ class SpaceCarver(object):
         return self._grid
 
 
+class SolutionAccuracySchedule(object):
+    """
+    An inexact-solve schedule which couples the SHDOM solution accuracy to the optimization progress.
+    Early optimization iterations use a relaxed (cheap) RTE solution, which is tightened towards the 
+    numerical parameters of the solvers as the projected gradient norm shrinks:
+        factor = max(1, initial_factor * (pg_norm / initial_pg_norm)**power)
+    The factors never increase (the solution is only tightened).
+
+    Parameters
+    ----------
+    initial_solution_factor: float, default=100.0
+        The initial relaxation factor of the solution accuracy (see RteSolver.set_accuracy_relaxation).
+    initial_split_factor: float, default=10.0
+        The initial relaxation factor of the adaptive cell splitting accuracy.
+    power: float, default=1.0
+        The power of the projected gradient norm ratio.
+        
+    Notes
+    -----
+    The projected gradient is that of the bound constrained problem (as in L-BFGS-B): P(x - g) - x, where P projects onto the bounds.
+    """
+    def __init__(self, initial_solution_factor=100.0, initial_split_factor=10.0, power=1.0):
+        self._initial_solution_factor = initial_solution_factor
+        self._initial_split_factor = initial_split_factor
+        self._power = power
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the schedule to the initial relaxation factors.
+        """
+        self._solution_factor = max(1.0, self._initial_solution_factor)
+        self._split_factor = max(1.0, self._initial_split_factor)
+        self._initial_pg_norm = None
+        self._pg_norm = None
+
+    def projected_gradient_norm(self, state, gradient, bounds):
+        """
+        Compute the infinity norm of the projected gradient.
+
+        Parameters
+        ----------
+        state: np.array(dtype=np.float64)
+            The current state vector
+        gradient: np.array(dtype=np.float64)
+            The gradient at the current state
+        bounds: list of tuples
+            The lower and upper bound of each parameter (None for no bound)
+
+        Returns
+        -------
+        pg_norm: np.float64
+            The projected gradient infinity norm
+        """
+        lower = np.array([-np.inf if bound[0] is None else bound[0] for bound in bounds], dtype=np.float64)
+        upper = np.array([np.inf if bound[1] is None else bound[1] for bound in bounds], dtype=np.float64)
+        return np.linalg.norm(np.clip(state - gradient, lower, upper) - state, np.inf)
+
+    def update(self, state, gradient, bounds):
+        """
+        Update the relaxation factors according to the projected gradient at the current state.
+
+        Parameters
+        ----------
+        state: np.array(dtype=np.float64)
+            The current state vector
+        gradient: np.array(dtype=np.float64)
+            The gradient at the current state
+        bounds: list of tuples
+            The lower and upper bound of each parameter (None for no bound)
+
+        Returns
+        -------
+        solution_factor: float
+            The solution accuracy relaxation factor for the next RTE solution.
+        split_factor: float
+            The cell splitting accuracy relaxation factor for the next RTE solution.
+        """
+        self._pg_norm = self.projected_gradient_norm(state, gradient, bounds)
+        if self._initial_pg_norm is None:
+            self._initial_pg_norm = self._pg_norm
+        if self._initial_pg_norm > 0.0:
+            ratio = (self._pg_norm / self._initial_pg_norm)**self._power
+            self._solution_factor = min(self._solution_factor, max(1.0, self._initial_solution_factor * ratio))
+            self._split_factor = min(self._split_factor, max(1.0, self._initial_split_factor * ratio))
+        return self.solution_factor, self.split_factor
+
+    @property
+    def solution_factor(self):
+        return self._solution_factor
+
+    @property
+    def split_factor(self):
+        return self._split_factor
+
+    @property
+    def pg_norm(self):
+        return self._pg_norm
+
+
+class MiniBatchSampler(object):
+    """
+    Random mini-batches of views and pixel tiles for stochastic gradient estimates (see MediumEstimator.compute_gradient).
+    Every evaluation samples a subset of the views, and a subset of the pixel tiles within every sampled view (without replacement).
+    The loss and gradient sums of each view are scaled by the inverse inclusion probability of its pixels:
+        weight = (num_views / num_sampled_views) * (num_view_tiles / num_sampled_view_tiles)
+    which makes the l2 loss and gradient estimates unbiased.
+
+    Parameters
+    ----------
+    view_fraction: float, default=1.0
+        The fraction of views sampled every evaluation (at least one view is sampled).
+    pixel_fraction: float, default=1.0
+        The fraction of pixel tiles sampled within every sampled view (at least one tile is sampled).
+    tile_size: int, default=256
+        The number of (consecutive) pixels in a tile.
+    seed: int, optional
+        A seed for the random number generator.
+
+    Notes
+    -----
+    For the normcorr loss the pixel sums (correlation and norms) are unbiased, the normalized correlation is a consistent estimate.
+    """
+    def __init__(self, view_fraction=1.0, pixel_fraction=1.0, tile_size=256, seed=None):
+        assert 0.0 < view_fraction <= 1.0, 'view_fraction should be in (0, 1]'
+        assert 0.0 < pixel_fraction <= 1.0, 'pixel_fraction should be in (0, 1]'
+        self._view_fraction = view_fraction
+        self._pixel_fraction = pixel_fraction
+        self._tile_size = tile_size
+        self._random_state = np.random.RandomState(seed)
+        self._sampled_fraction = None
+
+    def sample(self, projection):
+        """
+        Sample a mini-batch of pixels.
+
+        Parameters
+        ----------
+        projection: shdom.Projection
+            The projection geometry of all the pixels (a shdom.MultiViewProjection for multiple views).
+
+        Returns
+        -------
+        batch: list
+            A list of (indices, weight) for every sampled view, where indices are the sorted pixel indices
+            of the sampled tiles and weight is the scaling of the view loss and gradient sums.
+        """
+        npix = projection.npix if isinstance(projection.npix, list) else [projection.npix]
+        offsets = np.concatenate(([0], np.cumsum(npix)))
+        num_views = len(npix)
+        num_sampled_views = max(1, int(round(self.view_fraction * num_views)))
+        views = np.sort(self._random_state.choice(num_views, num_sampled_views, replace=False))
+
+        batch = []
+        for view in views:
+            num_tiles = int(np.ceil(npix[view] / self.tile_size))
+            num_sampled_tiles = max(1, int(round(self.pixel_fraction * num_tiles)))
+            tiles = np.sort(self._random_state.choice(num_tiles, num_sampled_tiles, replace=False))
+            indices = np.concatenate([
+                np.arange(offsets[view] + tile * self.tile_size, offsets[view] + min((tile + 1) * self.tile_size, npix[view]))
+                for tile in tiles])
+            weight = (num_views / num_sampled_views) * (num_tiles / num_sampled_tiles)
+            batch.append((indices, weight))
+        self._sampled_fraction = sum([indices.size for indices, weight in batch]) / offsets[-1]
+        return batch
+
+    @property
+    def view_fraction(self):
+        return self._view_fraction
+
+    @property
+    def pixel_fraction(self):
+        return self._pixel_fraction
+
+    @property
+    def tile_size(self):
+        return self._tile_size
+
+    @property
+    def sampled_fraction(self):
+        """
+        The fraction of pixels sampled by the last mini-batch.
+        """
+        return self._sampled_fraction
+
+
+class StepSchedule(object):
+    """
+    A step size schedule for the stochastic optimization methods (see LocalOptimizer):
+        step_size = initial_step_size * decay**(iteration // decay_steps)
+
+    Parameters
+    ----------
+    initial_step_size: float
+        The step size of the first iteration.
+    decay: float, default=1.0
+        The multiplicative decay of the step size (1.0 for a constant step size).
+    decay_steps: int, default=1
+        The number of iterations between decays.
+    """
+    def __init__(self, initial_step_size, decay=1.0, decay_steps=1):
+        self._initial_step_size = initial_step_size
+        self._decay = decay
+        self._decay_steps = decay_steps
+
+    def step_size(self, iteration):
+        """
+        The step size at an iteration.
+
+        Parameters
+        ----------
+        iteration: int
+            The (zero based) iteration number.
+
+        Returns
+        -------
+        step_size: float
+            The step size.
+        """
+        return self._initial_step_size * self._decay**(iteration // self._decay_steps)
+
+
 class LocalOptimizer(object):
     """
     The LocalOptimizer class takes care of the under the hood of the optimization process.
@@ -1962,6 +3266,7 @@ class LocalOptimizer(object):
        [required] optimizer.set_rte_solver()
        [required] optimizer.set_medium_estimator() 
        [optional] optimizer.set_writer()
+       [optional] optimizer.set_minibatch_sampler()
 
     Parameters
     ----------
@@ -1973,13 +3278,14 @@ class LocalOptimizer(object):
         True will re-initialize the solution process every iteration.
         False will use the previous step RTE solution to initialize the current RTE solution.
     method: str, default='L-BFGS-B'
-        The optimizer solution method: 'L-BFGS-B', 'TNC'
+        The optimizer solution method: 'L-BFGS-B', 'TNC' (scipy.optimize.minimize) or
+        'SGD', 'Adam' (first-order stochastic methods, see stochastic_minimize method)
 
     Notes
     -----
-    Currently only L-BFGS-B optimization method is supported.
     For documentation:
         https://docs.scipy.org/doc/scipy/reference/optimize.minimize-lbfgsb.html
+    The stochastic methods are intended for mini-batch gradients (see set_minibatch_sampler method).
     """
     def __init__(self, method, options={}, n_jobs=1, init_solution=True):
         self._medium = None
@@ -1991,11 +3297,39 @@ class LocalOptimizer(object):
         self._loss = None
         self._n_jobs = n_jobs
         self._init_solution = init_solution
-        if method not in ['L-BFGS-B', 'TNC']:
+        self._accuracy_schedule = None
+        self._minibatch_sampler = None
+        if method not in ['L-BFGS-B', 'TNC', 'SGD', 'Adam']:
             raise NotImplementedError('Optimization method [{}] not implemented'.format(method))
         self._method = method
         self._options = options
         
+    def set_accuracy_schedule(self, accuracy_schedule):
+        """
+        Set an inexact-solve schedule for the RTE solution accuracy.
+        
+        Parameters
+        ----------
+        accuracy_schedule: shdom.SolutionAccuracySchedule
+            The schedule which relaxes the solution and splitting accuracies according to the optimization progress.
+            None restores the solver numerical parameters.
+        """
+        self._accuracy_schedule = accuracy_schedule
+        if accuracy_schedule is None and self.rte_solver is not None:
+            self.rte_solver.set_accuracy_relaxation()
+        
+    def set_minibatch_sampler(self, sampler):
+        """
+        Set a mini-batch sampler for stochastic estimates of the loss and gradient.
+        
+        Parameters
+        ----------
+        sampler: shdom.MiniBatchSampler
+            The sampler of views and pixel tiles evaluated by every objective function evaluation.
+            None evaluates all the pixels (full-batch gradients).
+        """
+        self._minibatch_sampler = sampler
+
     def set_measurements(self, measurements):
         """
         Set the measurements (data-fit constraints)
@@ -2069,9 +3403,12 @@ class LocalOptimizer(object):
         gradient, loss, images = self.medium.compute_gradient(
             rte_solvers=self.rte_solver,
             measurements=self.measurements,
-            n_jobs=self.n_jobs
+            n_jobs=self.n_jobs,
+            sampler=self.minibatch_sampler
         )
         print(state, gradient, loss)
+        if self.accuracy_schedule is not None:
+            self.accuracy_schedule.update(state, gradient, self.get_bounds())
         self._loss = loss
         self._images = images
         return loss, gradient
@@ -2103,6 +3440,9 @@ class LocalOptimizer(object):
         if self.iteration == 0:
             self.init_optimizer()
 
+        if self.method in ['SGD', 'Adam']:
+            return self.stochastic_minimize()
+
         result = minimize(fun=self.objective_fun,
                           x0=self.get_state(),
                           method=self.method,
@@ -2111,6 +3451,59 @@ class LocalOptimizer(object):
                           options=self.options,
                           callback=self.callback)
         return result
+
+    def stochastic_minimize(self):
+        """
+        Local minimization with a first-order stochastic method: 'SGD' (with momentum) or 'Adam'.
+        Every iteration evaluates the objective function once (a mini-batch if a sampler is set) and
+        the state is projected onto the bounds after every step.
+
+        Returns
+        -------
+        result: scipy.optimize.OptimizeResult
+            The optimization result. fun and jac are of the last evaluation (prior to the last step).
+
+        Notes
+        -----
+        The options dictionary may contain:
+            maxiter: int, default=100. The number of iterations.
+            step_size: float, default=0.01. The initial step size.
+            step_decay: float, default=1.0 and decay_steps: int, default=1. The step size schedule (see StepSchedule).
+            momentum: float, default=0.9. The SGD momentum.
+            beta1: float, default=0.9 and beta2: float, default=0.999. The Adam moment decay rates.
+            epsilon: float, default=1e-8. The Adam numerical stability constant.
+        """
+        maxiter = self.options.get('maxiter', 100)
+        schedule = StepSchedule(
+            self.options.get('step_size', 0.01), self.options.get('step_decay', 1.0), self.options.get('decay_steps', 1))
+        momentum = self.options.get('momentum', 0.9)
+        beta1, beta2 = self.options.get('beta1', 0.9), self.options.get('beta2', 0.999)
+        epsilon = self.options.get('epsilon', 1e-8)
+
+        bounds = self.get_bounds()
+        lower = np.array([-np.inf if bound[0] is None else bound[0] for bound in bounds], dtype=np.float64)
+        upper = np.array([np.inf if bound[1] is None else bound[1] for bound in bounds], dtype=np.float64)
+        state = np.clip(self.get_state(), lower, upper)
+        first_moment = np.zeros_like(state)
+        second_moment = np.zeros_like(state)
+        loss, gradient = None, None
+        
+        for iteration in range(maxiter):
+            loss, gradient = self.objective_fun(state)
+            if self.method == 'SGD':
+                first_moment = momentum * first_moment + gradient
+                step = first_moment
+            elif self.method == 'Adam':
+                first_moment = beta1 * first_moment + (1.0 - beta1) * gradient
+                second_moment = beta2 * second_moment + (1.0 - beta2) * gradient**2
+                step = (first_moment / (1.0 - beta1**(iteration + 1))) / \
+                       (np.sqrt(second_moment / (1.0 - beta2**(iteration + 1))) + epsilon)
+            state = np.clip(state - schedule.step_size(iteration) * step, lower, upper)
+            self.callback(state)
+
+        result = OptimizeResult(x=state, fun=loss, jac=gradient, nit=maxiter, nfev=maxiter, success=True,
+                                message='Maximum number of iterations reached')
+        return result
     
     def init_optimizer(self):
         """
@@ -2156,9 +3549,11 @@ class LocalOptimizer(object):
         """
         Set the state of the optimization. This means:
           1. Setting the MediumEstimator state
-          2. Updating the RteSolver medium
+          2. Updating the RteSolver medium (the internal grid set in init_optimizer is kept and only changed points are updated)
           3. Computing the direct solar flux
           4. Computing the current RTE solution with the previous solution as an initialization
+             (with relaxed accuracies if an accuracy schedule is set)
+          5. Updating the direct solar beam derivative paths (only new adaptive grid points are traced)
 
         Returns
         -------
@@ -2166,10 +3561,13 @@ class LocalOptimizer(object):
             The state of the medium estimator
         """
         self.medium.set_state(state)
-        self.rte_solver.set_medium(self.medium)
+        self.rte_solver.update_medium(self.medium, self.medium.get_dirty_mask())
         if self._init_solution is False:
             self.rte_solver.make_direct()
+        if self.accuracy_schedule is not None:
+            self.rte_solver.set_accuracy_relaxation(self.accuracy_schedule.solution_factor, self.accuracy_schedule.split_factor)
         self.rte_solver.solve(maxiter=100, init_solution=self._init_solution, verbose=False)
+        self.medium.compute_direct_derivative(self.rte_solver)
         
     def save_state(self, path):
         """
@@ -2243,6 +3641,14 @@ class LocalOptimizer(object):
     def images(self):
         return self._images
 
+    @property
+    def accuracy_schedule(self):
+        return self._accuracy_schedule
+
+    @property
+    def minibatch_sampler(self):
+        return getattr(self, '_minibatch_sampler', None)
+
 
 class ProximalProjection(object):
     """TODO"""
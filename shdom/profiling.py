@@ -0,0 +1,304 @@
+"""
+Profiling of the SHDOM core (Fortran) calls.
+"""
+import numpy as np
+import time, os, re, threading, warnings
+from collections import OrderedDict
+from shdom import core
+
+
+def f2py_signature(function):
+    """
+    Parse the array arguments of an f2py function from its docstring.
+
+    Parameters
+    ----------
+    function: fortran
+        The f2py core function.
+
+    Returns
+    -------
+    signature: OrderedDict
+        A dictionary of argument name: (intent, rank, typecode) ordered as the positional arguments.
+        The value is None for non-array arguments.
+    """
+    signature = OrderedDict()
+    if function.__doc__ is None:
+        return signature
+    call = re.search(r"(\w+)\(([^)]*)\)", function.__doc__)
+    if call is not None:
+        for name in re.findall(r"\w+", call.group(2)):
+            signature[name] = None
+    pattern = re.compile(r"^\s*(\w+) : (input|in/output) rank-(\d+) array\('(\w)'\)")
+    for line in function.__doc__.splitlines():
+        match = pattern.match(line)
+        if match:
+            name, intent, rank, typecode = match.groups()
+            signature[name] = (intent, int(rank), typecode)
+    return signature
+
+
+def f2py_copy_reason(argument, rank, typecode):
+    """
+    The reason f2py copies an input array argument before a Fortran call.
+
+    Parameters
+    ----------
+    argument: object
+        The argument passed to the f2py function.
+    rank: int
+        The rank of the Fortran array.
+    typecode: str
+        The f2py typecode of the Fortran array (e.g. 'f' for float32, 'd' for float64, 'i' for int32).
+
+    Returns
+    -------
+    reason: str or None
+        The reason for the copy or None if the argument is passed without copying.
+    """
+    if not isinstance(argument, np.ndarray):
+        return 'not an ndarray'
+    if argument.dtype != np.dtype(typecode):
+        return 'dtype {} (expected {})'.format(argument.dtype, np.dtype(typecode))
+    if not argument.flags['ALIGNED']:
+        return 'not aligned'
+    if rank > 1 and argument.ndim > 1 and not argument.flags['F_CONTIGUOUS']:
+        return 'not Fortran contiguous'
+    if not (argument.flags['F_CONTIGUOUS'] or argument.flags['C_CONTIGUOUS']):
+        return 'not contiguous'
+    return None
+
+
+class CoreProfiler(object):
+    """
+    An opt-in instrumentation layer for the shdom.core (Fortran) module.
+    When enabled, the core functions are replaced by wrappers which record the number of calls, wall and CPU time
+    and the size of the array arguments marshalled into and out of Fortran.
+
+    Parameters
+    ----------
+    functions: list of str, optional
+        The names of the core functions to profile. Default is all the core functions.
+    report_copies: bool, default=False
+        A debug flag. If True, a warning is issued for every implicit f2py copy of an input array argument.
+
+    Notes
+    -----
+    The profiler can be used as a context manager:
+        profiler = shdom.CoreProfiler()
+        with profiler:
+            rte_solver.solve(maxiter=100)
+        print(profiler.report)
+    Only a single profiler can be enabled at a time.
+    CPU time is measured per thread, therefore it is meaningful with the threading backends (threadsafe Fortran).
+    Input arrays which f2py copies before the call (wrong dtype, non-contiguous or not Fortran ordered,
+    according to the function f2py signature) are counted in copied_bytes and listed in copies.
+    """
+    _enabled_profiler = None
+
+    def __init__(self, functions=None, report_copies=False):
+        if functions is None:
+            functions = [name for name in dir(core) if type(getattr(core, name)).__name__ == 'fortran']
+        self._functions = functions
+        self._report_copies = report_copies
+        self._originals = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all the recorded statistics.
+        """
+        self._stats = OrderedDict()
+        self._copies = OrderedDict()
+
+    def enable(self):
+        """
+        Replace the core functions with profiling wrappers.
+        """
+        assert CoreProfiler._enabled_profiler is None, 'A CoreProfiler is already enabled'
+        for name in self._functions:
+            function = getattr(core, name)
+            self._originals[name] = function
+            setattr(core, name, self.wrap(name, function))
+        CoreProfiler._enabled_profiler = self
+
+    def disable(self):
+        """
+        Restore the original core functions.
+        """
+        for name, function in self._originals.items():
+            setattr(core, name, function)
+        self._originals = OrderedDict()
+        if CoreProfiler._enabled_profiler is self:
+            CoreProfiler._enabled_profiler = None
+
+    def wrap(self, name, function):
+        """
+        Wrap a core function with a profiling wrapper.
+
+        Parameters
+        ----------
+        name: str
+            The core function name.
+        function: fortran
+            The f2py core function.
+
+        Returns
+        -------
+        wrapper: function
+            A function with the same signature which records the call statistics.
+        """
+        signature = f2py_signature(function)
+
+        def wrapper(*args, **kwargs):
+            arguments = [arg for arg in list(args) + list(kwargs.values()) if isinstance(arg, np.ndarray)]
+            if any(signature.values()):
+                copies = self.find_copies(name, signature, args, kwargs)
+                copied_bytes = sum([nbytes for argument, nbytes, reason in copies])
+            else:
+                copied_bytes = sum([arg.nbytes for arg in arguments if arg.ndim > 1 and not arg.flags['F_CONTIGUOUS']])
+            wall_time, cpu_time = time.time(), time.thread_time()
+            output = function(*args, **kwargs)
+            wall_time, cpu_time = time.time() - wall_time, time.thread_time() - cpu_time
+            outputs = output if isinstance(output, tuple) else [output]
+            self.record(
+                name, wall_time, cpu_time,
+                input_bytes=sum([arg.nbytes for arg in arguments]),
+                output_bytes=sum([out.nbytes for out in outputs if isinstance(out, np.ndarray)]),
+                copied_bytes=copied_bytes,
+                max_array_bytes=max([arg.nbytes for arg in arguments] + [0])
+            )
+            return output
+        wrapper.__doc__ = function.__doc__
+        wrapper.__name__ = name
+        return wrapper
+
+    def find_copies(self, name, signature, args, kwargs):
+        """
+        Find (and record) the input array arguments which f2py copies before a call.
+
+        Parameters
+        ----------
+        name: str
+            The core function name.
+        signature: OrderedDict
+            The array arguments of the function (see f2py_signature).
+        args: tuple
+            The positional arguments of the call.
+        kwargs: dict
+            The keyword arguments of the call.
+
+        Returns
+        -------
+        copies: list
+            A list of (argument name, nbytes, reason) tuples.
+        """
+        arguments = OrderedDict(zip(signature.keys(), args))
+        arguments.update(kwargs)
+        copies = []
+        for argument, value in arguments.items():
+            if signature.get(argument) is None or value is None:
+                continue
+            intent, rank, typecode = signature[argument]
+            if intent != 'input':
+                continue
+            reason = f2py_copy_reason(value, rank, typecode)
+            if reason is not None:
+                copies.append((argument, np.asarray(value).nbytes, reason))
+
+        with self._lock:
+            for argument, nbytes, reason in copies:
+                key = (name, argument)
+                if key not in self._copies:
+                    self._copies[key] = OrderedDict([('calls', 0), ('copied_bytes', 0), ('reason', reason)])
+                self._copies[key]['calls'] += 1
+                self._copies[key]['copied_bytes'] += nbytes
+                self._copies[key]['reason'] = reason
+
+        if self.report_copies:
+            for argument, nbytes, reason in copies:
+                warnings.warn('Implicit f2py copy of core.{}({}) [{:.2f} MB]: {}'.format(
+                    name, argument, nbytes / 1024**2, reason))
+        return copies
+
+    def record(self, name, wall_time, cpu_time, input_bytes=0, output_bytes=0, copied_bytes=0, max_array_bytes=0):
+        """
+        Record a single call.
+
+        Parameters
+        ----------
+        name: str
+            The core function name.
+        wall_time: float
+            Wall time [seconds].
+        cpu_time: float
+            CPU time of the calling thread [seconds].
+        input_bytes: int
+            The total size of the input array arguments.
+        output_bytes: int
+            The total size of the output arrays.
+        copied_bytes: int
+            The total size of input arrays which are not Fortran contiguous.
+        max_array_bytes: int
+            The size of the largest input array argument.
+        """
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = OrderedDict([
+                    ('calls', 0), ('wall_time', 0.0), ('cpu_time', 0.0), ('input_bytes', 0),
+                    ('output_bytes', 0), ('copied_bytes', 0), ('max_array_bytes', 0)])
+            stats = self._stats[name]
+            stats['calls'] += 1
+            stats['wall_time'] += wall_time
+            stats['cpu_time'] += cpu_time
+            stats['input_bytes'] += input_bytes
+            stats['output_bytes'] += output_bytes
+            stats['copied_bytes'] += copied_bytes
+            stats['max_array_bytes'] = max(stats['max_array_bytes'], max_array_bytes)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    @property
+    def stats(self):
+        """
+        An OrderedDict with the statistics of every called core function (sorted by total wall time).
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]['wall_time'], reverse=True)
+            return OrderedDict([(name, OrderedDict(stats)) for name, stats in items])
+
+    @property
+    def copies(self):
+        """
+        An OrderedDict of (function name, argument name): statistics of the implicit f2py copies
+        (number of calls, total copied bytes and the reason for the copy).
+        """
+        with self._lock:
+            return OrderedDict([(key, OrderedDict(stats)) for key, stats in self._copies.items()])
+
+    @property
+    def report_copies(self):
+        return self._report_copies
+
+    @property
+    def enabled(self):
+        return CoreProfiler._enabled_profiler is self
+
+    @property
+    def report(self):
+        """
+        A table of the statistics of every called core function.
+        """
+        report = '{:<28}{:>8}{:>12}{:>12}{:>12}{:>12}{:>12}{}'.format(
+            'function', 'calls', 'wall [s]', 'cpu [s]', 'in [MB]', 'out [MB]', 'copy [MB]', os.linesep)
+        for name, stats in self.stats.items():
+            report += '{:<28}{:>8d}{:>12.3f}{:>12.3f}{:>12.1f}{:>12.1f}{:>12.1f}{}'.format(
+                name, stats['calls'], stats['wall_time'], stats['cpu_time'], stats['input_bytes'] / 1024**2,
+                stats['output_bytes'] / 1024**2, stats['copied_bytes'] / 1024**2, os.linesep)
+        return report
@@ -4,11 +4,12 @@ Here all the necessary functions used to solve the RT using SHDOM are wrapped.
 """
 import numpy as np
 from enum import Enum
-import sys, os, copy
+import sys, os, copy, uuid, tempfile, shutil, time, zipfile, struct, itertools, hashlib, warnings
 import dill as pickle
 from joblib import Parallel, delayed
 import shdom 
 from shdom import core, float_round
+from collections import OrderedDict
 
 
 class BC(Enum):
@@ -295,8 +296,370 @@ class ShdomPropertyArrays(object):
         self.nzckd = None
         self.zckd = None
         self.gasabs = None
+
+
+class ConvergencePolicy(object):
+    """
+    A ConvergencePolicy adapts the iteration budget of RteSolver.solve according to the convergence slope of the solution criterion.
+    The slope is the decrease of log10(solution criterion) per iteration, estimated by a linear fit over the last iterations.
+    
+    Parameters
+    ----------
+    min_iter: int, default=5
+        Minimum number of iterations before the policy is allowed to stop the iterations.
+    window: int, default=5
+        Number of history records used to estimate the convergence slope.
+    stall_slope: float, default=0.01
+        The iterations are stopped early once the solution criterion decreases by less than stall_slope decades per iteration.
+    max_extension: int, default=0
+        Maximum number of iterations added on top of maxiter. The budget is only stretched if the current slope 
+        predicts that the target solution criterion is reached within the extension.
+    target_solcrit: float, optional
+        A (loose) target for the solution criterion. Iterations stop once it is reached. 
+        Default is the solution_accuracy of the solver.
+    iterations_per_step: int, default=1
+        The number of iterations between consecutive policy calls, used by RteSolver.solve unless 
+        its iterations_per_step is specified.
+        
+    Notes
+    -----
+    The policy is called with the solver and the requested maxiter after every iteration step and returns the new iteration budget.
+    Returning a budget which is not larger than the number of iterations done so far stops the iterations.
+    
+    Accuracy trade-off: every iteration step is a separate SHDOM solution_iterations call, which restarts the adaptive 
+    cell splitting schedule (and the spherical harmonic truncation switch after 30 iterations). The solution 
+    (and npts) of a policy driven solve therefore differs from a single call solve with the same number of iterations. 
+    Larger steps are closer to the single call solution but give the policy fewer opportunities to stop or extend the budget.
+    """
+    def __init__(self, min_iter=5, window=5, stall_slope=0.01, max_extension=0, target_solcrit=None, iterations_per_step=1):
+        self._min_iter = min_iter
+        self._iterations_per_step = iterations_per_step
+        self._window = max(2, window)
+        self._stall_slope = stall_slope
+        self._max_extension = max_extension
+        self._target_solcrit = target_solcrit
+        
+    def slope(self, history):
+        """
+        Estimate the convergence slope from the solution history.
+        
+        Parameters
+        ----------
+        history: list of dict
+            The solution history (see RteSolver.solution_history).
+        
+        Returns
+        -------
+        slope: float
+            The change in log10(solution criterion) per iteration (negative when converging) or None if the history is too short.
+        """
+        history = history[-self._window:]
+        if len(history) < 2:
+            return None
+        iterations = np.array([record['iteration'] for record in history], dtype=np.float64)
+        log_solcrit = np.log10(np.maximum([record['solcrit'] for record in history], 1e-30))
+        return np.polyfit(iterations, log_solcrit, 1)[0]
+    
+    def __call__(self, rte_solver, maxiter):
+        """
+        Compute the iteration budget.
+        
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            The solver, its solution_history is used to estimate the convergence.
+        maxiter: integer
+            The requested maximum number of iterations.
+            
+        Returns
+        -------
+        budget: int
+            The updated maximum number of iterations.
+        """
+        history = rte_solver.solution_history
+        iteration = history[-1]['iteration']
+        solcrit = history[-1]['solcrit']
+        target = rte_solver._solacc if self.target_solcrit is None else self.target_solcrit
+        
+        if solcrit <= target:
+            return iteration
+        
+        slope = self.slope(history)
+        if slope is None:
+            return maxiter
+        
+        if iteration >= self.min_iter and len(history) >= self._window and slope > -self.stall_slope:
+            return iteration
+        
+        if iteration >= maxiter and self.max_extension > 0 and slope < 0:
+            remaining = int(np.ceil((np.log10(target) - np.log10(solcrit)) / slope))
+            if iteration + remaining <= maxiter + self.max_extension:
+                return iteration + remaining
+        
+        return maxiter
+        
+    @property
+    def min_iter(self):
+        return self._min_iter
+    
+    @property
+    def window(self):
+        return self._window
+    
+    @property
+    def stall_slope(self):
+        return self._stall_slope
+    
+    @property
+    def max_extension(self):
+        return self._max_extension
+    
+    @property
+    def target_solcrit(self):
+        return self._target_solcrit
+    
+    @property
+    def iterations_per_step(self):
+        return self._iterations_per_step
+    
+    
+class MemoryPlan(object):
+    """
+    A MemoryPlan is a dry-run of the RteSolver memory allocation (see RteSolver.init_memory).
+    It computes the sizes of the internal arrays for a grid and numerical parameters without allocating anything,
+    which is useful to check that a job fits into a memory budget before the solver is set up.
+    
+    Parameters
+    ----------
+    grid: shdom.Grid
+        The base grid of the medium.
+    numerical_params: shdom.NumericalParameters
+        The numerical parameters of the solver.
+    num_stokes: int, default=1
+        The number of stokes components (1 for radiance, 3 or 4 for polarized SHDOM).
+    scene_params: shdom.SceneParameters, optional
+        The scene parameters (boundary conditions and surface type). Default is shdom.SceneParameters().
+    num_scatterers: int, default=1
+        The number of scatterers in the medium (NPART).
+    num_phase: int, default=1
+        The number of phase functions in the legendre table (NUMPHASE).
+    max_legendre: int, default=0
+        The maximum legendre order of the phase functions in the table.
+        
+    Notes
+    -----
+    Sizes are in bytes. The SHDOM memory model (max_total_mb) counts 4 byte words of the grid, cell and spherical harmonic arrays,
+    the property arrays and small angular arrays are listed but are not part of the memory model.
+    """
+    def __init__(self, grid, numerical_params, num_stokes=1, scene_params=None, num_scatterers=1, num_phase=1, max_legendre=0):
+        if scene_params is None:
+            scene_params = SceneParameters()
+        self._num_stokes = num_stokes
+        self._messages = []
+        self._feasible = True
+        
+        bcflag = 0
+        if scene_params.boundary_conditions['x'] == BC.open:
+            bcflag += 1
+        if scene_params.boundary_conditions['y'] == BC.open:
+            bcflag += 2
+            
+        # Base grid (see RteSolver.set_grid)
+        nx, ny, nz = max(1, grid.nx), max(1, grid.ny), max(2, grid.nz)
+        nx1, ny1 = nx + 1, ny + 1
+        if bcflag & 5:
+            nx1 -= 1
+        if bcflag & 7:
+            ny1 -= 1
+        self._nbpts = nx * ny * nz
+        
+        # Memory parameters (see RteSolver.init_memory)
+        nmu = max(2, 2 * int((numerical_params.num_mu_bins + 1) / 2))
+        nphi = max(1, numerical_params.num_phi_bins)
+        ml = nmu - 1
+        mm = max(0, int(nphi / 2) - 1)
+        nlm = (2 * mm + 1) * (ml + 1) - mm * (mm + 1)
+        nphi0max = nphi
+        memword = nmu*(2 + 2 * nphi + 2 * nlm + 2 * 33 *32)
+        max_total_mb = min(numerical_params.max_total_mb, 1.75*sys.maxsize/1024**2)
+        adapt_grid_factor = 1.0 if numerical_params.split_accuracy < 0.0 else numerical_params.adapt_grid_factor
+        big_arrays = 3 if numerical_params.acceleration_flag else 2
         
+        point_words = 28 + 16.5 * numerical_params.cell_to_point_ratio + nphi0max*num_stokes
+        sh_words = num_stokes*nlm*big_arrays
+        wantmem = adapt_grid_factor * self._nbpts * (point_words + numerical_params.num_sh_term_factor*sh_words)
+        available = (max_total_mb * 1024**2) / 4 - memword
+        self._reduce = min(1.0, available / wantmem)
+        self._requested_adapt_grid_factor = adapt_grid_factor
+        self._adapt_grid_factor = adapt_grid_factor * self._reduce
+        if self._adapt_grid_factor <= 1.0:
+            self._feasible = False
+            self._messages.append('max_total_mb memory limit exceeded with just base grid.')
+        if self._reduce < 1.0:
+            self._messages.append('adapt_grid_factor reduced to {}'.format(self._adapt_grid_factor))
         
+        self._maxig = int(self._adapt_grid_factor*self._nbpts)
+        self._maxic = int(numerical_params.cell_to_point_ratio*self._maxig)
+        self._maxiv = int(numerical_params.num_sh_term_factor*nlm*self._maxig)
+        self._maxido = self._maxig*nphi0max
+        if 4.0*(self._maxiv+self._maxig)*num_stokes >= sys.maxsize:
+            self._feasible = False
+            self._messages.append('size of big sh arrays (maxiv) probably exceeds max integer number of bytes: {}'.format(self._maxiv))
+        if 4.0*8.0*self._maxic > sys.maxsize:
+            self._feasible = False
+            self._messages.append('size of gridptr array (8*maxic) probably exceeds max integer number of bytes: {}'.format(8*self._maxic))
+        maxnbc = int(self._maxig*3/nz)
+        maxsfcpars = 4
+        if scene_params.surface.type == 'Lambertian':
+            maxbcrad = 2*maxnbc
+        else:
+            maxbcrad = int((2+nmu*nphi0max/2)*maxnbc)
+            
+        # Largest num_sh_term_factor which fits the requested adapt_grid_factor
+        self._recommended_num_sh_term_factor = min(
+            numerical_params.num_sh_term_factor,
+            max(0.0, (available / (adapt_grid_factor * self._nbpts) - point_words) / sh_words)
+        )
+        
+        # Legendre table (see RteSolver.set_property_arrays)
+        nleg = max(max_legendre, mm+1 if numerical_params.deltam else mm)
+        nstleg = 1 if num_stokes == 1 else 6
+        nscatangle = max(36, min(721, 2*nleg))
+        
+        self._arrays = OrderedDict()
+        self._arrays['property arrays'] = 4 * (self._nbpts * (2 + 3 * num_scatterers) + nstleg * (nleg + 1) * num_phase)
+        self._arrays['grid points'] = 4 * self._maxig * (3 + 1 + 4 * num_scatterers + 1)
+        self._arrays['grid cells'] = self._maxic * (4 * (8 + 6 + 2) + 2)
+        self._arrays['sh pointers'] = 4 * (3 * self._maxig + 4)
+        self._arrays['source'] = 4 * num_stokes * self._maxiv
+        self._arrays['delsource'] = 4 * num_stokes * self._maxiv
+        self._arrays['radiance'] = 4 * num_stokes * (self._maxiv + self._maxig)
+        self._arrays['fluxes'] = 4 * 3 * self._maxig
+        self._arrays['work'] = 4 * (num_stokes * (self._maxido + self._maxig) + 8 * self._maxig)
+        self._arrays['boundary'] = 4 * (2 * maxnbc + num_stokes * maxbcrad + maxsfcpars * maxnbc)
+        self._arrays['legendre table'] = 4 * nstleg * (nleg + 1) * num_phase
+        self._arrays['phase table'] = 4 * min(nstleg, 2) * num_phase * nscatangle
+        self._arrays['angular'] = 4 * memword
+        
+    @property
+    def arrays(self):
+        """An OrderedDict with the (approximate) number of bytes of each group of solver arrays."""
+        return self._arrays
+    
+    @property
+    def nbytes(self):
+        return sum(self._arrays.values())
+    
+    @property
+    def total_mb(self):
+        return self.nbytes / 1024**2
+    
+    @property
+    def nbpts(self):
+        return self._nbpts
+    
+    @property
+    def maxig(self):
+        return self._maxig
+    
+    @property
+    def maxic(self):
+        return self._maxic
+    
+    @property
+    def maxiv(self):
+        return self._maxiv
+    
+    @property
+    def maxido(self):
+        return self._maxido
+    
+    @property
+    def adapt_grid_factor(self):
+        """The adapt_grid_factor after reduction to the max_total_mb memory limit."""
+        return self._adapt_grid_factor
+    
+    @property
+    def headroom(self):
+        """The number of adaptive grid points which can be added to the base grid."""
+        return max(0, self._maxig - self._nbpts)
+    
+    @property
+    def feasible(self):
+        """False if RteSolver.init_memory would fail on its memory assertions."""
+        return self._feasible
+    
+    @property
+    def recommended_adapt_grid_factor(self):
+        return self._adapt_grid_factor
+    
+    @property
+    def recommended_num_sh_term_factor(self):
+        """The largest num_sh_term_factor (up to the requested) for which the requested adapt_grid_factor fits in max_total_mb."""
+        return self._recommended_num_sh_term_factor
+    
+    @property
+    def messages(self):
+        return self._messages
+    
+    @property
+    def info(self):
+        info = 'Memory Plan: {}'.format(os.linesep)
+        for name, nbytes in self.arrays.items():
+            info += '   {}: {:.1f} MB{}'.format(name, nbytes / 1024**2, os.linesep)
+        info += '   total: {:.1f} MB{}'.format(self.total_mb, os.linesep)
+        info += '   adapt_grid_factor: {:.3f} (headroom of {} adaptive points){}'.format(self.adapt_grid_factor, self.headroom, os.linesep)
+        info += '   recommended num_sh_term_factor: {:.3f}{}'.format(self.recommended_num_sh_term_factor, os.linesep)
+        for message in self.messages:
+            info += '   {}{}'.format(message, os.linesep)
+        return info
+    
+    
+def load_npz(path, mmap_mode=None):
+    """
+    Load all the arrays of an .npz file. 
+    Unlike numpy.load, arrays which are stored uncompressed are memory-mapped if mmap_mode is specified.
+    
+    Parameters
+    ----------
+    path: str
+        Full path to the .npz file.
+    mmap_mode: {None, 'r', 'c'}
+        None loads the arrays into memory. 'r' memory-maps read-only and 'c' memory-maps copy-on-write 
+        (changes are kept in memory and not written to file). Compressed arrays are always loaded into memory.
+        
+    Returns
+    -------
+    arrays: dict
+        A dictionary of the arrays.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        for info in archive.infolist():
+            key = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap_mode is None or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member)
+                continue
+            
+            # The local file header is 30 bytes followed by the file name and extra fields
+            file.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', file.read(30)[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            if dtype.hasobject or np.prod(shape) == 0:
+                with archive.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member)
+            else:
+                arrays[key] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=file.tell(), shape=shape, 
+                                        order='F' if fortran_order else 'C')
+    return arrays
+
+
 class RteSolver(object):
     """
     Radiative Trasnfer solver object. 
@@ -343,6 +706,7 @@ class RteSolver(object):
 
         # Link to the properties array module.
         self._pa = ShdomPropertyArrays()
+        self._grid = None
         
         if scene_params:
             self.set_scene(scene_params)
@@ -410,6 +774,93 @@ class RteSolver(object):
         params = pickle.loads(data)
         self.set_param_dict(params)
 
+    def get_solution_arrays(self, prefix=''):
+        """
+        Retrieve the full solver state (adaptive grid, cell pointers, source, radiance, fluxes...) as a dictionary of arrays.
+        
+        Parameters
+        ----------
+        prefix: str, optional
+            A prefix for the array names (used to store several solvers in one file).
+            
+        Returns
+        -------
+        arrays: dict
+            A dictionary of numpy arrays. The non-array attributes are pickled into a uint8 array named <prefix>state.
+        """
+        arrays = {}
+        attributes = {}
+        pa_attributes = {}
+        for key, val in self.__dict__.items():
+            if key in ['_pa', '_shared_state']:
+                continue
+            if isinstance(val, np.ndarray):
+                arrays[prefix + key] = val
+            else:
+                attributes[key] = val
+        for key, val in self._pa.__dict__.items():
+            if isinstance(val, np.ndarray):
+                arrays[prefix + 'pa.' + key] = val
+            else:
+                pa_attributes[key] = val
+        state = pickle.dumps({'attributes': attributes, 'pa_attributes': pa_attributes}, -1)
+        arrays[prefix + 'state'] = np.frombuffer(state, dtype=np.uint8)
+        return arrays
+    
+    def set_solution_arrays(self, arrays, prefix=''):
+        """
+        Set the full solver state from a dictionary of arrays (see get_solution_arrays method).
+        
+        Parameters
+        ----------
+        arrays: dict
+            A dictionary of numpy arrays.
+        prefix: str, optional
+            The prefix of the array names.
+        """
+        state = pickle.loads(np.asarray(arrays[prefix + 'state']).tobytes())
+        self.__dict__.update(state['attributes'])
+        self._pa = ShdomPropertyArrays()
+        self._pa.__dict__.update(state['pa_attributes'])
+        for name, array in arrays.items():
+            if not name.startswith(prefix) or name == prefix + 'state':
+                continue
+            key = name[len(prefix):]
+            if key.startswith('pa.'):
+                setattr(self._pa, key[3:], array)
+            elif '.' not in key:
+                setattr(self, key, array)
+        self.invalidate_solution()
+    
+    def save_solution(self, path, compress=False):
+        """
+        Save the full solver state (parameters and solution) to an .npz file.
+        
+        Parameters
+        ----------
+        path: str,
+            Full path to file. 
+        compress: boolean, default=False
+            True for a compressed file. Uncompressed files can be memory-mapped when loaded (see load_solution).
+        """
+        savez = np.savez_compressed if compress else np.savez
+        savez(path, **self.get_solution_arrays())
+        
+    def load_solution(self, path, mmap_mode='c'):
+        """
+        Load the full solver state (parameters and solution) from an .npz file.
+        The loaded solver can be used for rendering without solving again.
+
+        Parameters
+        ----------
+        path: str,
+            Full path to file. 
+        mmap_mode: {None, 'r', 'c'}, default='c'
+            Memory-mapping mode of uncompressed arrays (see load_npz). 
+            'c' (copy-on-write) allows solution iterations without modifying the file, 'r' is for rendering only.
+        """
+        self.set_solution_arrays(load_npz(path, mmap_mode))
+
     def set_scene(self, scene_params):
         """
         Set the scene related parameters: 
@@ -495,6 +946,52 @@ class RteSolver(object):
         # No iterations have taken place
         self._iters = 0
         
+    def set_solar_source(self, source):
+        """
+        Set a new solar source (direction and flux) without modifying the medium, grid and numerical parameters.
+        The solution is restarted (num_iterations is set to 0).
+    
+        Parameters
+        ----------
+        source : shdom.SolarSource
+             The solar source.
+        """
+        if source.type != 'Solar':
+            raise NotImplementedError('Not implemented source type {}'.format(source.type))
+        self._scene_parameters = copy.copy(self._scene_parameters)
+        self._scene_parameters.source = source
+        self._solarflux = source.flux
+        self._solarmu = np.cos(np.deg2rad(source.zenith))
+        self._solaraz = np.deg2rad(source.azimuth)
+        self._skyrad = source.skyrad
+        self._iters = 0
+        self._solcrit = 1.0
+
+    def clone(self):
+        """
+        Clone the solver. 
+        Arrays which are modified by SHDOM (internal grid, solution, direct beam) are copied, 
+        while the medium property arrays (which are only read by SHDOM) are shared with the clone.
+        
+        Returns
+        -------
+        rte_solver: shdom.RteSolver
+            A new RteSolver with the same parameters, medium and solution.
+        """
+        rte_solver = RteSolver.__new__(RteSolver)
+        for key, val in self.__dict__.items():
+            if key in ['_pa', '_shared_state']:
+                continue
+            if isinstance(val, np.ndarray):
+                val = val.copy(order='K')
+            elif isinstance(val, list):
+                val = copy.copy(val)
+            rte_solver.__dict__[key] = val
+        rte_solver._pa = copy.copy(self._pa)
+        if isinstance(self._pa.extdirp, np.ndarray):
+            rte_solver._pa.extdirp = self._pa.extdirp.copy(order='K')
+        return rte_solver
+    
     def set_numerics(self, numerical_params):
         """
         Set the numerical parameters of the SHDOM forward solver.
@@ -536,7 +1033,76 @@ class RteSolver(object):
         Temperature (used for thermal radiation) is not supported (set to zero).
         """
         self.set_grid(medium.grid)
+        self.set_property_arrays(medium)
+        self.transfer_pa_to_grid()
+
+    def update_medium(self, medium, dirty_mask=None):
+        """
+        Update the optical medium properties without re-initializing the internal grid structures.
+        The adaptive grid, cell tree and the source/radiance fields of the previous solution are left in place 
+        and only the property array is transferred onto the (possibly split) internal grid.
+        This is useful when the medium changes but its grid doesn't (e.g. between optimization iterations).
+        
+        Parameters
+        ----------
+        medium: shdom.Medium
+            a Medium object conatining the optical properties.
+        dirty_mask: np.array(shape=(nx, ny, nz), dtype=bool), optional
+            The medium grid points which changed since the previous update (see MediumEstimator.get_dirty_mask).
+            If specified, only the internal grid points which depend on these points are updated (see transfer_dirty_pa_to_grid).
+            
+        Notes
+        -----
+        If no grid was previously set or the medium grid differs from the previous grid, set_medium is used instead.
+        The solution iteration criteria is set to 1.0 (restarted) unless a dirty_mask is specified.
+        """
+        if self._grid is None or not self._grid == medium.grid:
+            self.set_medium(medium)
+        elif dirty_mask is None:
+            self.set_property_arrays(medium)
+            self.transfer_pa_to_grid()
+        else:
+            numphase, legenp_shape = self._pa.numphase, np.shape(self._pa.legenp)
+            self.set_property_arrays(medium)
+            if self._pa.numphase == numphase and self._pa.legenp.shape == legenp_shape:
+                self.transfer_dirty_pa_to_grid(dirty_mask)
+            else:
+                self.transfer_pa_to_grid()
+
+    def set_accuracy_relaxation(self, solution_factor=1.0, split_factor=1.0):
+        """
+        Relax the solution and adaptive cell splitting accuracies with respect to the numerical parameters.
+        This is used to compute inexact (cheaper) solutions, e.g. in early optimization iterations.
         
+        Parameters
+        ----------
+        solution_factor: float, default=1.0
+            The solution accuracy (SOLACC) is set to numerical_params.solution_accuracy * solution_factor.
+        split_factor: float, default=1.0
+            The cell splitting accuracy (SPLITACC) is set to numerical_params.split_accuracy * split_factor.
+            
+        Notes
+        -----
+        Factors of 1.0 restore the numerical parameters. 
+        The split accuracy is not modified when adaptive cell splitting is turned off (split_accuracy <= 0).
+        """
+        self._solacc = self._numerical_parameters.solution_accuracy * solution_factor
+        if self._numerical_parameters.split_accuracy > 0.0:
+            self._splitacc = self._numerical_parameters.split_accuracy * split_factor
+
+    def set_property_arrays(self, medium):
+        """
+        Set the property arrays (extinction, albedo, phase pointers and legendre table) of the medium on the base grid.
+        
+        Parameters
+        ----------
+        medium: shdom.Medium
+            a Medium object conatining the optical properties.
+            
+        Notes
+        -----
+        Temperature (used for thermal radiation) is not supported (set to zero).
+        """
         # Temperature is used for thermal radiation. Not supported yet.
         self._pa.tempp = np.zeros(shape=(self._nbpts,), dtype=np.float32)     
         
@@ -585,6 +1151,14 @@ class RteSolver(object):
         self._nstleg = legendre_table.nstleg
         self._nstphase = min(self._nstleg, 2)
 
+    def transfer_pa_to_grid(self):
+        """
+        Transfer the property arrays onto the internal grid points (base and adaptive). 
+        
+        Notes
+        -----
+        The solution iteration criteria is set to 1.0 (restarted)
+        """
         self._temp, self._planck, self._extinct, self._albedo, self._legen, self._iphase, \
             self._total_ext, self._extmin, self._scatmin, self._albmax = core.transfer_pa_to_grid(
                 nstleg=self._nstleg,
@@ -620,6 +1194,104 @@ class RteSolver(object):
         
         # Restart solution criteria
         self._solcrit = 1.0
+        self.invalidate_solution()
+
+    def get_dirty_points(self, dirty_mask):
+        """
+        Find the internal grid points (base and adaptive) whose interpolated properties depend on changed property grid points.
+        
+        Parameters
+        ----------
+        dirty_mask: np.array(shape=(npx, npy, npz), dtype=bool)
+            The property grid points which changed.
+            
+        Returns
+        -------
+        points: np.array(dtype=np.int32)
+            The indices of the internal grid points which need to be updated.
+        """
+        npx, npy, npz = self._pa.npx, self._pa.npy, self._pa.npz
+        dirty_mask = np.reshape(dirty_mask, (npx, npy, npz))
+        x, y, z = self._gridpos[:, :self._npts]
+        ix = np.zeros(self._npts, dtype=np.int32) if npx == 1 else \
+            np.clip(np.floor((x - self._pa.xstart) / self._pa.delx), 0, npx - 1).astype(np.int32)
+        iy = np.zeros(self._npts, dtype=np.int32) if npy == 1 else \
+            np.clip(np.floor((y - self._pa.ystart) / self._pa.dely), 0, npy - 1).astype(np.int32)
+        iz = np.clip(np.searchsorted(self._pa.zlevels, z, side='right') - 1, 0, npz - 1)
+        
+        # A point is interpolated from the 8 corners of its property grid cell (x and y wrap around for periodic boundaries)
+        dirty = np.zeros(self._npts, dtype=bool)
+        for dx, dy, dz in itertools.product([0, 1], repeat=3):
+            dirty |= dirty_mask[(ix + dx) % npx, (iy + dy) % npy, np.minimum(iz + dz, npz - 1)]
+        return np.where(dirty)[0].astype(np.int32)
+    
+    def transfer_dirty_pa_to_grid(self, dirty_mask):
+        """
+        Transfer the property arrays onto the internal grid points which depend on changed property grid points.
+        This is an incremental version of transfer_pa_to_grid used to warm-start the solution when only a sub-volume of the medium changes.
+        
+        Parameters
+        ----------
+        dirty_mask: np.array(shape=(npx, npy, npz), dtype=bool)
+            The property grid points which changed.
+            
+        Notes
+        -----
+        The solution iteration criteria is not restarted. 
+        It is raised to the relative change of the total extinction so that the iterations continue from the previous solution.
+        """
+        points = self.get_dirty_points(dirty_mask)
+        if points.size == 0:
+            return
+        
+        temp, planck, extinct, albedo, self._legen, iphase, total_ext, self._extmin, self._scatmin, albmax = \
+            core.transfer_pa_to_grid(
+                nstleg=self._nstleg,
+                npart=self._npart,
+                extinctp=self._pa.extinctp,
+                albedop=self._pa.albedop,
+                iphasep=self._pa.iphasep,                
+                delx=self._pa.delx,
+                dely=self._pa.dely,                
+                xstart=self._pa.xstart,
+                ystart=self._pa.ystart,
+                zlevels=self._pa.zlevels,             
+                tempp=self._pa.tempp,          
+                legenp=self._pa.legenp,                           
+                nzckd=self._pa.nzckd,
+                zckd=self._pa.zckd,
+                gasabs=self._pa.gasabs, 
+                ml=self._ml,
+                mm=self._mm,
+                numphase=self._pa.numphase,
+                deltam=self._deltam,
+                units=self._units,
+                waveno=self._waveno,
+                wavelen=self._wavelen,
+                gridpos=np.asfortranarray(self._gridpos[:, points]),
+                nleg=self._nleg,
+                maxig=points.size,
+                npx=self._pa.npx,
+                npy=self._pa.npy,
+                npz=self._pa.npz,
+                srctype=self._srctype,
+                npts=points.size)
+        
+        previous_ext = self._total_ext[points]
+        self._temp[points] = temp
+        self._planck[points] = planck
+        self._extinct[points] = extinct
+        self._albedo[points] = albedo
+        self._iphase[points] = iphase
+        self._total_ext[points] = total_ext
+        self._albmax = max(self._albmax, albmax)
+        
+        # Warm start: the solution criteria is only raised according to the relative change
+        total_norm = np.linalg.norm(self._total_ext[:self._npts])
+        if total_norm > 0.0:
+            change = np.linalg.norm(total_ext - previous_ext) / total_norm
+            self._solcrit = min(1.0, max(self._solcrit, change))
+        self.invalidate_solution()
 
     def set_grid(self, grid):
         """
@@ -636,6 +1308,8 @@ class RteSolver(object):
                 return ret_val
             return 0         
 
+        self._grid = grid
+
         # Set shdom property array
         self._pa.npx = grid.nx
         self._pa.npy = grid.ny    
@@ -864,6 +1538,7 @@ class RteSolver(object):
                 maxsfcpars=self._maxsfcpars,
                 nphi0max=self._nphi0max
             )
+        self.invalidate_solution()
                 
     def solution_iterations(self, maxiter, verbose=True):
         """
@@ -1028,11 +1703,25 @@ class RteSolver(object):
         )
         return output_arguments
 
-    def precompute_phase(self):
+    def precompute_phase(self, force=False):
         """
         Precompute angular scattering for the entire legendre table.
         Preform a negativity check. (negcheck=True).
+        
+        Parameters
+        ----------
+        force: boolean, default=False
+            True to recompute the phase table even if the legendre table didn't change.
+            
+        Notes
+        -----
+        The phase table is cached and is only recomputed when the legendre table (contents), nleg, deltam or nstokes change.
         """
+        key = (hashlib.md5(np.ascontiguousarray(self._legen).view(np.uint8)).hexdigest(), 
+               self._legen.shape, self._nleg, self._deltam, self._nstokes, self._nscatangle, self._pa.numphase)
+        if not force and getattr(self, '_phasetab_key', None) == key:
+            return
+        self._phasetab_key = key
         self._phasetab = core.precompute_phase_check(
             negcheck=True,
             nscatangle=self._nscatangle,
@@ -1098,8 +1787,17 @@ class RteSolver(object):
             self._delsource, self._radiance, self._fluxes, self._dirflux, self._uniformzlev, self._pa.extdirp, \
             self._oldnpts, self._total_ext, self._deljdot, self._deljold, self._deljnew, self._jnorm, \
             self._work, self._work1, self._work2 = solution_arguments 
+        self.invalidate_solution()
+
+    def invalidate_solution(self):
+        """
+        Mark the medium or solution arrays as modified: the memoized solution_fingerprint is recomputed 
+        and the solution_version is incremented.
+        """
+        self._solution_fingerprint = None
+        self._solution_version = self.solution_version + 1
           
-    def solve(self, maxiter, init_solution=False, verbose=True):
+    def solve(self, maxiter, init_solution=False, verbose=True, callback=None, policy=None, iterations_per_step=None):
         """
         Main solver routine. This routine is comprised of two parts:
           1. Initialization (init_solution method), optional
@@ -1114,11 +1812,132 @@ class RteSolver(object):
             If True or no prior solution (I,J fields) exists then an initialization is preformed (part 1.).
         verbose: boolean
             True will output solution iteration information into stdout.
+        callback: callable, optional
+            A function callback(rte_solver, record) called after every iteration step with the latest solution_history record.
+        policy: callable, optional
+            A function policy(rte_solver, maxiter) which returns the iteration budget after every iteration step (e.g. shdom.ConvergencePolicy).
+        iterations_per_step: int, optional
+            Number of iterations preformed by the Fortran core between consecutive callback/policy calls.
+            Default is the policy iterations_per_step (1 if not defined) with a policy, 
+            and maxiter (a single call, identical to a solve without a callback) with only a callback.
+            
+        Raises
+        ------
+        ValueError
+            If a policy is provided with iterations_per_step >= maxiter (the policy would never be able to act).
+            
+        Notes
+        -----
+        If neither a callback nor a policy are provided, all the iterations are preformed in a single call and no history is recorded.
+        With iterations_per_step < maxiter the iterations are preformed in steps. Every step restarts the SHDOM iteration 
+        counter and adaptive cell splitting schedule (and the spherical harmonic truncation switch after 30 iterations), 
+        therefore a stepped solution (and npts) can differ from the single call solution (see shdom.ConvergencePolicy).
         """
         if self.num_iterations == 0 or init_solution:
             self.init_solution()
-        solution_arguments = self.solution_iterations(maxiter, verbose)
-        self.update_solution_arguments(solution_arguments)
+            
+        if callback is None and policy is None:
+            solution_arguments = self.solution_iterations(maxiter, verbose)
+            self.update_solution_arguments(solution_arguments)
+            return
+        
+        self._solution_history = []
+        start_time = time.time()
+        num_iterations = 0
+        budget = maxiter
+        if iterations_per_step is None:
+            iterations_per_step = maxiter if policy is None else getattr(policy, 'iterations_per_step', 1)
+        elif policy is not None and iterations_per_step >= maxiter:
+            raise ValueError('A policy requires iterations_per_step < maxiter, got iterations_per_step={} and maxiter={}'.format(
+                iterations_per_step, maxiter))
+        while num_iterations < budget:
+            step = min(iterations_per_step, budget - num_iterations)
+            solution_arguments = self.solution_iterations(step, verbose)
+            self.update_solution_arguments(solution_arguments)
+            if self._iters == 0:
+                break
+            num_iterations += self._iters
+            record = {
+                'iteration': num_iterations,
+                'solcrit': float(self._solcrit),
+                'npts': int(self._npts),
+                'ncells': int(self._ncells),
+                'nbytes': self.used_nbytes,
+                'time': time.time() - start_time
+            }
+            self._solution_history.append(record)
+            if callback is not None:
+                callback(self, record)
+            if self._iters < step:
+                break
+            if policy is not None:
+                budget = policy(self, maxiter)
+        self._iters = num_iterations
+    
+    @property
+    def solution_history(self):
+        """
+        A list of records (dict) with the iteration, solcrit, npts, ncells, nbytes (see used_nbytes) and time [sec] of the solver after every iteration step 
+        of the last RteSolver.solve call with a callback or policy.
+        """
+        if hasattr(self, '_solution_history'):
+            return self._solution_history
+        return []
+    
+    @property
+    def nbytes(self):
+        """
+        The memory footprint (bytes) of all the arrays held by the solver.
+        """
+        nbytes = sum([val.nbytes for val in self.__dict__.values() if isinstance(val, np.ndarray)])
+        nbytes += sum([val.nbytes for val in self._pa.__dict__.values() if isinstance(val, np.ndarray)])
+        return nbytes
+    
+    @property
+    def used_nbytes(self):
+        """
+        The memory footprint (bytes) of the used part of the grid point, cell and spherical harmonic arrays.
+        Unlike nbytes (the preallocated arrays), it grows with the adaptive cell splitting (see shdom.MemoryPlan for the memory model).
+        """
+        npts, ncells = int(self._npts), int(self._ncells)
+        nsh, nrsh = int(self._shptr[npts]), int(self._rshptr[npts])
+        nbytes = 4 * npts * (3 + 1 + 4 * self._npart + 1)
+        nbytes += ncells * (4 * (8 + 6 + 2) + 2)
+        nbytes += 4 * (3 * npts + 4) + 4 * 3 * npts
+        nbytes += 4 * self._nstokes * (2 * nsh + nrsh + npts)
+        return nbytes
+    
+    @property
+    def solution_fingerprint(self):
+        """
+        A hash of the solution state: the iteration counter and solution criterion, the source and surface parameters 
+        and the medium (grid point extinction, albedo, phase pointers and legendre table).
+        Used to key cached renderings (see shdom.RenderCache).
+        
+        Notes
+        -----
+        The hash of the medium arrays is memoized until the scalar parameters change or the arrays are 
+        modified (see invalidate_solution).
+        """
+        scalars = repr([getattr(self, '_' + name, None) for name in 
+                        ['iters', 'solcrit', 'npts', 'ncells', 'nstokes', 'wavelen', 'solarflux', 'solarmu', 'solaraz', 
+                         'skyrad', 'gndalbedo', 'gndtemp', 'srctype', 'sfctype', 'units']])
+        memo = getattr(self, '_solution_fingerprint', None)
+        if memo is not None and memo[0] == scalars:
+            return memo[1]
+        md5 = hashlib.md5()
+        md5.update(scalars.encode())
+        for array in [self._extinct[:self._npts], self._albedo[:self._npts], self._iphase[:self._npts], self._legen]:
+            md5.update(np.ascontiguousarray(array).view(np.uint8))
+        self._solution_fingerprint = (scalars, md5.hexdigest())
+        return self._solution_fingerprint[1]
+
+    @property
+    def solution_version(self):
+        """
+        A counter which is incremented whenever the medium or solution arrays are modified (see invalidate_solution).
+        """
+        return getattr(self, '_solution_version', 0)
     
     @property
     def name(self):
@@ -1135,12 +1954,332 @@ class RteSolver(object):
     @property
     def num_iterations(self):
         return self._iters
+
+    @property
+    def solution_accuracy(self):
+        return self._solacc
+
+    @property
+    def split_accuracy(self):
+        return self._splitacc
     
     @property
     def info(self):
         return self._scene_parameters.info + os.linesep + self._numerical_parameters.info
     
     
+class SharedSolverState(object):
+    """
+    A SharedSolverState places the (large) arrays of an RteSolver in shared memory so that worker processes
+    can rebuild a read-only view of the solver without copying or pickling the solution.
+    The object itself is light-weight and can be pickled and sent to worker processes, where get_solver() is used 
+    to attach to the shared arrays.
+    
+    Parameters
+    ----------
+    rte_solver: shdom.RteSolver
+        A solver (typically with a solution, see RteSolver.solve method).
+    storage: 'shared_memory', 'memmap' or None
+        'shared_memory' uses multiprocessing.shared_memory blocks (python>=3.8).
+        'memmap' uses memory-mapped .npy files in a temporary directory (on /dev/shm if available).
+        None (default) uses 'shared_memory' if available and 'memmap' otherwise.
+    min_nbytes: int
+        Arrays smaller than min_nbytes are pickled together with the state instead of being shared.
+        
+    Notes
+    -----
+    The process which created the state owns the shared memory and should call unlink() (or use a with statement) when done.
+    Solvers retrieved with get_solver() share arrays which are set to non-writeable, and should only be used for 
+    rendering or gradient computations (not for solution iterations).
+    """
+    def __init__(self, rte_solver, storage=None, min_nbytes=1024**2):
+        self.init_storage(storage)
+        self._min_nbytes = min_nbytes
+        self._attributes = {}
+        self._pa_attributes = {}
+        self._arrays = {}
+        self._pa_arrays = {}
+        for key, val in rte_solver.__dict__.items():
+            if key == '_pa':
+                continue
+            if isinstance(val, np.ndarray) and val.nbytes >= min_nbytes:
+                self._arrays[key] = self.share_array(key, val)
+            else:
+                self._attributes[key] = val
+        for key, val in rte_solver._pa.__dict__.items():
+            if isinstance(val, np.ndarray) and val.nbytes >= min_nbytes:
+                self._pa_arrays[key] = self.share_array('pa' + key, val)
+            else:
+                self._pa_attributes[key] = val
+
+    def init_storage(self, storage):
+        """
+        Initialize the shared storage (owned by the current process).
+        
+        Parameters
+        ----------
+        storage: 'shared_memory', 'memmap' or None
+            The shared storage type. 'shared_memory' falls back to 'memmap' if multiprocessing.shared_memory 
+            is not available (python<3.8). None selects the storage type according to availability.
+        """
+        if storage not in ['shared_memory', 'memmap', None]:
+            raise NotImplementedError('Shared storage [{}] not implemented'.format(storage))
+        if storage in ['shared_memory', None]:
+            try:
+                from multiprocessing import shared_memory
+                storage = 'shared_memory'
+            except ImportError:
+                if storage == 'shared_memory':
+                    warnings.warn('multiprocessing.shared_memory is not available (python>=3.8), using memmap storage')
+                storage = 'memmap'
+        self._storage = storage
+        self._token = uuid.uuid4().hex
+        self._owner = True
+        self._shared_memory = []
+        self._attached_memory = []
+        self._dir = None
+        if storage == 'memmap':
+            self._dir = tempfile.mkdtemp(prefix='shdom_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+    def share_array(self, key, array):
+        """
+        Copy an array into shared storage.
+        
+        Parameters
+        ----------
+        key: str
+            The attribute name of the array.
+        array: np.array
+            The array to share.
+            
+        Returns
+        -------
+        descriptor: tuple
+            A (name, shape, dtype, order) tuple used to attach to the shared array.
+        """
+        order = 'F' if array.flags.f_contiguous and not array.flags.c_contiguous else 'C'
+        if self.storage == 'shared_memory':
+            from multiprocessing import shared_memory
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, order=order)
+            shared[...] = array
+            self._shared_memory.append(shm)
+            name = shm.name
+        else:
+            name = os.path.join(self._dir, '{}_{}.npy'.format(self._token, key))
+            np.save(name, np.asarray(array, order=order))
+        return name, array.shape, array.dtype.str, order
+
+    def update_arrays(self, rte_solver, keys):
+        """
+        Refresh solver attributes which were modified since the state was created (e.g. derivative tables), 
+        without sharing the entire solver again. Should only be called by the owner process, while no worker is attached.
+        
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            The solver the state was created from.
+        keys: list of str
+            The attribute names to refresh.
+            
+        Notes
+        -----
+        Large arrays are copied in place when their shape, dtype and order are unchanged, 
+        otherwise their previous storage is released and they are shared again.
+        """
+        for key in keys:
+            val = getattr(rte_solver, key)
+            descriptor = self._arrays.pop(key, None)
+            self._attributes.pop(key, None)
+            if not (isinstance(val, np.ndarray) and val.nbytes >= self._min_nbytes):
+                self._attributes[key] = val
+                if descriptor is not None:
+                    self.release_array(descriptor)
+                continue
+            order = 'F' if val.flags.f_contiguous and not val.flags.c_contiguous else 'C'
+            if descriptor is not None and descriptor[1:] == (val.shape, val.dtype.str, order):
+                name, shape, dtype, order = descriptor
+                if self.storage == 'shared_memory':
+                    shm = [shm for shm in self._shared_memory if shm.name == name][0]
+                    shared = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, order=order)
+                else:
+                    shared = np.load(name, mmap_mode='r+')
+                shared[...] = val
+                del shared
+                self._arrays[key] = descriptor
+            else:
+                if descriptor is not None:
+                    self.release_array(descriptor)
+                self._arrays[key] = self.share_array(key, val)
+    
+    def release_array(self, descriptor):
+        """
+        Release the storage of a single shared array. Should only be called by the owner process.
+        
+        Parameters
+        ----------
+        descriptor: tuple
+            A (name, shape, dtype, order) tuple (see share_array method).
+        """
+        name = descriptor[0]
+        if self.storage == 'shared_memory':
+            for shm in [shm for shm in self._shared_memory if shm.name == name]:
+                self._shared_memory.remove(shm)
+                shm.close()
+                shm.unlink()
+        elif os.path.exists(name):
+            os.remove(name)
+
+    def attach_array(self, descriptor, writeable=False):
+        """
+        Attach to a shared array without copying.
+        
+        Parameters
+        ----------
+        descriptor: tuple
+            A (name, shape, dtype, order) tuple (see share_array method).
+        writeable: bool, default=False
+            If True, the view is writeable and writes are visible to all the processes (e.g. shared accumulators).
+            
+        Returns
+        -------
+        array: np.array
+            A (non-writeable by default) view of the shared array.
+        """
+        name, shape, dtype, order = descriptor
+        if self.storage == 'shared_memory':
+            from multiprocessing import shared_memory
+            shm = shared_memory.SharedMemory(name=name)
+            if not self._owner:
+                # The owner process is responsible for unlinking: detach the block from this process resource tracker
+                try:
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(shm._name, 'shared_memory')
+                except Exception:
+                    pass
+            self._attached_memory.append(shm)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, order=order)
+        else:
+            array = np.load(name, mmap_mode='r+' if writeable else 'r')
+        array.flags.writeable = writeable
+        return array
+
+    def get_solver(self):
+        """
+        Rebuild a read-only RteSolver view of the shared state.
+        
+        Returns
+        -------
+        rte_solver: shdom.RteSolver
+            A solver whose large arrays are views of the shared storage.
+        """
+        rte_solver = RteSolver.__new__(RteSolver)
+        rte_solver.__dict__.update(self._attributes)
+        for key, descriptor in self._arrays.items():
+            rte_solver.__dict__[key] = self.attach_array(descriptor)
+        rte_solver._pa = ShdomPropertyArrays()
+        rte_solver._pa.__dict__.update(self._pa_attributes)
+        for key, descriptor in self._pa_arrays.items():
+            rte_solver._pa.__dict__[key] = self.attach_array(descriptor)
+        
+        # Keep the shared memory handles alive as long as the solver is alive
+        rte_solver._shared_state = self
+        return rte_solver
+
+    def close(self):
+        """Close this process access to the shared memory blocks."""
+        for shm in self._shared_memory + self._attached_memory:
+            try:
+                shm.close()
+            except BufferError:
+                # Views of the block are still alive
+                pass
+        self._attached_memory = []
+    
+    def unlink(self):
+        """Release the shared storage. Should only be called by the owner process."""
+        if not self._owner:
+            return
+        self.close()
+        for shm in self._shared_memory:
+            shm.unlink()
+        self._shared_memory = []
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shared_memory'] = []
+        state['_attached_memory'] = []
+        state['_owner'] = False
+        return state
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+    @property
+    def storage(self):
+        return self._storage
+    
+    @property
+    def token(self):
+        return self._token
+    
+    @property
+    def nbytes(self):
+        return sum([np.prod(shape, dtype=np.int64) * np.dtype(dtype).itemsize for _, shape, dtype, _ in 
+                    list(self._arrays.values()) + list(self._pa_arrays.values())])
+
+
+def parallel_solution_iterations(rte_solvers, maxiter, verbose=True, backend='threading', n_jobs=None, max_nbytes='1M'):
+    """
+    Run the solution iterations of several solvers in parallel and update each solver with its output arguments.
+    
+    Parameters
+    ----------
+    rte_solvers: list of shdom.RteSolver
+        A list of initialized solvers (see RteSolver.init_solution method).
+    maxiter: integer
+        Maximum number of iterations for the iterative solution.
+    verbose: boolean
+        True will output solution iteration information into stdout.
+    backend: 'threading', 'loky' or 'multiprocessing'
+        'threading' runs all solvers in the current process and relies on the Fortran core releasing the GIL. 
+        'loky' or 'multiprocessing' run every solver in a separate worker process. The solver arrays which are 
+        larger than max_nbytes are shipped to the workers through shared memory (memory mapped copy-on-write) 
+        and the solution is mapped back with RteSolver.update_solution_arguments.
+    n_jobs: int, optional
+        The number of parallel workers. Default is one worker per solver.
+    max_nbytes: int or str
+        Threshold on the size of arrays that are memory mapped (process backends only). See joblib.Parallel for more info.
+        
+    Notes
+    -----
+    With the process backends the Python argument marshalling of each solver is done by its own worker.
+    """
+    if n_jobs is None:
+        n_jobs = len(rte_solvers)
+        
+    if backend == 'threading':
+        output_arguments = \
+            Parallel(n_jobs=n_jobs, backend="threading")(
+                delayed(rte_solver.solution_iterations, check_pickle=False)(
+                    maxiter, verbose) for rte_solver in rte_solvers)
+    elif backend in ['loky', 'multiprocessing']:
+        output_arguments = \
+            Parallel(n_jobs=n_jobs, backend=backend, max_nbytes=max_nbytes, mmap_mode='c')(
+                delayed(rte_solver.solution_iterations)(
+                    maxiter, verbose) for rte_solver in rte_solvers)
+    else:
+        raise NotImplementedError('Parallel backend [{}] not implemented'.format(backend))
+    
+    for solver, arguments in zip(rte_solvers, output_arguments):
+        solver.update_solution_arguments(arguments)
+
+
 class RteSolverArray(object):
     """
     An RteSolverArray object encapsulate several solvers e.g. for multiple spectral imaging
@@ -1179,6 +2318,44 @@ class RteSolverArray(object):
         for solver in self.solver_list:
             solver.set_medium(medium)
 
+    def update_medium(self, medium, dirty_mask=None):
+        """
+        Update the optical medium properties for all rte_solvers within the list without re-initializing the internal grids.
+        medium.wavelength must match solver.wavelengths
+        
+        Parameters
+        ----------
+        medium: shdom.Medium
+            a Medium object conatining the optical properties.
+        dirty_mask: np.array(dtype=bool), optional
+            The medium grid points which changed since the previous update.
+            
+        Notes
+        -----
+        See RteSolver.update_medium for more details.
+        """
+        assert np.allclose(medium.wavelength, self.wavelength), 'medium wavelength {} differs from solver wavelengh {}'.format(medium.wavelength, self.wavelength)
+        for solver in self.solver_list:
+            solver.update_medium(medium, dirty_mask)
+
+    def set_accuracy_relaxation(self, solution_factor=1.0, split_factor=1.0):
+        """
+        Relax the solution and adaptive cell splitting accuracies of all rte_solvers within the list.
+        
+        Parameters
+        ----------
+        solution_factor: float, default=1.0
+            A multiplicative factor for the solution accuracy of each solver.
+        split_factor: float, default=1.0
+            A multiplicative factor for the cell splitting accuracy of each solver.
+            
+        Notes
+        -----
+        See RteSolver.set_accuracy_relaxation for more details.
+        """
+        for solver in self.solver_list:
+            solver.set_accuracy_relaxation(solution_factor, split_factor)
+
     def get_param_dict(self):
         """
         Retrieve a dictionary with the solver array parameters
@@ -1276,6 +2453,42 @@ class RteSolverArray(object):
                 self._num_solvers += 1
         self._wavelength = list(set(self._wavelength))
       
+    def save_solution(self, path, compress=False):
+        """
+        Save the full state (parameters and solution) of all solvers to a single .npz file.
+        
+        Parameters
+        ----------
+        path: str,
+            Full path to file. 
+        compress: boolean, default=False
+            True for a compressed file. Uncompressed files can be memory-mapped when loaded (see load_solution).
+        """
+        arrays = {}
+        for i, solver in enumerate(self.solver_list):
+            arrays.update(solver.get_solution_arrays(prefix='solver{}.'.format(i)))
+        savez = np.savez_compressed if compress else np.savez
+        savez(path, **arrays)
+        
+    def load_solution(self, path, mmap_mode='c'):
+        """
+        Load the full state (parameters and solution) of all solvers from an .npz file and add them to the RteSolverArray.
+        
+        Parameters
+        ----------
+        path: str,
+            Full path to file. 
+        mmap_mode: {None, 'r', 'c'}, default='c'
+            Memory-mapping mode of uncompressed arrays (see RteSolver.load_solution).
+        """
+        arrays = load_npz(path, mmap_mode)
+        num_solvers = len([name for name in arrays.keys() if name.endswith('.state')])
+        for i in range(num_solvers):
+            solver = RteSolver.__new__(RteSolver)
+            solver.set_solution_arrays(arrays, prefix='solver{}.'.format(i))
+            self.add_solver(solver)
+        self._maxiters = max([solver._iters for solver in self._solver_list])
+        
     def init_solution(self):
         """
         Initilize the solution (I, J fields) from the direct transmission and a simple layered model. 
@@ -1284,13 +2497,18 @@ class RteSolverArray(object):
         for solver in self.solver_list:
             solver.init_solution()
 
-    def precompute_phase(self):
+    def precompute_phase(self, force=False):
         """
         Pre-compute angular scattering for the entire legendre table.
         Preform a negativity check. (negcheck=True).
+        
+        Parameters
+        ----------
+        force: boolean, default=False
+            True to recompute the phase tables even if the legendre tables didn't change (see RteSolver.precompute_phase).
         """
         for solver in self.solver_list:
-            solver.precompute_phase()
+            solver.precompute_phase(force)
 
     def make_direct(self):
         """
@@ -1299,7 +2517,8 @@ class RteSolverArray(object):
         for solver in self.solver_list:
             solver.make_direct()    
             
-    def solve(self, maxiter, init_solution=False, verbose=True):
+    def solve(self, maxiter, init_solution=False, verbose=True, backend='threading', n_jobs=None,
+              callback=None, policy=None, iterations_per_step=None):
         """
         Parallel solving of all solvers.
         
@@ -1316,18 +2535,28 @@ class RteSolverArray(object):
             If True or no prior solution (I,J fields) exists then an initialization is preformed (part 1.).
         verbose: boolean
             True will output solution iteration information into stdout.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel execution backend (see parallel_solution_iterations).
+        n_jobs: int, optional
+            The number of parallel workers. Default is one worker per solver.
+        callback: callable, optional
+            Called by each solver after every iteration step (see RteSolver.solve). Only supported with the 'threading' backend.
+        policy: callable, optional
+            An iteration budget policy applied to each solver separately (see RteSolver.solve). Only supported with the 'threading' backend.
+        iterations_per_step: int, optional
+            Number of iterations between consecutive callback/policy calls (default as in RteSolver.solve).
         """
         for solver in self.solver_list:
             if init_solution or solver.num_iterations == 0:
                 solver.init_solution()        
 
-        output_arguments = \
-            Parallel(n_jobs=self.num_solvers, backend="threading")(
-                delayed(rte_solver.solution_iterations, check_pickle=False)(
-                    maxiter, verbose) for rte_solver in self.solver_list)
-     
-        for solver, arguments in zip(self.solver_list, output_arguments):
-            solver.update_solution_arguments(arguments)
+        if callback is None and policy is None:
+            parallel_solution_iterations(self.solver_list, maxiter, verbose, backend, n_jobs)
+        else:
+            assert backend == 'threading', 'Solution callback and policy are only supported with the threading backend'
+            Parallel(n_jobs=self.num_solvers if n_jobs is None else n_jobs, backend="threading")(
+                delayed(solver.solve, check_pickle=False)(
+                    maxiter, False, verbose, callback, policy, iterations_per_step) for solver in self.solver_list)
 
         self._maxiters = max([solver._iters for solver in self._solver_list])
 
@@ -1357,3 +2586,91 @@ class RteSolverArray(object):
             return self._wavelength[0]
         else:
             return self._wavelength
+
+
+class RteSolverBatch(RteSolverArray):
+    """
+    An RteSolverBatch solves a single medium for several solar sources (e.g. sun-angle sweeps).
+    The grid, property arrays and legendre table are set up once and cloned for every solar source (see RteSolver.clone).
+    
+    Parameters
+    ----------
+    scene_params: shdom.SceneParameters
+        An object specifying scene parameters. The source is replaced by each of the sources.
+    numerical_params: shdom.NumericalParameters
+        An object specifying numerical parameters (shared by all solvers).
+    sources: list of shdom.SolarSource
+        The solar sources. A solver is created for every source when the medium is set (see set_medium method).
+    num_stokes: int
+        The number of stokes for which to solve the RTE can be 1, 3, or 4. 
+        
+    Notes
+    -----
+    All the solvers have the same wavelength. To render a specific geometry use the corresponding solver in the solver_list.
+    """
+    def __init__(self, scene_params, numerical_params, sources, num_stokes=1):
+        super().__init__()
+        self._scene_params = scene_params
+        self._numerical_params = numerical_params
+        self._sources = list(sources)
+        self._num_stokes = num_stokes
+        
+    def set_medium(self, medium):
+        """
+        Set the optical medium properties once and clone the solver for every solar source.
+        
+        Parameters
+        ----------
+        medium: shdom.Medium
+            a Medium object conatining the optical properties.
+        """
+        template = RteSolver(self._scene_params, self._numerical_params, self._num_stokes)
+        template.set_medium(medium)
+        
+        self._num_solvers = 0
+        self._solver_list = []
+        self._wavelength = []
+        self._name = []
+        self._type = None
+        self._maxiters = 0
+        for i, source in enumerate(self.sources):
+            solver = template if i == 0 else template.clone()
+            solver.set_solar_source(source)
+            solver._name = '{} {:1.3f} micron, sun ({:.1f}, {:.1f}) deg'.format(
+                solver.type, solver.wavelength, source.zenith, source.azimuth)
+            self.add_solver(solver)
+        
+    def update_medium(self, medium, dirty_mask=None):
+        """
+        Update the optical medium properties of all the solvers without re-initializing their internal grids.
+        The property arrays and legendre table are computed once and shared by all the solvers.
+        
+        Parameters
+        ----------
+        medium: shdom.Medium
+            a Medium object conatining the optical properties.
+        dirty_mask: np.array(dtype=bool), optional
+            The medium grid points which changed since the previous update (see RteSolver.update_medium).
+        """
+        assert np.allclose(medium.wavelength, self.wavelength), 'medium wavelength {} differs from solver wavelengh {}'.format(medium.wavelength, self.wavelength)
+        template = self.solver_list[0]
+        if template._grid is None or not template._grid == medium.grid:
+            self.set_medium(medium)
+            return
+        
+        numphase, legenp_shape = template._pa.numphase, np.shape(template._pa.legenp)
+        template.update_medium(medium, dirty_mask)
+        incremental = dirty_mask is not None and template._pa.numphase == numphase and template._pa.legenp.shape == legenp_shape
+        for solver in self.solver_list[1:]:
+            for key in ['tempp', 'extinctp', 'albedop', 'iphasep', 'numphase', 'legenp']:
+                setattr(solver._pa, key, getattr(template._pa, key))
+            for key in ['_nleg', '_maxleg', '_nscatangle', '_maxasym', '_maxpgl', '_maxigl', '_npart', '_nstleg', '_nstphase']:
+                setattr(solver, key, getattr(template, key))
+            if incremental:
+                solver.transfer_dirty_pa_to_grid(dirty_mask)
+            else:
+                solver.transfer_pa_to_grid()
+    
+    @property
+    def sources(self):
+        return self._sources
@@ -2,14 +2,779 @@
 Camera, Sensor and Projection related objects used for rendering.
 """
 import numpy as np
-import itertools
+import itertools, hashlib, threading
+from collections import OrderedDict
 import dill as pickle
 from joblib import Parallel, delayed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import shdom 
 from shdom import core
 
 norm = lambda x: x / np.linalg.norm(x, axis=0)
-    
+
+
+def render_shared_state(sensor, shared_state, projection):
+    """
+    Render a projection in a worker process using a solver rebuilt from shared memory.
+
+    Parameters
+    ----------
+    sensor: shdom.Sensor
+        The sensor which defines the rendering.
+    shared_state: shdom.SharedSolverState
+        The shared state of a solver with the precomputed radiative transfer solution.
+    projection: shdom.Projection
+        A projection model which specified the position and direction of each and every pixel
+
+    Returns
+    -------
+    output: np.array(dtype=np.float32)
+        The output of Sensor.render.
+    """
+    rte_solver = shared_state.get_solver()
+    output = Sensor.render(sensor, rte_solver, projection)
+    shared_state.close()
+    return output
+
+
+def render_tile(sensor, rte_solvers, projection):
+    """
+    Render a projection tile for all the solvers.
+
+    Parameters
+    ----------
+    sensor: shdom.Sensor
+        The sensor which defines the rendering.
+    rte_solvers: list of shdom.RteSolver or shdom.SharedSolverState
+        The solvers (or their shared states in a worker process) with the precomputed radiative transfer solution.
+    projection: shdom.Projection
+        A projection model which specified the position and direction of each and every pixel
+
+    Returns
+    -------
+    output: np.array(dtype=np.float32)
+        The output of Sensor.render with a trailing channel dimension for multiple solvers.
+    """
+    output = []
+    for rte_solver in rte_solvers:
+        if isinstance(rte_solver, shdom.SharedSolverState):
+            output.append(render_shared_state(sensor, rte_solver, projection))
+        else:
+            output.append(Sensor.render(sensor, rte_solver, projection))
+    output = output[0] if len(output) == 1 else np.stack(output, axis=-1)
+    return output
+
+class TileScheduler(object):
+    """
+    A rendering scheduler which splits a projection into many small tiles to be dispatched dynamically amongst workers.
+    Tiles are ordered by decreasing estimated cost (longest processing time first) so that the wall-clock render time
+    tracks the total work rather than the slowest contiguous chunk.
+
+    Parameters
+    ----------
+    tile_size: int, default=256
+        The number of pixels in each tile.
+    estimate_cost: bool, default=True
+        If True, pixels are grouped into tiles of similar cost using a column-integrated extinction map.
+        If False, tiles are contiguous pixel chunks of equal cost.
+    max_optical_path: float, default=12.0
+        The optical path beyond which the ray integration terminates (transmission ~exp(-12)).
+        The estimated pixel cost saturates at this value.
+
+    Notes
+    -----
+    The estimated cost of a pixel is 1 + min(tau / |mu|, max_optical_path) where tau is the column optical depth of
+    the medium at the point the pixel ray crosses the domain mid-height.
+    """
+    def __init__(self, tile_size=256, estimate_cost=True, max_optical_path=12.0):
+        self._tile_size = tile_size
+        self._estimate_cost = estimate_cost
+        self._max_optical_path = max_optical_path
+
+    def column_optical_depth(self, rte_solver):
+        """
+        Compute the column-integrated extinction map of the solver property grid.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+
+        Returns
+        -------
+        tau: np.array(shape=(npx, npy), dtype=np.float32)
+            The column optical depth.
+        """
+        pa = rte_solver._pa
+        extinction = pa.extinctp.sum(axis=-1).reshape(pa.npx, pa.npy, pa.npz)
+        tau = np.sum(0.5 * (extinction[..., 1:] + extinction[..., :-1]) * np.diff(pa.zlevels), axis=-1)
+        return tau
+
+    def pixel_cost(self, rte_solver, projection):
+        """
+        Estimate the relative rendering cost of every pixel.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        cost: np.array(shape=(projection.npix), dtype=np.float64)
+            The estimated cost of every pixel.
+        """
+        pa = rte_solver._pa
+        tau = self.column_optical_depth(rte_solver)
+        mu = np.clip(np.abs(projection.mu), 1e-3, 1.0)
+        sin_theta = np.sqrt(1.0 - projection.mu**2)
+        path = (0.5 * (pa.zlevels[0] + pa.zlevels[-1]) - projection.z) / np.copysign(mu, projection.mu)
+        x = projection.x + path * sin_theta * np.cos(projection.phi)
+        y = projection.y + path * sin_theta * np.sin(projection.phi)
+        ix = np.clip(np.round((x - pa.xstart) / pa.delx), 0, pa.npx - 1).astype(np.int32)
+        iy = np.clip(np.round((y - pa.ystart) / pa.dely), 0, pa.npy - 1).astype(np.int32)
+        cost = 1.0 + np.minimum(tau[ix, iy] / mu, self._max_optical_path)
+        return cost
+
+    def schedule(self, rte_solver, projection):
+        """
+        Split a projection into tiles sorted by decreasing estimated cost.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        tiles: list of tuples
+            A list of (indices, cost) tuples where indices are the projection pixel indices of the tile.
+        """
+        npix = projection.npix if np.isscalar(projection.npix) else np.sum(projection.npix)
+        if self.estimate_cost:
+            cost = self.pixel_cost(rte_solver, projection)
+            order = np.argsort(cost, kind='stable')[::-1]
+        else:
+            cost = np.ones(npix)
+            order = np.arange(npix)
+        num_tiles = max(int(np.ceil(npix / self.tile_size)), 1)
+        tiles = [(indices, cost[indices].sum()) for indices in np.array_split(order, num_tiles)]
+        tiles.sort(key=lambda tile: tile[1], reverse=True)
+        return tiles
+
+    @property
+    def tile_size(self):
+        return self._tile_size
+
+    @property
+    def estimate_cost(self):
+        return self._estimate_cost
+
+    @property
+    def max_optical_path(self):
+        return self._max_optical_path
+
+
+class RenderCache(object):
+    """
+    An opt-in least recently used (LRU) cache of Sensor.render outputs.
+    The outputs are keyed on the sensor type and culling configuration, the solver solution fingerprint
+    (RteSolver.solution_fingerprint) and a hash of the projection geometry.
+    Repeated renders of the same solution and projection are therefore free.
+
+    Parameters
+    ----------
+    max_bytes: int, default=512MB
+        The maximum total size of the cached outputs. The least recently used outputs are evicted beyond this size.
+
+    Notes
+    -----
+    A single cache can be shared by several sensors (see Sensor.set_render_cache).
+    The cache is thread-safe. Its contents are not pickled, therefore renders in worker processes
+    (loky or multiprocessing backends) are not cached.
+    """
+    def __init__(self, max_bytes=512*1024**2):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __getstate__(self):
+        return {'_max_bytes': self._max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['_max_bytes'])
+
+    def clear(self):
+        """
+        Remove all the cached outputs and reset the statistics.
+        """
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def projection_hash(projection):
+        """
+        Hash a projection geometry.
+
+        Parameters
+        ----------
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        hash: str
+            The md5 hexdigest of the pixel positions and directions.
+        """
+        md5 = hashlib.md5()
+        for array in [projection.x, projection.y, projection.z, projection.mu, projection.phi]:
+            array = np.ascontiguousarray(array)
+            md5.update(repr((array.dtype.str, array.shape)).encode())
+            md5.update(array.view(np.uint8))
+        return md5.hexdigest()
+
+    def key(self, sensor, rte_solver, projection):
+        """
+        The cache key of a rendering.
+
+        Parameters
+        ----------
+        sensor: shdom.Sensor
+            The sensor which defines the rendering.
+        rte_solver: shdom.RteSolver
+            A solver with the precomputed radiative transfer solution.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        key: tuple
+            The cache key.
+
+        Notes
+        -----
+        Culled renderings are approximate (see ClearSkyCulling), therefore the culling configuration is part of the key.
+        """
+        culling = sensor.culling
+        if culling is not None:
+            culling = (type(culling).__name__, culling.rtol, culling.atol, culling.margin, culling.decimals)
+        return (sensor.type, culling, rte_solver.solution_fingerprint, self.projection_hash(projection))
+
+    def get(self, key):
+        """
+        Retrieve a cached output.
+
+        Parameters
+        ----------
+        key: tuple
+            The cache key (see RenderCache.key).
+
+        Returns
+        -------
+        output: np.array or None
+            A copy of the cached output or None if the key is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key].copy()
+
+    def put(self, key, output):
+        """
+        Cache an output and evict the least recently used outputs beyond max_bytes.
+
+        Parameters
+        ----------
+        key: tuple
+            The cache key (see RenderCache.key).
+        output: np.array
+            The Sensor.render output.
+        """
+        if output.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = output.copy()
+            self._nbytes += output.nbytes
+            while self._nbytes > self.max_bytes:
+                self._nbytes -= self._entries.popitem(last=False)[1].nbytes
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    @property
+    def num_entries(self):
+        return len(self._entries)
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def info(self):
+        return 'RenderCache: {} entries, {:.1f}/{:.1f} [MB], {} hits, {} misses'.format(
+            self.num_entries, self.nbytes / 1024**2, self.max_bytes / 1024**2, self.hits, self.misses)
+
+
+def segment_intersects_box(start, end, box_min, box_max):
+    """
+    Test the intersection of line segments with an axis aligned box (slab method).
+
+    Parameters
+    ----------
+    start: np.array(shape=(3, N))
+        The segments start points.
+    end: np.array(shape=(3, N))
+        The segments end points.
+    box_min: list
+        The minimal (x, y, z) coordinates of the box (can be -np.inf).
+    box_max: list
+        The maximal (x, y, z) coordinates of the box (can be np.inf).
+
+    Returns
+    -------
+    intersects: np.array(shape=(N), dtype=bool)
+        True for segments which intersect the box.
+    """
+    t_min = np.zeros(start.shape[1])
+    t_max = np.ones(start.shape[1])
+    direction = end - start
+    for axis in range(3):
+        parallel = direction[axis] == 0.0
+        inside = (start[axis] >= box_min[axis]) & (start[axis] <= box_max[axis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (box_min[axis] - start[axis]) / direction[axis]
+            t1 = (box_max[axis] - start[axis]) / direction[axis]
+        t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1))
+        t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1))
+        t_min = np.maximum(t_min, t_near)
+        t_max = np.minimum(t_max, t_far)
+    return t_min <= t_max
+
+
+class ClearSkyCulling(object):
+    """
+    A pixel culling pre-pass for Sensor.render.
+    Each pixel ray is intersected with the bounding box of the non-trivial (horizontally varying) extinction and with
+    its solar shadow volume. The pixels which miss both (clear-sky pixels) see a horizontally uniform (layered)
+    atmosphere and surface, therefore their radiance depends only on the pixel direction and altitude.
+    The clear-sky pixels are grouped into a small lookup table by (mu, phi, z): a single reference pixel of every
+    group (the farthest from the clouds) is ray traced together with the remaining (cloudy) pixels.
+
+    Parameters
+    ----------
+    rtol: float, default=0.01
+        Relative extinction tolerance above the minimal extinction of each altitude level (background air/aerosol).
+    atol: float, default=1e-4
+        Absolute extinction tolerance [km^-1].
+    margin: int, default=2
+        The number of grid cells by which the non-trivial extinction bounding box is expanded.
+    decimals: int, default=5
+        The number of decimals of (mu, phi, z) used to group the clear-sky pixels.
+
+    Notes
+    -----
+    Clear-sky pixels are approximated by their reference pixel: the diffuse light reflected from clouds onto
+    clear-sky pixels beyond the margin (cloud adjacency effect) is neglected.
+    Culling is disabled for horizontally variable surfaces. With periodic boundary conditions pixels whose rays
+    leave the horizontal domain are always ray traced.
+    """
+    def __init__(self, rtol=0.01, atol=1e-4, margin=2, decimals=5):
+        self._rtol = rtol
+        self._atol = atol
+        self._margin = margin
+        self._decimals = decimals
+
+    def cloud_box(self, rte_solver):
+        """
+        The bounding box of the non-trivial extinction.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+
+        Returns
+        -------
+        box: tuple or None
+            (box_min, box_max) lists of (x, y, z) coordinates, or None for a horizontally uniform medium.
+        """
+        pa = rte_solver._pa
+        extinction = pa.extinctp.sum(axis=-1).reshape(pa.npx, pa.npy, pa.npz)
+        background = extinction.min(axis=(0, 1))
+        nontrivial = extinction > background * (1.0 + self.rtol) + self.atol
+        if not nontrivial.any():
+            return None
+        ix = np.where(nontrivial.any(axis=(1, 2)))[0]
+        iy = np.where(nontrivial.any(axis=(0, 2)))[0]
+        iz = np.where(nontrivial.any(axis=(0, 1)))[0]
+        box_min = [pa.xstart + (ix[0] - self.margin) * pa.delx,
+                   pa.ystart + (iy[0] - self.margin) * pa.dely,
+                   pa.zlevels[max(iz[0] - self.margin, 0)]]
+        box_max = [pa.xstart + (ix[-1] + self.margin) * pa.delx,
+                   pa.ystart + (iy[-1] + self.margin) * pa.dely,
+                   pa.zlevels[min(iz[-1] + self.margin, pa.npz - 1)]]
+        return box_min, box_max
+
+    def pixel_segments(self, rte_solver, projection):
+        """
+        The segments of the pixel rays within the altitude range of the domain.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        start: np.array(shape=(3, projection.npix))
+            The points where the (backward traced) rays enter the domain altitude range.
+        end: np.array(shape=(3, projection.npix))
+            The points where the rays exit the domain altitude range (the surface for downward looking pixels).
+        """
+        pa = rte_solver._pa
+        mu = np.where(np.abs(projection.mu) < 1e-6, 1e-6, projection.mu)
+        sin_theta = np.sqrt(1.0 - projection.mu**2)
+        direction = np.stack((sin_theta * np.cos(projection.phi), sin_theta * np.sin(projection.phi), mu))
+        position = np.stack((projection.x, projection.y, projection.z)).astype(np.float64)
+        t_top = (position[2] - pa.zlevels[-1]) / mu
+        t_bottom = (position[2] - pa.zlevels[0]) / mu
+        t_start = np.maximum(np.minimum(t_top, t_bottom), 0.0)
+        t_end = np.maximum(np.maximum(t_top, t_bottom), t_start)
+        start = position - t_start * direction
+        end = position - t_end * direction
+        return start, end
+
+    def clear_mask(self, rte_solver, projection, box):
+        """
+        Find the clear-sky pixels.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with an initialized medium.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+        box: tuple or None
+            The bounding box of the non-trivial extinction (see cloud_box method).
+
+        Returns
+        -------
+        clear: np.array(shape=(projection.npix), dtype=bool)
+            True for pixels whose rays (and shadow volume) miss the non-trivial extinction.
+        """
+        pa = rte_solver._pa
+        start, end = self.pixel_segments(rte_solver, projection)
+        clear = np.abs(projection.mu) > 1e-6
+        if not rte_solver._sfctype.startswith('F'):
+            return np.zeros_like(clear)
+
+        # Periodic boundary conditions: rays which leave the horizontal domain wrap around
+        periodic = [not (rte_solver._bcflag & 1), not (rte_solver._bcflag & 2)]
+        domain_min = [pa.xstart, pa.ystart]
+        domain_max = [pa.xstart + (pa.npx - 1) * pa.delx, pa.ystart + (pa.npy - 1) * pa.dely]
+        for axis in range(2):
+            if periodic[axis]:
+                clear &= (np.minimum(start[axis], end[axis]) >= domain_min[axis]) & \
+                         (np.maximum(start[axis], end[axis]) <= domain_max[axis])
+
+        if box is None:
+            return clear
+        box_min, box_max = box
+        clear &= ~segment_intersects_box(start, end, box_min, box_max)
+
+        # Solar shadow volume: in sheared coordinates the solar beam is vertical and the shadow of every
+        # altitude slab of the box is (conservatively) a box extending from the slab top down to the surface.
+        if rte_solver._srctype in ['S', 'B'] and rte_solver._solarmu < 0.0:
+            sin_theta = np.sqrt(1.0 - rte_solver._solarmu**2)
+            shear = np.array([sin_theta * np.cos(rte_solver._solaraz), sin_theta * np.sin(rte_solver._solaraz)])
+            shear /= rte_solver._solarmu
+            sheared_start, sheared_end = start.copy(), end.copy()
+            sheared_start[:2] -= start[2] * shear[:, None]
+            sheared_end[:2] -= end[2] * shear[:, None]
+            levels = pa.zlevels[(pa.zlevels >= box_min[2]) & (pa.zlevels <= box_max[2])]
+            levels = levels if levels.size > 1 else np.array([box_min[2], box_max[2]])
+            for slab_bottom, slab_top in zip(levels[:-1], levels[1:]):
+                shadow_min, shadow_max = [-np.inf, -np.inf, -np.inf], [np.inf, np.inf, slab_top]
+                for axis in range(2):
+                    offsets = [slab_bottom * shear[axis], slab_top * shear[axis]]
+                    shadow_min[axis] = box_min[axis] - max(offsets)
+                    shadow_max[axis] = box_max[axis] - min(offsets)
+                    ground_offsets = [pa.zlevels[0] * shear[axis], slab_top * shear[axis]]
+                    if periodic[axis] and (shadow_min[axis] + min(ground_offsets) < domain_min[axis] or
+                                           shadow_max[axis] + max(ground_offsets) > domain_max[axis]):
+                        shadow_min[axis], shadow_max[axis] = -np.inf, np.inf
+                clear &= ~segment_intersects_box(sheared_start, sheared_end, shadow_min, shadow_max)
+        return clear
+
+    def render(self, sensor, rte_solver, projection):
+        """
+        Render a projection ray tracing only the cloudy pixels and the clear-sky reference pixels.
+
+        Parameters
+        ----------
+        sensor: shdom.Sensor
+            The sensor which defines the rendering.
+        rte_solver: shdom.RteSolver
+            A solver with all the associated parameters and the solution to the RTE
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        output: np.array(dtype=np.float32)
+            The rendered pixels (same as Sensor.ray_trace).
+        """
+        box = self.cloud_box(rte_solver)
+        clear = self.clear_mask(rte_solver, projection, box)
+        if not clear.any():
+            return sensor.ray_trace(rte_solver, projection)
+
+        # Sort the clear-sky pixels by decreasing distance from the clouds so that the reference
+        # pixel of every (mu, phi, z) group is the farthest one.
+        clear_indices = np.where(clear)[0]
+        if box is not None:
+            start, end = self.pixel_segments(rte_solver, projection[clear_indices])
+            center = 0.5 * (np.array(box[0][:2]) + np.array(box[1][:2]))
+            distance = np.hypot(end[0] - center[0], end[1] - center[1])
+            clear_indices = clear_indices[np.argsort(-distance, kind='stable')]
+
+        keys = np.round(np.stack((projection.mu[clear_indices], projection.phi[clear_indices],
+                                  projection.z[clear_indices])), self.decimals)
+        _, reference, inverse = np.unique(keys, axis=1, return_index=True, return_inverse=True)
+        cloudy_indices = np.where(~clear)[0]
+        traced = sensor.ray_trace(rte_solver, projection[np.concatenate((cloudy_indices, clear_indices[reference]))])
+
+        output = np.empty(traced.shape[:-1] + (clear.size,), dtype=traced.dtype)
+        output[..., cloudy_indices] = traced[..., :cloudy_indices.size]
+        output[..., clear_indices] = traced[..., cloudy_indices.size:][..., inverse.ravel()]
+        return output
+
+    @property
+    def rtol(self):
+        return self._rtol
+
+    @property
+    def atol(self):
+        return self._atol
+
+    @property
+    def margin(self):
+        return self._margin
+
+    @property
+    def decimals(self):
+        return self._decimals
+
+
+class AdaptiveSupersampling(object):
+    """
+    An adaptive supersampling renderer which approximates the integration of radiance over the pixel footprint.
+    A single ray per pixel is rendered first. Pixels whose (first Stokes component) radiance differs from one
+    of their image neighbours by more than the tolerance are then sampled with subpixels x subpixels stratified
+    sub-pixel rays, which are box-averaged into the pixel value.
+
+    Parameters
+    ----------
+    subpixels: int, default=3
+        The number of sub-pixel rays along each image axis.
+    rtol: float, default=0.05
+        Relative radiance difference tolerance between neighbouring pixels.
+    atol: float, default=0.0
+        Absolute radiance difference tolerance between neighbouring pixels.
+
+    Notes
+    -----
+    Sub-pixel rays are defined by the projection (Projection.subpixel_projection), currently
+    OrthographicProjection and PerspectiveProjection (or a MultiViewProjection of these).
+    Other projections raise a ValueError when the supersampling is set on a Camera (see Camera.set_supersampling)
+    or before rendering.
+    """
+    def __init__(self, subpixels=3, rtol=0.05, atol=0.0):
+        self._subpixels = subpixels
+        self._rtol = rtol
+        self._atol = atol
+        self._refined_fraction = 0.0
+
+    def check_projection(self, projection):
+        """
+        Verify that sub-pixel rays are defined for all the views of a projection.
+
+        Parameters
+        ----------
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Raises
+        ------
+        ValueError
+            If a view does not define sub-pixel rays (see Projection.subpixel_projection).
+        """
+        views = projection.projection_list if isinstance(projection, shdom.MultiViewProjection) else [projection]
+        unsupported = sorted(set([type(view).__name__ for view in views if not view.supports_subpixels]))
+        if unsupported:
+            raise ValueError('Adaptive supersampling is not supported for {}: sub-pixel rays are only defined for '
+                             'OrthographicProjection and PerspectiveProjection'.format(', '.join(unsupported)))
+
+    def render_pixels(self, sensor, rte_solvers, projection, n_jobs=1, verbose=0, backend='threading'):
+        """
+        Render a single ray per pixel.
+
+        Parameters
+        ----------
+        sensor: shdom.Sensor
+            The sensor which defines the rendering.
+        rte_solvers: list of shdom.RteSolver or shdom.RteSolverArray
+            The solvers with the precomputed radiative transfer solution and phase function tables.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+        n_jobs: int, default=1
+            The number of jobs to divide the rendering into.
+        verbose: int, default=0
+            How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
+
+        Returns
+        -------
+        output: list
+            A list of Sensor.render outputs, one per solver (pixels along the last axis).
+        """
+        output = sensor.parallel_render(rte_solvers, projection, n_jobs, verbose, backend)
+        num_parts = len(output) // len(rte_solvers)
+        output = [np.concatenate(output[i*num_parts:(i+1)*num_parts], axis=-1) for i in range(len(rte_solvers))]
+        return output
+
+    def refine_mask(self, intensity, resolution):
+        """
+        Find the pixels which differ from one of their image neighbours by more than the tolerance.
+
+        Parameters
+        ----------
+        intensity: np.array(dtype=np.float32)
+            The radiances of a single view.
+        resolution: list
+            The view resolution.
+
+        Returns
+        -------
+        mask: np.array(dtype=bool)
+            True for pixels which should be supersampled.
+        """
+        image = intensity.reshape(resolution, order='F')
+        mask = np.zeros(image.shape, dtype=bool)
+        for axis in range(image.ndim):
+            first = [slice(None)] * image.ndim
+            second = [slice(None)] * image.ndim
+            first[axis], second[axis] = slice(None, -1), slice(1, None)
+            first, second = tuple(first), tuple(second)
+            scale = np.maximum(np.abs(image[first]), np.abs(image[second]))
+            exceed = np.abs(image[second] - image[first]) > self.rtol * scale + self.atol
+            mask[first] |= exceed
+            mask[second] |= exceed
+        return mask.ravel(order='F')
+
+    def parallel_render(self, sensor, rte_solvers, projection, n_jobs=1, verbose=0, backend='threading'):
+        """
+        Render all the solvers with adaptive supersampling.
+
+        Parameters
+        ----------
+        sensor: shdom.Sensor
+            The sensor which defines the rendering.
+        rte_solvers: list of shdom.RteSolver or shdom.RteSolverArray
+            The solvers with the precomputed radiative transfer solution and phase function tables.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+        n_jobs: int, default=1
+            The number of jobs to divide the rendering into.
+        verbose: int, default=0
+            How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
+
+        Returns
+        -------
+        output: list
+            A list of the footprint-averaged outputs, one per solver (pixels along the last axis).
+        """
+        self.check_projection(projection)
+        output = self.render_pixels(sensor, rte_solvers, projection, n_jobs, verbose, backend)
+
+        if isinstance(projection, shdom.MultiViewProjection):
+            views, offsets = projection.projection_list, projection.offsets
+        else:
+            views, offsets = [projection], [0, projection.npix]
+
+        u = (np.arange(self.subpixels) + 0.5) / self.subpixels - 0.5
+        subpixel_offsets = np.stack([grid.ravel() for grid in np.meshgrid(u, u, indexing='ij')])
+
+        indices, subpixel_projections = [], []
+        for view, start, stop in zip(views, offsets[:-1], offsets[1:]):
+            mask = np.zeros(stop - start, dtype=bool)
+            for out in output:
+                intensity = out[..., start:stop] if out.ndim == 1 else out[0, start:stop]
+                mask |= self.refine_mask(intensity, view.resolution)
+            view_indices = np.where(mask)[0]
+            if view_indices.size > 0:
+                indices.append(start + view_indices)
+                subpixel_projections.append(view.subpixel_projection(view_indices, subpixel_offsets))
+
+        num_pixels = offsets[-1]
+        self._refined_fraction = sum([idx.size for idx in indices]) / num_pixels if num_pixels > 0 else 0.0
+        if not indices:
+            return output
+
+        indices = np.concatenate(indices)
+        subpixel_projection = subpixel_projections[0] if len(subpixel_projections) == 1 else \
+            shdom.MultiViewProjection(subpixel_projections)
+        subpixel_output = self.render_pixels(sensor, rte_solvers, subpixel_projection, n_jobs, verbose, backend)
+        for out, subpixel_out in zip(output, subpixel_output):
+            subpixel_out = subpixel_out.reshape(subpixel_out.shape[:-1] + (indices.size, subpixel_offsets.shape[1]))
+            out[..., indices] = subpixel_out.mean(axis=-1)
+        return output
+
+    @property
+    def subpixels(self):
+        return self._subpixels
+
+    @property
+    def rtol(self):
+        return self._rtol
+
+    @property
+    def atol(self):
+        return self._atol
+
+    @property
+    def refined_fraction(self):
+        """
+        The fraction of supersampled pixels in the last rendering.
+        """
+        return self._refined_fraction
+
+
 class Sensor(object):
     """
     A sensor class to be inherited by specific sensor types (e.g. Radiance, Polarization).
@@ -17,93 +782,429 @@ class Sensor(object):
     """
     def __init__(self):
         self._type = 'Sensor'
+        self._scheduler = None
+        self._render_cache = None
+        self._culling = None
+        self._supersampling = None
     
     def render(self, rte_solver, projection):
         """
-        The core rendering method.
-        
+        The core rendering method.
+        
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with all the associated parameters and the solution to the RTE
+        projection: shdom.Projection 
+            A projection model which specified the position and direction of each and every pixel 
+            
+        Notes
+        -----
+        If a render cache is set (see set_render_cache), cached outputs are returned without rendering.
+        If pixel culling is set (see set_culling), only the pixels which are not culled are ray traced.
+        """
+        cache = self.render_cache
+        if cache is not None:
+            key = cache.key(self, rte_solver, projection)
+            output = cache.get(key)
+            if output is not None:
+                return output
+
+        if self.culling is not None:
+            output = self.culling.render(self, rte_solver, projection)
+        else:
+            output = self.ray_trace(rte_solver, projection)
+
+        if cache is not None:
+            cache.put(key, output)
+        return output
+
+    def ray_trace(self, rte_solver, projection):
+        """
+        Ray trace all the projection pixels through the medium (SHDOM core render).
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver
+            A solver with all the associated parameters and the solution to the RTE
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+
+        Returns
+        -------
+        output: np.array(dtype=np.float32)
+            The rendered pixels.
+        """
+        if isinstance(projection.npix, list):
+            total_pix = np.sum(projection.npix)
+        else:
+            total_pix = projection.npix 
+            
+        output = core.render(
+            nstphase=rte_solver._nstphase,
+            ylmsun=rte_solver._ylmsun,
+            phasetab=rte_solver._phasetab,
+            nscatangle=rte_solver._nscatangle,
+            ncs=rte_solver._ncs,
+            nstokes=rte_solver._nstokes,
+            nstleg=rte_solver._nstleg,
+            camx=projection.x,
+            camy=projection.y,
+            camz=projection.z,
+            cammu=projection.mu,
+            camphi=projection.phi,
+            npix=total_pix,             
+            nx=rte_solver._nx,
+            ny=rte_solver._ny,
+            nz=rte_solver._nz,
+            bcflag=rte_solver._bcflag,
+            ipflag=rte_solver._ipflag,   
+            npts=rte_solver._npts,
+            ncells=rte_solver._ncells,
+            ml=rte_solver._ml,
+            mm=rte_solver._mm,
+            nlm=rte_solver._nlm,
+            numphase=rte_solver._pa.numphase,
+            nmu=rte_solver._nmu,
+            nphi0max=rte_solver._nphi0max,
+            nphi0=rte_solver._nphi0,
+            maxnbc=rte_solver._maxnbc,
+            ntoppts=rte_solver._ntoppts,
+            nbotpts=rte_solver._nbotpts,
+            nsfcpar=rte_solver._nsfcpar,
+            gridptr=rte_solver._gridptr,
+            neighptr=rte_solver._neighptr,
+            treeptr=rte_solver._treeptr,             
+            shptr=rte_solver._shptr,
+            bcptr=rte_solver._bcptr,
+            cellflags=rte_solver._cellflags,
+            iphase=rte_solver._iphase[:rte_solver._npts],
+            deltam=rte_solver._deltam,
+            solarmu=rte_solver._solarmu,
+            solaraz=rte_solver._solaraz,
+            gndtemp=rte_solver._gndtemp,
+            gndalbedo=rte_solver._gndalbedo,
+            skyrad=rte_solver._skyrad,
+            waveno=rte_solver._waveno,
+            wavelen=rte_solver._wavelen,
+            mu=rte_solver._mu,
+            phi=rte_solver._phi.reshape(rte_solver._nmu, -1),
+            wtdo=rte_solver._wtdo.reshape(rte_solver._nmu, -1),
+            xgrid=rte_solver._xgrid,
+            ygrid=rte_solver._ygrid,
+            zgrid=rte_solver._zgrid,
+            gridpos=rte_solver._gridpos,
+            sfcgridparms=rte_solver._sfcgridparms,
+            bcrad=rte_solver._bcrad,
+            extinct=rte_solver._extinct[:rte_solver._npts],
+            albedo=rte_solver._albedo[:rte_solver._npts],
+            legen=rte_solver._legen,            
+            dirflux=rte_solver._dirflux,
+            fluxes=rte_solver._fluxes,
+            source=rte_solver._source,          
+            srctype=rte_solver._srctype,
+            sfctype=rte_solver._sfctype,
+            units=rte_solver._units,
+            total_ext=rte_solver._total_ext[:rte_solver._npts],
+            npart=rte_solver._npart)    
+        
+        return output
+
+    def parallel_render(self, rte_solvers, projection, n_jobs=1, verbose=0, backend='threading'):
+        """
+        Render all the solvers with the pixels distributed amongst n_jobs workers.
+
+        Parameters
+        ----------
+        rte_solvers: list of shdom.RteSolver or shdom.RteSolverArray
+            The solvers with the precomputed radiative transfer solution and phase function tables.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+        n_jobs: int, default=1
+            The number of jobs to divide the rendering into.
+        verbose: int, default=0
+            How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            'threading' relies on the threadsafe Fortran releasing the GIL.
+            'loky' or 'multiprocessing' render in worker processes which attach to the solvers through a shdom.SharedSolverState
+            (see set_shared_storage).
+
+        Returns
+        -------
+        output: list
+            A list of the Sensor.render outputs, ordered by solver and then by projection part.
+
+        Notes
+        -----
+        If a scheduler is set (see set_scheduler), the pixels are dispatched dynamically as tiles and
+        the output has a single (reassembled) part per solver.
+        """
+        if n_jobs > 1 and self.scheduler is not None:
+            output = self.scheduled_render(rte_solvers, projection, n_jobs, verbose, backend)
+
+        elif n_jobs > 1 and backend == 'threading':
+            output = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose)(
+                delayed(Sensor.render, check_pickle=False)(
+                    self,
+                    rte_solver=rte_solver,
+                    projection=projection) for rte_solver, projection in
+                itertools.product(rte_solvers, projection.split(n_jobs)))
+
+        elif n_jobs > 1 and backend in ['loky', 'multiprocessing']:
+            shared_states = self.share_solvers(rte_solvers)
+            try:
+                output = Parallel(n_jobs=n_jobs, backend=backend, verbose=verbose)(
+                    delayed(render_shared_state)(self, shared_state, projection) for shared_state, projection in
+                    itertools.product(shared_states, projection.split(n_jobs)))
+            finally:
+                for shared_state in shared_states:
+                    shared_state.unlink()
+
+        elif n_jobs > 1:
+            raise NotImplementedError('Parallel backend [{}] not implemented'.format(backend))
+
+        else:
+            output = [Sensor.render(self, rte_solver, projection) for rte_solver in rte_solvers]
+
+        return output
+
+    def scheduled_render(self, rte_solvers, projection, n_jobs=1, verbose=0, backend='threading'):
+        """
+        Render all the solvers with the pixel tiles of the scheduler dispatched dynamically amongst n_jobs workers.
+
+        Parameters
+        ----------
+        rte_solvers: list of shdom.RteSolver or shdom.RteSolverArray
+            The solvers with the precomputed radiative transfer solution and phase function tables.
+        projection: shdom.Projection
+            A projection model which specified the position and direction of each and every pixel
+        n_jobs: int, default=1
+            The number of workers.
+        verbose: int, default=0
+            How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
+
+        Returns
+        -------
+        output: list
+            A list of the Sensor.render outputs, one per solver, with pixels in the projection order.
+        """
+        rte_solvers = list(rte_solvers)
+        tasks = []
+        for i, rte_solver in enumerate(rte_solvers):
+            tasks.extend([(cost, i, indices) for indices, cost in self.scheduler.schedule(rte_solver, projection)])
+        tasks.sort(key=lambda task: task[0], reverse=True)
+
+        if backend == 'threading':
+            outputs = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose, batch_size=1)(
+                delayed(Sensor.render, check_pickle=False)(
+                    self,
+                    rte_solver=rte_solvers[i],
+                    projection=projection[indices]) for cost, i, indices in tasks)
+
+        elif backend in ['loky', 'multiprocessing']:
+            shared_states = self.share_solvers(rte_solvers)
+            try:
+                outputs = Parallel(n_jobs=n_jobs, backend=backend, verbose=verbose, batch_size=1)(
+                    delayed(render_shared_state)(self, shared_states[i], projection[indices])
+                    for cost, i, indices in tasks)
+            finally:
+                for shared_state in shared_states:
+                    shared_state.unlink()
+        else:
+            raise NotImplementedError('Parallel backend [{}] not implemented'.format(backend))
+
+        output = []
+        for i in range(len(rte_solvers)):
+            parts = [(task[2], out) for task, out in zip(tasks, outputs) if task[1] == i]
+            order = np.concatenate([indices for indices, out in parts])
+            rendered = np.concatenate([out for indices, out in parts], axis=-1)
+            result = np.empty_like(rendered)
+            result[..., order] = rendered
+            output.append(result)
+        return output
+
+    def render_iter(self, rte_solver, projection, tile_size=4096, n_jobs=1, backend='threading'):
+        """
+        A generator which renders the projection in tiles and yields every tile as soon as it is complete.
+        Peak memory is bounded by the tile size and the number of tiles in flight (2*n_jobs).
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver or shdom.RteSolverArray
+            The solver(s) with the precomputed radiative transfer solution (RteSolver.solve method).
+        projection: shdom.Projection or shdom.MultiViewProjection
+            The Projection specifying the sensor camera geomerty.
+        tile_size: int, default=4096
+            The maximum number of pixels in a tile. Tiles do not cross view boundaries.
+        n_jobs: int, default=1
+            The number of workers rendering tiles concurrently.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
+
+        Yields
+        ------
+        view_name: str
+            The name of the view (projection) the tile belongs to.
+        tile_slice: slice
+            The pixels of the tile in the raveled view (reshape with order='F' into the view resolution).
+        output: np.array(dtype=np.float32)
+            The raw Sensor.render output of the tile (radiance or Stokes vector) with a trailing channel dimension
+            for an shdom.RteSolverArray.
+
+        Notes
+        -----
+        With n_jobs>1 the tiles are yielded in order of completion.
+        """
+        rte_solvers = list(rte_solver) if isinstance(rte_solver, shdom.RteSolverArray) else [rte_solver]
+        for solver in rte_solvers:
+            solver.precompute_phase()
+
+        if isinstance(projection, shdom.MultiViewProjection):
+            views = zip(projection.names, projection.projection_list)
+        else:
+            views = [('View0', projection)]
+        tiles = ((name, slice(start, min(start + tile_size, view.npix)), view)
+                 for name, view in views for start in range(0, view.npix, tile_size))
+
+        if n_jobs <= 1:
+            for name, tile_slice, view in tiles:
+                yield name, tile_slice, render_tile(self, rte_solvers, view[tile_slice])
+            return
+
+        shared_states = None
+        if backend == 'threading':
+            executor = ThreadPoolExecutor(max_workers=n_jobs)
+        elif backend in ['loky', 'multiprocessing']:
+            shared_states = self.share_solvers(rte_solvers)
+            executor = ProcessPoolExecutor(max_workers=n_jobs)
+        else:
+            raise NotImplementedError('Parallel backend [{}] not implemented'.format(backend))
+
+        workers = rte_solvers if shared_states is None else shared_states
+        futures = dict()
+        try:
+            for name, tile_slice, view in itertools.islice(tiles, 2 * n_jobs):
+                futures[executor.submit(render_tile, self, workers, view[tile_slice])] = (name, tile_slice)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, tile_slice = futures.pop(future)
+                    for next_name, next_slice, view in itertools.islice(tiles, 1):
+                        futures[executor.submit(render_tile, self, workers, view[next_slice])] = (next_name, next_slice)
+                    yield name, tile_slice, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if shared_states is not None:
+                for shared_state in shared_states:
+                    shared_state.unlink()
+
+    def share_solvers(self, rte_solvers):
+        """
+        Place the solvers in shared storage for rendering in worker processes.
+
+        Parameters
+        ----------
+        rte_solvers: list of shdom.RteSolver
+            The solvers with the precomputed radiative transfer solution and phase function tables.
+
+        Returns
+        -------
+        shared_states: list of shdom.SharedSolverState
+            The shared states of the solvers (see set_shared_storage). The caller should unlink them when done.
+
+        Notes
+        -----
+        If a render cache is set, the solution fingerprints are computed once here and shipped with the shared states, 
+        rather than recomputed by the workers for every tile.
+        """
+        if self.render_cache is not None:
+            for rte_solver in rte_solvers:
+                rte_solver.solution_fingerprint
+        return [shdom.SharedSolverState(rte_solver, self.shared_storage) for rte_solver in rte_solvers]
+
+    def set_scheduler(self, scheduler):
+        """
+        Set a rendering scheduler for load-balanced parallel rendering.
+
+        Parameters
+        ----------
+        scheduler: shdom.TileScheduler or None
+            The scheduler. None reverts to an even split of the pixels amongst the workers.
+        """
+        self._scheduler = scheduler
+
+    def set_render_cache(self, render_cache):
+        """
+        Set an LRU render cache for repeated renders of the same solution and projection.
+
+        Parameters
+        ----------
+        render_cache: shdom.RenderCache or None
+            The render cache. None disables caching.
+        """
+        self._render_cache = render_cache
+
+    def set_shared_storage(self, storage):
+        """
+        Set the shared storage type of the solvers for the process rendering backends ('loky' or 'multiprocessing').
+
+        Parameters
+        ----------
+        storage: 'shared_memory', 'memmap' or None
+            The storage type (see shdom.SharedSolverState). None (default) uses 'shared_memory' if available 
+            (python>=3.8) and 'memmap' otherwise.
+        """
+        self._shared_storage = storage
+
+    def set_culling(self, culling):
+        """
+        Set a pixel culling pre-pass which ray traces only the pixels affected by the inhomogeneous medium.
+
+        Parameters
+        ----------
+        culling: shdom.ClearSkyCulling or None
+            The culling pre-pass. None ray traces all the pixels.
+        """
+        self._culling = culling
+
+    def set_supersampling(self, supersampling):
+        """
+        Set an adaptive supersampling renderer for footprint-averaged pixels.
+
         Parameters
         ----------
-        rte_solver: shdom.RteSolver
-            A solver with all the associated parameters and the solution to the RTE
-        projection: shdom.Projection 
-            A projection model which specified the position and direction of each and every pixel 
+        supersampling: shdom.AdaptiveSupersampling or None
+            The supersampling renderer. None renders a single ray per pixel.
+
+        Notes
+        -----
+        The sensor has no projection: use Camera.set_supersampling to validate the projection when the renderer is set.
         """
+        self._supersampling = supersampling
 
-        if isinstance(projection.npix, list):
-            total_pix = np.sum(projection.npix)
-        else:
-            total_pix = projection.npix 
-            
-        output = core.render(
-            nstphase=rte_solver._nstphase,
-            ylmsun=rte_solver._ylmsun,
-            phasetab=rte_solver._phasetab,
-            nscatangle=rte_solver._nscatangle,
-            ncs=rte_solver._ncs,
-            nstokes=rte_solver._nstokes,
-            nstleg=rte_solver._nstleg,
-            camx=projection.x,
-            camy=projection.y,
-            camz=projection.z,
-            cammu=projection.mu,
-            camphi=projection.phi,
-            npix=total_pix,             
-            nx=rte_solver._nx,
-            ny=rte_solver._ny,
-            nz=rte_solver._nz,
-            bcflag=rte_solver._bcflag,
-            ipflag=rte_solver._ipflag,   
-            npts=rte_solver._npts,
-            ncells=rte_solver._ncells,
-            ml=rte_solver._ml,
-            mm=rte_solver._mm,
-            nlm=rte_solver._nlm,
-            numphase=rte_solver._pa.numphase,
-            nmu=rte_solver._nmu,
-            nphi0max=rte_solver._nphi0max,
-            nphi0=rte_solver._nphi0,
-            maxnbc=rte_solver._maxnbc,
-            ntoppts=rte_solver._ntoppts,
-            nbotpts=rte_solver._nbotpts,
-            nsfcpar=rte_solver._nsfcpar,
-            gridptr=rte_solver._gridptr,
-            neighptr=rte_solver._neighptr,
-            treeptr=rte_solver._treeptr,             
-            shptr=rte_solver._shptr,
-            bcptr=rte_solver._bcptr,
-            cellflags=rte_solver._cellflags,
-            iphase=rte_solver._iphase[:rte_solver._npts],
-            deltam=rte_solver._deltam,
-            solarmu=rte_solver._solarmu,
-            solaraz=rte_solver._solaraz,
-            gndtemp=rte_solver._gndtemp,
-            gndalbedo=rte_solver._gndalbedo,
-            skyrad=rte_solver._skyrad,
-            waveno=rte_solver._waveno,
-            wavelen=rte_solver._wavelen,
-            mu=rte_solver._mu,
-            phi=rte_solver._phi.reshape(rte_solver._nmu, -1),
-            wtdo=rte_solver._wtdo.reshape(rte_solver._nmu, -1),
-            xgrid=rte_solver._xgrid,
-            ygrid=rte_solver._ygrid,
-            zgrid=rte_solver._zgrid,
-            gridpos=rte_solver._gridpos,
-            sfcgridparms=rte_solver._sfcgridparms,
-            bcrad=rte_solver._bcrad,
-            extinct=rte_solver._extinct[:rte_solver._npts],
-            albedo=rte_solver._albedo[:rte_solver._npts],
-            legen=rte_solver._legen,            
-            dirflux=rte_solver._dirflux,
-            fluxes=rte_solver._fluxes,
-            source=rte_solver._source,          
-            srctype=rte_solver._srctype,
-            sfctype=rte_solver._sfctype,
-            units=rte_solver._units,
-            total_ext=rte_solver._total_ext[:rte_solver._npts],
-            npart=rte_solver._npart)    
-        
-        return output
+    @property
+    def scheduler(self):
+        return getattr(self, '_scheduler', None)
+
+    @property
+    def supersampling(self):
+        return getattr(self, '_supersampling', None)
+
+    @property
+    def culling(self):
+        return getattr(self, '_culling', None)
+
+    @property
+    def shared_storage(self):
+        return getattr(self, '_shared_storage', None)
+
+    @property
+    def render_cache(self):
+        return getattr(self, '_render_cache', None)
 
     @property
     def type(self):
@@ -118,7 +1219,7 @@ class RadianceSensor(Sensor):
         super().__init__()
         self._type = 'RadianceSensor'
         
-    def render(self, rte_solver, projection, n_jobs=1, verbose=0):
+    def render(self, rte_solver, projection, n_jobs=1, verbose=0, backend='threading'):
         """
         The render method integrates a pre-computed in-scatter field (source function) J over the projection gemoetry.
         The source code for this function is in src/unoplarized/shdomsub4.f. 
@@ -137,6 +1238,8 @@ class RadianceSensor(Sensor):
             The number of jobs to divide the rendering.
         verbose: int, default=0
             How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
             
         Returns
         -------
@@ -160,18 +1263,11 @@ class RadianceSensor(Sensor):
         for rte_solver in rte_solvers:
             rte_solver.precompute_phase()
 
-        # Parallel rendering using multithreading (threadsafe Fortran)
-        if n_jobs > 1:
-            radiance = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose)(
-                delayed(super(RadianceSensor, self).render, check_pickle=False)(
-                    rte_solver=rte_solver,
-                    projection=projection) for rte_solver, projection in 
-                itertools.product(rte_solvers, projection.split(n_jobs)))
-            
-        # Sequential rendering
+        # Parallel rendering using multithreading (threadsafe Fortran) or multiprocessing (shared memory)
+        if self.supersampling is not None:
+            radiance = self.supersampling.parallel_render(self, rte_solvers, projection, n_jobs, verbose, backend)
         else:
-            radiance = [super(RadianceSensor, self).render(rte_solver, projection) for rte_solver in rte_solvers]
-
+            radiance = self.parallel_render(rte_solvers, projection, n_jobs, verbose, backend)
         radiance = np.concatenate(radiance) 
         images = self.make_images(radiance, projection, num_channels)
         return images
@@ -232,7 +1328,7 @@ class StokesSensor(Sensor):
         super().__init__()
         self._type = 'StokesSensor'
 
-    def render(self, rte_solver, projection, n_jobs=1, verbose=0):
+    def render(self, rte_solver, projection, n_jobs=1, verbose=0, backend='threading'):
         """
         The render method integrates a pre-computed stokes vector in-scatter field (source function) J over the sensor geometry.
         The source code for this function is in src/polarized/shdomsub4.f.
@@ -250,6 +1346,8 @@ class StokesSensor(Sensor):
             The number of jobs to divide the rendering into.
         verbose: int, default=0
             How much verbosity in the parallel rendering proccess.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
 
         Returns
         -------
@@ -270,32 +1368,13 @@ class StokesSensor(Sensor):
 
         # Pre-computation of phase-function for all solvers.
         for rte_solver in rte_solvers:
-            rte_solver._phasetab = core.precompute_phase_check(
-                negcheck=True,
-                nscatangle=rte_solver._nscatangle,
-                numphase=rte_solver._pa.numphase,
-                nstphase=rte_solver._nstphase,
-                nstokes=rte_solver._nstokes,
-                nstleg=rte_solver._nstleg,
-                nleg=rte_solver._nleg,
-                ml=rte_solver._ml,
-                nlm=rte_solver._nlm,
-                legen=rte_solver._legen,
-                deltam=rte_solver._deltam
-            )
-
-        # Parallel rendering using multithreading (threadsafe Fortran)
-        if n_jobs > 1:
-            stokes = Parallel(n_jobs=n_jobs, backend="threading", verbose=verbose)(
-                delayed(super(StokesSensor, self).render, check_pickle=False)(
-                    rte_solver=rte_solver,
-                    projection=projection) for rte_solver, projection in
-                itertools.product(rte_solvers, projection.split(n_jobs)))
+            rte_solver.precompute_phase()
 
-        # Sequential rendering
+        # Parallel rendering using multithreading (threadsafe Fortran) or multiprocessing (shared memory)
+        if self.supersampling is not None:
+            stokes = self.supersampling.parallel_render(self, rte_solvers, projection, n_jobs, verbose, backend)
         else:
-            stokes = [super(StokesSensor, self).render(rte_solver, projection) for rte_solver in rte_solvers]
-
+            stokes = self.parallel_render(rte_solvers, projection, n_jobs, verbose, backend)
         stokes = np.hstack(stokes)
         images = self.make_images(stokes, projection, num_channels)
         return images
@@ -355,7 +1434,7 @@ class DolpAolpSensor(StokesSensor):
         super().__init__()
         self._type = 'DolpAolpSensor'
 
-    def render(self, rte_solver, projection, n_jobs=1, verbose=0):
+    def render(self, rte_solver, projection, n_jobs=1, verbose=0, backend='threading'):
         """
         The render method integrates a pre-computed stokes vector in-scatter field (source function) J over the sensor geometry.
         The source code for this function is in src/polarized/shdomsub4.f.
@@ -373,7 +1452,8 @@ class DolpAolpSensor(StokesSensor):
             The number of jobs to divide the rendering into.
         verbose: int, default=0
             How much verbosity in the parallel rendering proccess.
-
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
 
         Returns
         -------
@@ -382,7 +1462,7 @@ class DolpAolpSensor(StokesSensor):
         aolp: np.array(shape=(sensor.resolution), dtype=np.float32)
             Angle of Linear Polarization
         """
-        stokes = super().render(rte_solver, projection, n_jobs, verbose)
+        stokes = super().render(rte_solver, projection, n_jobs, verbose, backend)
 
         indices = stokes[0] > 0.0
         dolp = np.zeros_like(stokes[0])
@@ -425,13 +1505,15 @@ class Projection(object):
     Notes
     -----
     All input arrays are raveled and should be of the same size.
+    Input arrays are converted (only if needed) to contiguous arrays of the dtype expected by the Fortran core 
+    (float32 positions, float64 directions), so that f2py accepts them and their slices without copying.
     """
     def __init__(self, x=None, y=None, z=None, mu=None, phi=None, resolution=None):
-        self._x = x
-        self._y = y
-        self._z = z
-        self._mu = mu
-        self._phi = phi
+        self._x = np.ascontiguousarray(x, dtype=np.float32) if isinstance(x, np.ndarray) else x
+        self._y = np.ascontiguousarray(y, dtype=np.float32) if isinstance(y, np.ndarray) else y
+        self._z = np.ascontiguousarray(z, dtype=np.float32) if isinstance(z, np.ndarray) else z
+        self._mu = np.ascontiguousarray(mu, dtype=np.float64) if isinstance(mu, np.ndarray) else mu
+        self._phi = np.ascontiguousarray(phi, dtype=np.float64) if isinstance(phi, np.ndarray) else phi
         self._npix = None
         if type(x)==type(y)==type(z)==type(mu)==type(phi)==np.ndarray:
             assert x.size==y.size==z.size==mu.size==phi.size, 'All input arrays must be of equal size'
@@ -439,12 +1521,17 @@ class Projection(object):
         self._resolution = resolution
 
     def __getitem__(self, val):
+        """
+        Index the projection pixels.
+        A contiguous slice returns a projection of views into the pixel arrays (no copy),
+        other indices (e.g. boolean masks or index arrays) return a projection with new arrays.
+        """
         projection = Projection(
-            x=np.array(self._x[val]),
-            y=np.array(self._y[val]),
-            z=np.array(self._z[val]),
-            mu=np.array(self._mu[val]),
-            phi=np.array(self._phi[val]),
+            x=np.asarray(self._x[val]),
+            y=np.asarray(self._y[val]),
+            z=np.asarray(self._z[val]),
+            mu=np.asarray(self._mu[val]),
+            phi=np.asarray(self._phi[val]),
         )
         return projection
 
@@ -465,6 +1552,7 @@ class Projection(object):
         Notes
         -----
         An even split doesnt always exist, in which case some parts will have slightly more pixels.
+        The parts are views into the pixel arrays (no copy).
         """
 
         x_split = np.array_split(self.x, n_parts)
@@ -479,6 +1567,31 @@ class Projection(object):
         ]
         return projections
 
+    def subpixel_projection(self, indices, offsets):
+        """
+        Sub-pixel rays within the footprint of pixels.
+
+        Parameters
+        ----------
+        indices: np.array(dtype=int)
+            The indices of the pixels.
+        offsets: np.array(shape=(2, num_subpixels))
+            The sub-pixel offsets in pixel units along the two image axes (in the range [-0.5, 0.5]).
+
+        Returns
+        -------
+        projection: shdom.Projection
+            A projection with num_subpixels consecutive rays for every pixel.
+        """
+        raise NotImplementedError('Sub-pixel rays of [{}] not implemented'.format(type(self).__name__))
+
+    @property
+    def supports_subpixels(self):
+        """
+        True if the projection defines sub-pixel rays (see subpixel_projection).
+        """
+        return type(self).subpixel_projection is not Projection.subpixel_projection
+
     @property
     def x(self):
         return self._x
@@ -605,6 +1718,32 @@ class OrthographicProjection(HomographyProjection):
         self._npix = self.x.size
         self._resolution = [x.size, y.size]
 
+    def subpixel_projection(self, indices, offsets):
+        """
+        Sub-pixel rays within the footprint of pixels (parallel rays shifted across the pixel).
+
+        Parameters
+        ----------
+        indices: np.array(dtype=int)
+            The indices of the pixels.
+        offsets: np.array(shape=(2, num_subpixels))
+            The sub-pixel offsets in pixel units along the x and y axes (in the range [-0.5, 0.5]).
+
+        Returns
+        -------
+        projection: shdom.Projection
+            A projection with num_subpixels consecutive rays for every pixel.
+        """
+        num_subpixels = offsets.shape[1]
+        projection = Projection(
+            x=(self.x[indices][:, None] + offsets[0][None] * self.x_resolution).ravel(),
+            y=(self.y[indices][:, None] + offsets[1][None] * self.y_resolution).ravel(),
+            z=np.repeat(self.z[indices], num_subpixels),
+            mu=np.repeat(self.mu[indices], num_subpixels),
+            phi=np.repeat(self.phi[indices], num_subpixels)
+        )
+        return projection
+
     @property
     def altitude(self):
         return self._altitude
@@ -653,15 +1792,33 @@ class PerspectiveProjection(HomographyProjection):
         self._homogeneous_coordinates = np.stack([x_c.ravel(), y_c.ravel(), z_c.ravel()])
         self.update_global_coordinates()
 
-    def update_global_coordinates(self):
+    def ray_directions(self, homogeneous_coordinates):
         """
-        This is an internal method which is called upon when a rotation matrix is computed to update the global camera coordinates.
+        Compute the ray directions of image plane coordinates.
+
+        Parameters
+        ----------
+        homogeneous_coordinates: np.array(shape=(3, num_rays))
+            Homogeneous image plane coordinates (x, y in the range [-1, 1]).
+
+        Returns
+        -------
+        mu: np.array(dtype=np.float64)
+            Cosine of the zenith angle of the rays (direction of photons)
+        phi: np.array(dtype=np.float64)
+            Azimuth angle [rad] of the rays (direction of photons)
         """
         x_c, y_c, z_c = norm(np.matmul(
-            self._rotation_matrix, np.matmul(self._inv_k, self._homogeneous_coordinates)))
+            self._rotation_matrix, np.matmul(self._inv_k, homogeneous_coordinates)))
+        mu = -z_c.astype(np.float64)
+        phi = (np.arctan2(y_c, x_c) + np.pi).astype(np.float64)
+        return mu, phi
 
-        self._mu = -z_c.astype(np.float64)
-        self._phi = (np.arctan2(y_c, x_c) + np.pi).astype(np.float64)
+    def update_global_coordinates(self):
+        """
+        This is an internal method which is called upon when a rotation matrix is computed to update the global camera coordinates.
+        """
+        self._mu, self._phi = self.ray_directions(self._homogeneous_coordinates)
         self._x = np.full(self.npix, self.position[0], dtype=np.float32)
         self._y = np.full(self.npix, self.position[1], dtype=np.float32)
         self._z = np.full(self.npix, self.position[2], dtype=np.float32)
@@ -754,6 +1911,41 @@ class PerspectiveProjection(HomographyProjection):
         ax.set_zlim(*zlim)
         ax.quiver(x, y, z, u, v, w, length=length, pivot='tail')
 
+    def subpixel_projection(self, indices, offsets):
+        """
+        Sub-pixel rays within the footprint of pixels (rays through shifted image plane coordinates).
+
+        Parameters
+        ----------
+        indices: np.array(dtype=int)
+            The indices of the pixels.
+        offsets: np.array(shape=(2, num_subpixels))
+            The sub-pixel offsets in pixel units along the camera x and y axes (in the range [-0.5, 0.5]).
+
+        Returns
+        -------
+        projection: shdom.Projection
+            A projection with num_subpixels consecutive rays for every pixel.
+        """
+        nx, ny = self.resolution
+        step = [2.0 / (nx - 1) if nx > 1 else 0.0, 2.0 / (ny - 1) if ny > 1 else 0.0]
+        x_c, y_c, z_c = self._homogeneous_coordinates[:, indices]
+        homogeneous_coordinates = np.stack([
+            (x_c[:, None] + offsets[0][None] * step[0]).ravel(),
+            (y_c[:, None] + offsets[1][None] * step[1]).ravel(),
+            np.repeat(z_c, offsets.shape[1])
+        ])
+        mu, phi = self.ray_directions(homogeneous_coordinates)
+        npix = mu.size
+        projection = Projection(
+            x=np.full(npix, self.position[0], dtype=np.float32),
+            y=np.full(npix, self.position[1], dtype=np.float32),
+            z=np.full(npix, self.position[2], dtype=np.float32),
+            mu=mu,
+            phi=phi
+        )
+        return projection
+
     @property
     def position(self):
         return self._position
@@ -1070,7 +2262,15 @@ class Camera(object):
         ----------
         projection: shdom.Projection
             A projection geomtry
+
+        Raises
+        ------
+        ValueError
+            If the sensor supersampling is not supported for the projection (see AdaptiveSupersampling.check_projection).
         """
+        sensor = getattr(self, '_sensor', None)
+        if sensor is not None and sensor.supersampling is not None:
+            sensor.supersampling.check_projection(projection)
         self._projection = projection
 
     def set_sensor(self, sensor):
@@ -1086,13 +2286,34 @@ class Camera(object):
         -----
         This method also updates the docstring of the render method according to the specific sensor
         """
+        projection = getattr(self, '_projection', None)
+        if projection is not None and sensor.supersampling is not None:
+            sensor.supersampling.check_projection(projection)
         self._sensor = sensor
 
         # Update function docstring
         if sensor.render.__doc__ is not None:
             self.render.__func__.__doc__ += sensor.render.__doc__
 
-    def render(self, rte_solver, n_jobs=1, verbose=0):
+    def set_supersampling(self, supersampling):
+        """
+        Set an adaptive supersampling renderer on the camera sensor (see Sensor.set_supersampling).
+
+        Parameters
+        ----------
+        supersampling: shdom.AdaptiveSupersampling or None
+            The supersampling renderer. None renders a single ray per pixel.
+
+        Raises
+        ------
+        ValueError
+            If supersampling is not supported for the camera projection (see AdaptiveSupersampling.check_projection).
+        """
+        if supersampling is not None:
+            supersampling.check_projection(self.projection)
+        self.sensor.set_supersampling(supersampling)
+
+    def render(self, rte_solver, n_jobs=1, verbose=0, backend='threading'):
         """
         Render an image according to the render function defined by the sensor.
 
@@ -1100,7 +2321,37 @@ class Camera(object):
         -----
         This is a dummy docstring that is overwritten when the set_sensor method is used.
         """
-        return self.sensor.render(rte_solver, self.projection, n_jobs, verbose)
+        return self.sensor.render(rte_solver, self.projection, n_jobs, verbose, backend)
+
+    def render_iter(self, rte_solver, tile_size=4096, n_jobs=1, backend='threading'):
+        """
+        A generator which renders the camera projection in tiles and yields every tile as soon as it is complete.
+
+        Parameters
+        ----------
+        rte_solver: shdom.RteSolver or shdom.RteSolverArray
+            The solver(s) with the precomputed radiative transfer solution (RteSolver.solve method).
+        tile_size: int, default=4096
+            The maximum number of pixels in a tile.
+        n_jobs: int, default=1
+            The number of workers rendering tiles concurrently.
+        backend: 'threading', 'loky' or 'multiprocessing'
+            The parallel rendering backend (see Sensor.parallel_render).
+
+        Yields
+        ------
+        view_name: str
+            The name of the view (projection) the tile belongs to.
+        tile_slice: slice
+            The pixels of the tile in the raveled view (reshape with order='F' into the view resolution).
+        output: np.array(dtype=np.float32)
+            The raw render output of the tile.
+
+        Notes
+        -----
+        See Sensor.render_iter for details.
+        """
+        return self.sensor.render_iter(rte_solver, self.projection, tile_size, n_jobs, backend)
 
     @property
     def projection(self):
@@ -1111,7 +2362,137 @@ class Camera(object):
         return self._sensor
 
 
-class MultiViewProjection(Projection):
+class ConcatenatedProjection(Projection):
+    """
+    An abstract projection which concatenates the pixels of several projections (views), to be inherited by
+    MultiViewProjection and shdom.DynamicProjection.
+
+    Notes
+    -----
+    The per-view arrays are kept in the views and the flattened x, y, z, mu, phi arrays are
+    materialized lazily (a single concatenation) on first access. Slicing and split gather pixels
+    directly from the per-view arrays according to the view offsets.
+    Inheriting classes define the views property and invalidate the flattened arrays (self._x = None) when a view is added.
+    """
+    def _materialize(self):
+        """
+        Concatenate the per-view arrays into the flattened x, y, z, mu, phi arrays.
+        """
+        if self._x is not None or len(self.views) == 0:
+            return
+        arrays = dict()
+        for attr in ['phi', 'mu', 'z', 'y', 'x']:
+            views = [projection.__getattribute__(attr) for projection in self.views]
+            arrays[attr] = views[0] if len(views) == 1 else np.concatenate(views)
+        for attr, array in arrays.items():
+            self.__setattr__('_' + attr, array)
+
+    def _gather(self, start, stop):
+        """
+        Gather the pixels [start, stop) of the flattened arrays from the per-view arrays.
+
+        Parameters
+        ----------
+        start: int
+            The first pixel index.
+        stop: int
+            The pixel index following the last pixel.
+
+        Returns
+        -------
+        arrays: list
+            The x, y, z, mu, phi arrays of the pixels. Pixels within a single view are numpy views (no copy).
+        """
+        attributes = ['x', 'y', 'z', 'mu', 'phi']
+        if self._x is not None:
+            return [self.__getattribute__('_' + attr)[start:stop] for attr in attributes]
+        offsets = self.offsets
+        num_views = len(self.views)
+        first = min(max(np.searchsorted(offsets, start, side='right') - 1, 0), num_views - 1)
+        last = max(np.searchsorted(offsets, stop, side='left'), first + 1)
+        parts = []
+        for projection, offset in zip(self.views[first:last], offsets[first:last]):
+            view_start, view_stop = max(start - offset, 0), max(min(stop, offsets[-1]) - offset, 0)
+            if isinstance(projection, ConcatenatedProjection):
+                parts.append(projection._gather(view_start, view_stop))
+            else:
+                parts.append([projection.__getattribute__(attr)[view_start:view_stop] for attr in attributes])
+        return [part[0] if len(parts) == 1 else np.concatenate(part) for part in zip(*parts)]
+
+    def __getitem__(self, val):
+        if isinstance(val, slice) and val.step in [None, 1]:
+            start, stop, step = val.indices(self.offsets[-1])
+            x, y, z, mu, phi = self._gather(start, max(start, stop))
+            return Projection(x=x, y=y, z=z, mu=mu, phi=phi)
+        self._materialize()
+        return super().__getitem__(val)
+
+    def split(self, n_parts):
+        """
+        Split the projection geometry.
+
+        Parameters
+        ----------
+        n_parts: int
+            The number of parts to split the projection geometry to
+
+        Returns
+        -------
+        projections: list
+            A list of projections each with n_parts
+
+        Notes
+        -----
+        An even split doesnt always exist, in which case some parts will have slightly more pixels.
+        The parts are split as in np.array_split and gathered from the per-view arrays.
+        """
+        npix = self.offsets[-1]
+        sizes = [npix // n_parts + 1] * (npix % n_parts) + [npix // n_parts] * (n_parts - npix % n_parts)
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        projections = [self[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+        return projections
+
+    @property
+    def views(self):
+        """
+        The list of concatenated projections.
+        """
+        raise NotImplementedError('Views of [{}] not implemented'.format(type(self).__name__))
+
+    @property
+    def x(self):
+        self._materialize()
+        return self._x
+
+    @property
+    def y(self):
+        self._materialize()
+        return self._y
+
+    @property
+    def z(self):
+        self._materialize()
+        return self._z
+
+    @property
+    def mu(self):
+        self._materialize()
+        return self._mu
+
+    @property
+    def phi(self):
+        self._materialize()
+        return self._phi
+
+    @property
+    def offsets(self):
+        """
+        The flattened pixel index of the first pixel of every view followed by the total number of pixels.
+        """
+        return np.concatenate(([0], np.cumsum([np.sum(view.npix) for view in self.views]))).astype(np.int64)
+
+
+class MultiViewProjection(ConcatenatedProjection):
     """
     A MultiViewProjection object encapsulate several projection geometries for multi-view imaging of a domain.
 
@@ -1119,6 +2500,10 @@ class MultiViewProjection(Projection):
     ----------
     projection_list: list, optional
         A list of Sensor objects
+
+    Notes
+    -----
+    The flattened pixel arrays are materialized lazily from the per-view arrays (see ConcatenatedProjection).
     """
     def __init__(self, projection_list=None):
         super().__init__()
@@ -1144,18 +2529,11 @@ class MultiViewProjection(Projection):
         if name is None:
             name = 'View{}'.format(self.num_projections)
 
-        attributes = ['x', 'y', 'z', 'mu', 'phi']
-
         if self.num_projections == 0:
-            for attr in attributes:
-                self.__setattr__('_' + attr, projection.__getattribute__(attr))
             self._npix = [projection.npix]
             self._resolution = [projection.resolution]
             self._names = [name]
         else:
-            for attr in attributes:
-                self.__setattr__('_' + attr, np.concatenate((self.__getattribute__(attr),
-                                                             projection.__getattribute__(attr))))
             self._npix.append(projection.npix)
             self._names.append(name)
             self._resolution.append(projection.resolution)
@@ -1163,10 +2541,21 @@ class MultiViewProjection(Projection):
         self._projection_list.append(projection)
         self._num_projections += 1
 
+        # Invalidate the flattened arrays
+        self._x = None
+
+    @property
+    def views(self):
+        return self._projection_list
+
     @property
     def projection_list(self):
         return self._projection_list
 
+    @property
+    def names(self):
+        return self._names
+
     @property
     def num_projections(self):
         return self._num_projections
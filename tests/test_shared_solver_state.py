@@ -0,0 +1,51 @@
+import os, sys, pickle, warnings
+import multiprocessing
+import numpy as np
+import pytest
+
+shdom = pytest.importorskip('shdom')
+
+
+def make_solver():
+    """A minimal solver with large (shared) and small (pickled) arrays."""
+    solver = shdom.RteSolver.__new__(shdom.RteSolver)
+    solver._radiance = np.asfortranarray(np.random.rand(16, 32).astype(np.float32))
+    solver._npts = 32
+    solver._pa = shdom.rte_solver.ShdomPropertyArrays()
+    solver._pa.extinctp = np.random.rand(8).astype(np.float32)
+    return solver
+
+
+@pytest.fixture
+def no_shared_memory(monkeypatch):
+    """Emulate python<3.8 where multiprocessing.shared_memory does not exist."""
+    monkeypatch.delattr(multiprocessing, 'shared_memory', raising=False)
+    monkeypatch.setitem(sys.modules, 'multiprocessing.shared_memory', None)
+
+
+def test_default_storage_falls_back_to_memmap(no_shared_memory):
+    solver = make_solver()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        state = shdom.SharedSolverState(solver, min_nbytes=0)
+    try:
+        assert state.storage == 'memmap'
+        view = pickle.loads(pickle.dumps(state)).get_solver()
+        np.testing.assert_array_equal(view._radiance, solver._radiance)
+        np.testing.assert_array_equal(view._pa.extinctp, solver._pa.extinctp)
+        assert view._npts == solver._npts
+        assert not view._radiance.flags.writeable
+        directory = state._dir
+        del view
+    finally:
+        state.unlink()
+    assert not os.path.exists(directory)
+
+
+def test_shared_memory_falls_back_to_memmap(no_shared_memory):
+    with pytest.warns(UserWarning):
+        state = shdom.SharedSolverState(make_solver(), storage='shared_memory', min_nbytes=0)
+    try:
+        assert state.storage == 'memmap'
+    finally:
+        state.unlink()
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+shdom = pytest.importorskip('shdom')
+
+
+def make_solver():
+    """A small random optical medium with a Rayleigh phase function."""
+    wavelength = 0.672
+    grid = shdom.Grid(bounding_box=shdom.BoundingBox(0.0, 0.0, 0.0, 1.0, 1.0, 1.0), nx=8, ny=8, nz=8)
+    rng = np.random.RandomState(0)
+    extinction = shdom.GridData(grid, (20.0 * rng.rand(*grid.shape)).astype(np.float32))
+    albedo = shdom.GridData(grid, np.full(grid.shape, 0.99, dtype=np.float32))
+    table, table_type = shdom.core.rayleigh_phase_function(wavelen=wavelength)
+    phase = shdom.GridPhase(shdom.LegendreTable(table.astype(np.float32), table_type.decode()),
+                            shdom.GridData(grid, np.ones(grid.shape, dtype=np.int32)))
+    medium = shdom.Medium(grid)
+    medium.add_scatterer(shdom.OpticalScatterer(wavelength, extinction, albedo, phase))
+    rte_solver = shdom.RteSolver(shdom.SceneParameters(wavelength=wavelength), shdom.NumericalParameters())
+    rte_solver.set_medium(medium)
+    return rte_solver
+
+
+def test_callback_does_not_change_solution():
+    maxiter = 50
+    plain = make_solver()
+    plain.solve(maxiter=maxiter, verbose=False)
+
+    records = []
+    monitored = make_solver()
+    monitored.solve(maxiter=maxiter, verbose=False, callback=lambda rte_solver, record: records.append(record))
+
+    assert records[-1]['iteration'] == plain.num_iterations
+    assert monitored.num_iterations == plain.num_iterations
+    assert monitored._npts == plain._npts
+    assert records[-1]['npts'] == plain._npts
+    np.testing.assert_array_equal(monitored._source, plain._source)
+    np.testing.assert_array_equal(monitored._radiance, plain._radiance)
+
+
+class StalledIterations(object):
+    """Emulate SHDOM solution iterations whose solution criterion stalls after a few iterations."""
+    def __init__(self, rte_solver, stall_solcrit=1e-2):
+        self.rte_solver = rte_solver
+        self.stall_solcrit = stall_solcrit
+        self.calls = 0
+
+    def solution_iterations(self, maxiter, verbose=True):
+        self.calls += 1
+        return maxiter
+
+    def update_solution_arguments(self, maxiter):
+        rte_solver = self.rte_solver
+        rte_solver._iters = maxiter
+        rte_solver._solcrit = max(rte_solver._solcrit * 0.1**maxiter, self.stall_solcrit)
+        rte_solver._npts += 10 * maxiter
+        rte_solver._ncells += 10 * maxiter
+
+
+def make_stalled_solver():
+    rte_solver = shdom.RteSolver.__new__(shdom.RteSolver)
+    rte_solver._iters, rte_solver._solcrit, rte_solver._solacc = 1, 1.0, 1e-4
+    rte_solver._npts, rte_solver._ncells, rte_solver._npart, rte_solver._nstokes = 100, 100, 1, 1
+    rte_solver._shptr = rte_solver._rshptr = 9 * np.arange(10000, dtype=np.int32)
+    iterations = StalledIterations(rte_solver)
+    rte_solver.solution_iterations = iterations.solution_iterations
+    rte_solver.update_solution_arguments = iterations.update_solution_arguments
+    return rte_solver, iterations
+
+
+def test_policy_stops_stalled_solve():
+    rte_solver, iterations = make_stalled_solver()
+    rte_solver.solve(maxiter=100, verbose=False, policy=shdom.ConvergencePolicy(min_iter=5, window=5))
+
+    history = rte_solver.solution_history
+    assert rte_solver.num_iterations < 15
+    assert iterations.calls == len(history) == rte_solver.num_iterations
+    assert history[-1]['solcrit'] == pytest.approx(1e-2)
+    assert history[-1]['nbytes'] > history[0]['nbytes']
+
+
+def test_policy_requires_iteration_steps():
+    rte_solver, iterations = make_stalled_solver()
+    with pytest.raises(ValueError):
+        rte_solver.solve(maxiter=100, verbose=False, policy=shdom.ConvergencePolicy(), iterations_per_step=100)